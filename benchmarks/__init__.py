@@ -0,0 +1,18 @@
+"""Offline benchmarks. Each module has a ``main()`` that prints a summary
+and returns its results; :mod:`benchmarks.run` collects them all."""
+import time
+
+
+def measure(func, iterations):
+    """Calls ``func`` repeatedly and summarizes the per-call latency."""
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        'mean_ms': 1000 * sum(samples) / len(samples),
+        'p50_ms': 1000 * samples[len(samples) // 2],
+        'p99_ms': 1000 * samples[int(len(samples) * 0.99)],
+    }
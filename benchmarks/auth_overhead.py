@@ -0,0 +1,67 @@
+"""Measures what authentication adds to a private call: nonce generation
+(in-process and file-shared), the in-memory token lookup, and
+:func:`korbit.api.place_order` against a bare
+:meth:`~korbit.client.KorbitClient.post` on a local stub.
+
+Usage::
+
+    python -m benchmarks.run auth_overhead
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks import measure
+from benchmarks.fixtures import load, routes
+from korbit import api
+from korbit.auth import TokenManager
+from korbit.client import KorbitClient
+from korbit.nonce import NonceGenerator
+from tests.stub import StubServer
+
+
+def request_token():
+    token_dict = load('token')
+    token_dict['issued_at'] = time.time()
+    return token_dict
+
+
+def main(iterations=1000):
+    directory = tempfile.mkdtemp()
+    shared = NonceGenerator(os.path.join(directory, 'korbit.nonce'))
+    tokens = TokenManager(request_token, path=None, background=False)
+    tokens.get()
+
+    results = {
+        'nonce': measure(NonceGenerator(), iterations),
+        'nonce_shared_file': measure(shared, iterations),
+        'token': measure(tokens.get, iterations),
+    }
+    shared.close()
+    shutil.rmtree(directory)
+
+    with StubServer(routes()) as server:
+        api.set_default_client(KorbitClient(server.base_url))
+        api.set_token_manager(tokens)
+        api.set_nonce_generator(NonceGenerator())
+        try:
+            client = api.get_default_client()
+            results['post'] = measure(
+                lambda: client.post('user/orders/buy', access_token='token',
+                                    nonce=1, type='limit', currency='krw',
+                                    coin_amount=0.01, price=569000),
+                iterations)
+            results['place_order'] = measure(
+                lambda: api.place_order('buy', price=569000,
+                                        coin_amount=0.01),
+                iterations)
+        finally:
+            api.set_default_client(None)
+            api.set_token_manager(None)
+            api.set_nonce_generator(None)
+
+    for name, stats in results.items():
+        print('{:<18} mean {:.1f}us  p99 {:.1f}us'.format(
+            name, 1000 * stats['mean_ms'], 1000 * stats['p99_ms']))
+    return results
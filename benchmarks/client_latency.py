@@ -0,0 +1,33 @@
+"""Compares per-call latency of one-shot ``requests.get`` against a pooled
+:class:`korbit.client.KorbitClient`, both talking to a local stub server.
+
+Usage::
+
+    python -m benchmarks.run client_latency
+"""
+import requests
+
+from benchmarks import measure
+from benchmarks.fixtures import load
+from korbit.client import KorbitClient
+from tests.stub import StubServer
+
+
+def main(iterations=1000):
+    with StubServer({'ticker': load('ticker')}) as server:
+        url = '{}/ticker'.format(server.base_url)
+
+        def unpooled():
+            requests.get(url, params={'currency_pair': 'btc_krw'}).json()
+
+        results = {'requests.get': measure(unpooled, iterations)}
+
+        with KorbitClient(server.base_url) as client:
+            results['KorbitClient.get'] = measure(
+                lambda: client.get('ticker', currency_pair='btc_krw'),
+                iterations)
+
+    for name, stats in results.items():
+        print('{:<18} mean {mean_ms:.3f}ms  p50 {p50_ms:.3f}ms  '
+              'p99 {p99_ms:.3f}ms'.format(name, **stats))
+    return results
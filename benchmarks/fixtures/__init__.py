@@ -0,0 +1,45 @@
+"""Recorded API responses served by the benchmark stub server."""
+import json
+import os
+import random
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def load(name):
+    """Loads ``<name>.json`` from this directory."""
+    with open(os.path.join(DIRECTORY, name + '.json')) as f:
+        return json.load(f)
+
+
+def routes():
+    """Routes for :class:`tests.stub.StubServer` serving every fixture."""
+    order = load('order')
+    return {
+        'ticker': load('ticker'),
+        'orderbook': load('orderbook'),
+        'transactions': load('transactions'),
+        ('POST', 'user/orders/buy'): order,
+        ('POST', 'user/orders/sell'): order,
+        ('POST', 'oauth2/access_token'): load('token'),
+    }
+
+
+def orderbook(depth, seed=0):
+    """The recorded orderbook widened or cut to ``depth`` levels per side.
+    Levels are shuffled, as the API does not promise any order."""
+    recorded = load('orderbook')
+    rng = random.Random(seed)
+
+    def side(levels, step):
+        widened = []
+        for i in range(depth):
+            price, amount, count = levels[i % len(levels)]
+            shift = step * len(levels) * (i // len(levels))
+            widened.append([str(int(price) + shift), amount, count])
+        rng.shuffle(widened)
+        return widened
+
+    return {'timestamp': recorded['timestamp'],
+            'bids': side(recorded['bids'], -100),
+            'asks': side(recorded['asks'], 100)}
@@ -0,0 +1,42 @@
+"""Measures ``import korbit.api`` with ``python -X importtime`` in a fresh
+interpreter and lists the most expensive imports.
+
+Usage::
+
+    python -m benchmarks.run import_time
+"""
+import subprocess
+import sys
+
+
+def import_times(module):
+    """Returns ``{module: (self_us, cumulative_us)}`` for one import of
+    ``module`` in a fresh interpreter, plus the set of loaded modules."""
+    code = 'import sys, {}; print(",".join(sys.modules))'.format(module)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times, set(proc.stdout.strip().split(','))
+
+
+def main(module='korbit.api', top=10):
+    times, loaded = import_times(module)
+    top_level = {name: cumulative for name, (_, cumulative) in times.items()
+                 if '.' not in name or name == module}
+
+    print('{}: {:.1f}ms'.format(module, times[module][1] / 1000.0))
+    for name, cumulative in sorted(top_level.items(),
+                                   key=lambda x: -x[1])[:int(top)]:
+        print('  {:<30} {:>8.1f}ms'.format(name, cumulative / 1000.0))
+    for heavy in ('sqlalchemy', 'numpy'):
+        print('{} loaded: {}'.format(heavy, heavy in loaded))
+
+    return {'module': module, 'cumulative_us': times[module][1],
+            'sqlalchemy_loaded': 'sqlalchemy' in loaded,
+            'numpy_loaded': 'numpy' in loaded}
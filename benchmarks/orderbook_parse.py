@@ -0,0 +1,35 @@
+"""Measures how :func:`korbit.api.parse_orderbook` scales with book depth,
+for the list-based, columnar and fixed-point columnar layouts. The HTTP
+round trip is left out; see :mod:`benchmarks.throughput`.
+
+Usage::
+
+    python -m benchmarks.run orderbook_parse
+"""
+from benchmarks import measure
+from benchmarks.fixtures import orderbook
+from korbit.api import parse_orderbook
+
+DEPTHS = (10, 100, 1000, 10000)
+
+LAYOUTS = {
+    'lists': {},
+    'columnar': {'columnar': True},
+    'fixed_point': {'columnar': True, 'fixed_point': True},
+}
+
+
+def main(iterations=100, depths=DEPTHS):
+    results = {}
+    for depth in depths:
+        raw = orderbook(depth)
+        for layout, kwargs in sorted(LAYOUTS.items()):
+            parse_orderbook(raw, **kwargs)  # lazy imports happen here
+            results['{}_{}'.format(layout, depth)] = measure(
+                lambda: parse_orderbook(raw, **kwargs), iterations)
+
+    for name, stats in sorted(results.items(),
+                              key=lambda x: int(x[0].rsplit('_', 1)[1])):
+        print('{:<18} mean {mean_ms:.3f}ms  p99 {p99_ms:.3f}ms'.format(
+            name, **stats))
+    return results
@@ -0,0 +1,75 @@
+"""Runs every benchmark and writes the results as JSON, to compare one
+release against another.
+
+Usage::
+
+    python -m benchmarks.run [benchmark ...] [output.json] [--quick]
+
+Benchmarks are named as in :data:`BENCHMARKS`, e.g., ``client_latency``;
+without names, all of them run. Without an output path the JSON is printed.
+``--quick`` shrinks iteration counts for a smoke run.
+"""
+import json
+import platform
+import sys
+import time
+
+import korbit
+from benchmarks import (auth_overhead, client_latency, import_time,
+                        orderbook_parse, throughput, transaction_insert)
+
+#: ``(name, main, arguments, quick arguments)``
+BENCHMARKS = [
+    ('client_latency', client_latency.main, {}, {'iterations': 20}),
+    ('throughput', throughput.main, {}, {'requests': 20}),
+    ('orderbook_parse', orderbook_parse.main, {},
+     {'iterations': 5, 'depths': (10, 100)}),
+    ('transaction_insert', transaction_insert.main, {}, {'rows': 50}),
+    ('auth_overhead', auth_overhead.main, {}, {'iterations': 20}),
+    ('import_time', import_time.main, {}, {}),
+]
+
+
+def run(quick=False, names=None):
+    """Runs the benchmarks (all, or those in ``names``) and returns a
+    report with the environment and every result."""
+    results = {}
+    for name, main, kwargs, quick_kwargs in BENCHMARKS:
+        if names is None or name in names:
+            print('== {}'.format(name), file=sys.stderr)
+            results[name] = main(**(quick_kwargs if quick else kwargs))
+
+    return {
+        'korbit': korbit.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'quick': quick,
+        'results': results,
+    }
+
+
+def main(*args):
+    quick = '--quick' in args
+    known = set(b[0] for b in BENCHMARKS)
+    names = [x for x in args if x in known] or None
+    paths = [x for x in args if not x.startswith('--') and x not in known]
+
+    # Benchmarks print their summaries; keep stdout for the JSON report
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        report = run(quick, names)
+    finally:
+        sys.stdout = stdout
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if paths:
+        with open(paths[0], 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return report
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,50 @@
+"""Measures :meth:`korbit.client.KorbitClient.get` and
+:meth:`~korbit.client.KorbitClient.post` throughput against a local stub
+serving recorded responses, from one and from several threads.
+
+Usage::
+
+    python -m benchmarks.run throughput
+"""
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from benchmarks.fixtures import routes
+from korbit.client import KorbitClient
+from tests.stub import StubServer
+
+CALLS = {
+    'get': lambda client: client.get('ticker', currency_pair='btc_krw'),
+    'post': lambda client: client.post(
+        'user/orders/buy', access_token='token', nonce=1, type='limit',
+        currency='krw', coin_amount='0.01', price=569000),
+}
+
+
+def throughput(client, call, requests, threads):
+    """Requests per second of ``requests`` calls spread over ``threads``."""
+    started = time.perf_counter()
+    if threads == 1:
+        for _ in range(requests):
+            call(client)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda _: call(client), range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+def main(requests=1000, threads=(1, 8)):
+    results = {}
+    with StubServer(routes()) as server:
+        # Coalescing would merge concurrent identical GETs into one request
+        with KorbitClient(server.base_url, coalesce=False,
+                          pool_maxsize=max(threads)) as client:
+            for name, call in sorted(CALLS.items()):
+                call(client)  # warm up the connection pool
+                for count in threads:
+                    key = '{}_{}_threads_rps'.format(name, count)
+                    results[key] = throughput(client, call, requests, count)
+
+    for name, rps in sorted(results.items()):
+        print('{:<20} {:>10.0f} requests/s'.format(name, rps))
+    return results
@@ -0,0 +1,64 @@
+"""Compares :meth:`korbit.models.Transaction.insert` (one commit per row)
+against :meth:`korbit.models.Transaction.insert_many` on a scratch SQLite
+database.
+
+Usage::
+
+    python -m benchmarks.run transaction_insert
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from korbit import models
+from korbit.models import Transaction
+
+
+def make_transactions(count):
+    return [{
+        'id': str(i),
+        'type': 'buy' if i % 2 else 'sell',
+        'timestamp': 1402448355000 + i,
+        'completedAt': 1402448277000 + i,
+        'fee': {'currency': 'btc', 'value': '0.00010000'},
+        'fillsDetail': {
+            'orderId': str(i),
+            'price': {'currency': 'krw', 'value': str(500000 + i % 1000)},
+            'amount': {'currency': 'btc', 'value': '0.10000000'},
+        },
+        'balances': [{'currency': 'btc', 'value': '8.80000000'}],
+    } for i in range(count)]
+
+
+def timed(directory, name, func):
+    models.configure('sqlite:///{}'.format(
+        os.path.join(directory, name + '.db')))
+    models.init_db()
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main(rows=2000):
+    records = make_transactions(rows)
+    default_url = models.DATABASE_URL
+    directory = tempfile.mkdtemp()
+
+    def per_row():
+        for record in records:
+            Transaction.insert(record)
+
+    try:
+        results = {
+            'insert': timed(directory, 'insert', per_row),
+            'insert_many': timed(directory, 'insert_many',
+                                 lambda: Transaction.insert_many(records)),
+        }
+    finally:
+        models.configure(default_url)
+        shutil.rmtree(directory)
+
+    for name, elapsed in results.items():
+        print('{:<12} {:>10.0f} rows/s'.format(name, rows / elapsed))
+    return {name: rows / elapsed for name, elapsed in results.items()}
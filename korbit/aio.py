@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""Asynchronous counterparts of :mod:`korbit.api` built on :mod:`aiohttp`.
+
+Every coroutine mirrors the blocking function of the same name and shares a
+single connection pool, so hundreds of requests can be fanned out from one
+event loop:
+
+.. code-block:: python
+
+    from korbit import aio
+
+    async def main():
+        tickers = await asyncio.gather(
+            *[aio.get_ticker(pair) for pair in ('btc_krw', 'eth_krw')])
+        await aio.close()
+
+Requires ``aiohttp`` (``pip install korbit[aio]``).
+"""
+from korbit import api
+from korbit.api import parse_orderbook
+from korbit.client import DEFAULT_TIMEOUT, KorbitError, renew_nonce
+from korbit.decoder import get_decoder
+from korbit.fixedpoint import AMOUNT_DECIMALS, from_units
+from korbit.metrics import RequestRecord, notify, rate_limit_headers
+from logbook import Logger
+from urllib.parse import urlencode
+import aiohttp
+import asyncio
+import time
+
+log = Logger('korbit.aio')
+
+
+def _clean(params):
+    """Drops ``None`` values and expands lists into repeated keys (as
+    :mod:`requests` does), stringifying the rest, which :mod:`aiohttp`
+    insists on for form data."""
+    pairs = []
+    for key, value in params.items():
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            if item is not None:
+                pairs.append((key, str(item)))
+    return pairs
+
+
+def _trace_config():
+    """Timestamps DNS resolution, connection setup and the arrival of the
+    response headers into each request's ``trace_request_ctx`` dictionary."""
+    def mark(name):
+        async def callback(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx[name] = time.perf_counter()
+        return callback
+
+    config = aiohttp.TraceConfig()
+    config.on_dns_resolvehost_start.append(mark('dns_start'))
+    config.on_dns_resolvehost_end.append(mark('dns_end'))
+    config.on_connection_create_start.append(mark('connect_start'))
+    config.on_connection_create_end.append(mark('connect_end'))
+    config.on_request_end.append(mark('headers'))
+    return config
+
+
+def _phases(marks, started, finished):
+    phases = {}
+    sent = started
+    if 'dns_end' in marks:
+        phases['dns'] = marks['dns_end'] - marks['dns_start']
+    if 'connect_end' in marks:
+        # Connection setup includes resolving the host and the TLS handshake
+        phases['connect'] = marks['connect_end'] - marks['connect_start'] - \
+            phases.get('dns', 0.0)
+        sent = marks['connect_end']
+    if 'headers' in marks:
+        phases['ttfb'] = marks['headers'] - sent
+        phases['body'] = finished - marks['headers']
+    return phases
+
+
+def _client_timeout(timeout):
+    if timeout is None:
+        return aiohttp.ClientTimeout(total=None)
+    elif isinstance(timeout, tuple):
+        connect, read = timeout
+        return aiohttp.ClientTimeout(total=None, sock_connect=connect,
+                                     sock_read=read)
+    else:
+        return aiohttp.ClientTimeout(total=timeout)
+
+
+class AsyncKorbitClient(object):
+    """An :mod:`aiohttp` based client owning one pooled session.
+
+    The underlying :class:`aiohttp.ClientSession` is created lazily inside
+    the running event loop, and again whenever the client is used from
+    another loop (e.g., a later :func:`asyncio.run`), so the client itself
+    can be constructed anywhere.
+    """
+
+    def __init__(self, base_url=None, limit=100, limit_per_host=0,
+                 timeout=DEFAULT_TIMEOUT, keep_alive=True, decoder=None,
+                 hooks=None, rate_limiter=None):
+        """Default initializer.
+
+        :param base_url: API root; defaults to :data:`korbit.api.BASE_URL`
+        :param limit: Maximum number of simultaneous connections
+        :param limit_per_host: Maximum number of simultaneous connections to
+            one host (``0`` means no limit besides ``limit``)
+        :param timeout: Either a single number or a ``(connect, read)`` tuple
+            in seconds, or ``None`` to wait forever
+        :param keep_alive: If ``False``, connections are not reused
+        :param decoder: JSON backend name or callable; see
+            :func:`korbit.decoder.get_decoder`
+        :param hooks: See :class:`korbit.client.KorbitClient`. Requests made
+            while hooks are installed are traced phase by phase.
+        :param rate_limiter: An optional :class:`korbit.ratelimit.RateLimiter`,
+            possibly shared with blocking clients. Requests wait for it
+            in the event loop.
+        """
+        self.base_url = base_url or api.BASE_URL
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.decode = get_decoder(decoder)
+        self.hooks = list(hooks or ())
+        self.rate_limiter = rate_limiter
+        self.session = None
+        self._loop = None  # the loop self.session belongs to
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _get_session(self):
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or \
+                self._loop is not loop:
+            # A session left open in a previous loop cannot be used (or
+            # closed) from this one
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host,
+                force_close=not self.keep_alive)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=_client_timeout(self.timeout),
+                trace_configs=[_trace_config()])
+            self._loop = loop
+        return self.session
+
+    async def close(self):
+        """Releases all pooled connections."""
+        if self.session is not None:
+            if self._loop is asyncio.get_running_loop():
+                await self.session.close()
+            self.session = None
+            self._loop = None
+
+    def url(self, url_suffix):
+        return '{}/{}'.format(self.base_url, url_suffix)
+
+    async def get(self, url_suffix, **params):
+        """Initiates an HTTP GET request."""
+        res, body = await self._request('GET', url_suffix,
+                                        params=_clean(params))
+
+        if res.status == 200:
+            return self.decode(body)
+        else:
+            raise KorbitError('{}: {}'.format(res.status, res.reason),
+                              res.status, res.headers, body)
+
+    async def post(self, url_suffix, **post_data):
+        """Initiates an HTTP POST request."""
+        res, body = await self._request('POST', url_suffix,
+                                        data=_clean(post_data))
+
+        if res.status == 200:
+            return self.decode(body)
+        else:
+            raise KorbitError('{}: {} {}'.format(
+                res.status, dict(res.headers), res.reason),
+                res.status, res.headers, body)
+
+    async def _request(self, method, url_suffix, **kwargs):
+        queued = 0.0
+        if self.rate_limiter is not None:
+            queued = await self.rate_limiter.acquire_async(method,
+                                                           url_suffix)
+            for field in ('params', 'data'):
+                if kwargs.get(field):
+                    kwargs[field] = renew_nonce(kwargs[field])
+
+        session = self._get_session()
+        marks = {} if self.hooks else None
+
+        started = time.perf_counter()
+        try:
+            async with session.request(method, self.url(url_suffix),
+                                       trace_request_ctx=marks,
+                                       **kwargs) as res:
+                body = await res.read()
+        except Exception as e:
+            if self.hooks:
+                notify(self.hooks, RequestRecord(
+                    method, url_suffix, None, time.perf_counter() - started,
+                    _phases(marks, started, time.perf_counter()), queued, 0,
+                    0, 0, {}, e))
+            raise
+
+        if self.hooks:
+            finished = time.perf_counter()
+            notify(self.hooks, RequestRecord(
+                method, url_suffix, res.status, finished - started,
+                _phases(marks, started, finished), queued,
+                len(urlencode(kwargs.get('data', []))), len(body), 0,
+                rate_limit_headers(res.headers), None))
+        return res, body
+
+
+_default_client = None
+
+
+def get_default_client():
+    """Returns the shared :class:`AsyncKorbitClient`, creating it on first
+    use."""
+    global _default_client
+
+    if _default_client is None:
+        _default_client = AsyncKorbitClient()
+
+    return _default_client
+
+
+def set_default_client(client):
+    """Replaces the shared client. The previous one is not closed; await its
+    :meth:`AsyncKorbitClient.close` if it is no longer needed.
+
+    :type client: AsyncKorbitClient
+    """
+    global _default_client
+    _default_client = client
+
+
+async def close():
+    """Closes the shared client's connection pool."""
+    if _default_client is not None:
+        await _default_client.close()
+
+
+async def get(url_suffix, **params):
+    """Initiates an HTTP GET request."""
+    return await get_default_client().get(url_suffix, **params)
+
+
+async def post(url_suffix, **post_data):
+    """Initiates an HTTP POST request."""
+    return await get_default_client().post(url_suffix, **post_data)
+
+
+async def access_token():
+    """See :func:`korbit.api.access_token`. A fresh in-memory token is
+    returned immediately; refreshes are rare, so they run in the default
+    executor."""
+    token_dict = api.get_token_manager().current()
+    if token_dict is not None:
+        return token_dict
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, api.access_token)
+
+
+async def get_constants():
+    """See :func:`korbit.api.get_constants`."""
+    return await get('constants')
+
+
+async def get_currency_pairs():
+    """See :func:`korbit.api.get_currency_pairs`."""
+    return sorted((await get_constants())['exchange'])
+
+
+async def get_orderbook(order_type=None, currency_pair='btc_krw',
+                        columnar=False, fixed_point=False):
+    """See :func:`korbit.api.get_orderbook`."""
+    return parse_orderbook(await get('orderbook', currency_pair=currency_pair),
+                           order_type, columnar, fixed_point)
+
+
+async def _fetch_all(func, currency_pairs):
+    if currency_pairs is None:
+        currency_pairs = await get_currency_pairs()
+    currency_pairs = list(currency_pairs)
+
+    results = await asyncio.gather(*[func(pair) for pair in currency_pairs])
+    return dict(zip(currency_pairs, results))
+
+
+async def get_orderbooks(currency_pairs=None, columnar=False,
+                         fixed_point=False):
+    """See :func:`korbit.api.get_orderbooks`."""
+    return await _fetch_all(
+        lambda pair: get_orderbook(currency_pair=pair, columnar=columnar,
+                                   fixed_point=fixed_point),
+        currency_pairs)
+
+
+async def get_tickers(currency_pairs=None):
+    """See :func:`korbit.api.get_tickers`."""
+    return await _fetch_all(get_ticker, currency_pairs)
+
+
+async def get_ticker(currency_pair='btc_krw'):
+    """See :func:`korbit.api.get_ticker`."""
+    return await get('ticker', currency_pair=currency_pair)
+
+
+async def get_detailed_ticker():
+    """See :func:`korbit.api.get_detailed_ticker`."""
+    return await get('ticker/detailed')
+
+
+async def get_detailed_ticker_all():
+    """See :func:`korbit.api.get_detailed_ticker_all`."""
+    return await get('ticker/detailed/all')
+
+
+async def get_transactions(_time='hour', numeric=False):
+    """See :func:`korbit.api.get_transactions`."""
+    return api.parse_transactions(await get('transactions', time=_time),
+                                  numeric)
+
+
+async def get_user_info():
+    """See :func:`korbit.api.get_user_info`."""
+    token = await access_token()
+    return await get('user/info', access_token=token['access_token'],
+                     nonce=api.nonce())
+
+
+async def get_user_transactions(category=None, currency_pair=None,
+                                offset=None, limit=None):
+    """See :func:`korbit.api.get_user_transactions`."""
+    token = await access_token()
+    return await get('user/transactions', access_token=token['access_token'],
+                     nonce=api.nonce(), category=category,
+                     currency_pair=currency_pair, offset=offset, limit=limit)
+
+
+async def iter_user_transactions(
+        category=None, currency_pair=None, offset=0,
+        page_size=api.USER_TRANSACTIONS_PAGE_SIZE):
+    """See :func:`korbit.api.iter_user_transactions`. The next page is
+    always requested while the caller consumes the current one.
+
+    .. code-block:: python
+
+        async for transaction in aio.iter_user_transactions('fills'):
+            ...
+    """
+    def fetch(page_offset):
+        return asyncio.ensure_future(get_user_transactions(
+            category, currency_pair, offset=page_offset, limit=page_size))
+
+    future = fetch(offset)
+    try:
+        while future is not None:
+            page = await future
+            if not page:
+                future = None
+            else:
+                offset += len(page)
+                future = fetch(offset)
+
+            for transaction in page:
+                yield transaction
+    finally:
+        if future is not None:
+            future.cancel()
+
+
+async def get_wallet():
+    """See :func:`korbit.api.get_wallet`."""
+    token = await access_token()
+    return await get('user/wallet', access_token=token['access_token'],
+                     nonce=api.nonce())
+
+
+async def get_open_orders(order_type=None, currency_pair=None):
+    """See :func:`korbit.api.get_open_orders`."""
+    token = await access_token()
+    orders = await get('user/orders/open', access_token=token['access_token'],
+                       nonce=api.nonce(), currency_pair=currency_pair)
+
+    if order_type is not None:
+        orders = [x for x in orders if x['type'] == order_type]
+
+    return orders
+
+
+async def cancel_order(order_id, currency_pair=None):
+    """See :func:`korbit.api.cancel_order`."""
+    token = await access_token()
+    return await post('user/orders/cancel', access_token=token['access_token'],
+                      nonce=api.nonce(), id=order_id,
+                      currency_pair=currency_pair)
+
+
+async def cancel_orders(order_ids, currency_pair=None, batch_size=None):
+    """See :func:`korbit.api.cancel_orders`."""
+    order_ids = [str(x) for x in order_ids]
+    size = batch_size or max(len(order_ids), 1)
+    batches = [order_ids[i:i + size] for i in range(0, len(order_ids), size)]
+
+    async def cancel_batch(batch):
+        try:
+            return api.cancellation_report(
+                batch, await cancel_order(batch, currency_pair))
+        except Exception as e:
+            return e
+
+    report = {}
+    for batch in batches:
+        result = await cancel_batch(batch)
+        if isinstance(result, Exception):
+            result = await cancel_batch(batch)
+        if isinstance(result, Exception):
+            log.warning('Could not cancel {}: {}'.format(batch, result))
+            result = {order_id: 'error: {}'.format(result)
+                      for order_id in batch}
+        report.update(result)
+
+    return report
+
+
+async def cancel_all_orders(currency_pair=None, **kwargs):
+    """See :func:`korbit.api.cancel_all_orders`."""
+    orders = await get_open_orders(currency_pair=currency_pair)
+
+    return await cancel_orders([order['id'] for order in orders],
+                               currency_pair, **kwargs)
+
+
+async def place_order(order='buy', price=0.0, currency='krw', coin_amount=0.0,
+                      order_type='limit', fixed_point=False):
+    """See :func:`korbit.api.place_order`."""
+    # price must be an integer
+    price = int(price)
+    if fixed_point:
+        coin_amount = from_units(coin_amount, AMOUNT_DECIMALS)
+
+    log.info('Placing a {} order for {}BTC at {}{}'.format(
+             order, coin_amount, price, currency.upper()))
+
+    token = await access_token()
+    url = 'user/orders/{}'.format(order)
+    return await post(url, access_token=token['access_token'],
+                      nonce=api.nonce(), type=order_type, currency=currency,
+                      coin_amount=coin_amount, price=price)
@@ -1,97 +1,151 @@
 # -*- coding: utf-8 -*-
-from korbit.models import Order
+from korbit.auth import TokenManager, load_dict, store_dict  # noqa: F401
+from korbit.cache import ResponseCache
+from korbit.client import KorbitClient, PROD_URL
+from korbit.client import TEST_URL  # noqa: F401 (re-exported)
+from korbit.client import KorbitError  # noqa: F401 (re-exported)
+from korbit.fixedpoint import AMOUNT_DECIMALS, from_units
+from korbit.metrics import MetricsRegistry
+from korbit.order import Order
+from korbit.nonce import NonceGenerator
+from concurrent.futures import ThreadPoolExecutor
 from logbook import Logger
 from operator import attrgetter
-import json
-import requests
+import threading
 import time
-import sys
 import os
 
-PROD_URL = 'https://api.korbit.co.kr/v1'
-TEST_URL = 'https://api.korbit-test.com/v1'
 # BASE_URL = PROD_URL if os.environ.get('KORBIT_ENV') == 'prod' else TEST_URL
 BASE_URL = PROD_URL
 
 log = Logger('korbit')
 
 
-# FIXME: This shall be replaced with a more sophisticated caching mechanism
-# in the near future
-def load_dict(filename):
-    with open(filename, 'r') as f:
-        return json.loads(f.read())
+_default_client = None
+_defaults_lock = threading.Lock()
 
 
-def store_dict(filename, dic):
-    with open(filename, 'w') as f:
-        f.write(json.dumps(dic))
+def get_default_client():
+    """Returns the shared :class:`korbit.client.KorbitClient` that backs
+    :func:`get` and :func:`post`, creating it on first use."""
+    global _default_client
+
+    if _default_client is None:
+        with _defaults_lock:
+            if _default_client is None:
+                _default_client = KorbitClient(BASE_URL)
+
+    return _default_client
+
+
+def set_default_client(client):
+    """Replaces the shared client, e.g., to tune pool size or timeouts.
+
+    :type client: korbit.client.KorbitClient
+    """
+    global _default_client
+
+    with _defaults_lock:
+        previous, _default_client = _default_client, client
+
+    if previous is not None and previous is not client:
+        previous.close()
+
+
+def enable_cache(**kwargs):
+    """Turns on response caching for public endpoints of the default client.
+    Keyword arguments are passed to :class:`korbit.cache.ResponseCache`.
+
+    :rtype: korbit.cache.ResponseCache
+    """
+    cache = get_default_client().cache = ResponseCache(**kwargs)
+    return cache
+
+
+def disable_cache():
+    get_default_client().cache = None
+
+
+def enable_metrics(registry=None):
+    """Records per-endpoint latency, status codes, retries, payload sizes
+    and rate-limit headers of the default client.
+
+    :type registry: korbit.metrics.MetricsRegistry
+    :rtype: korbit.metrics.MetricsRegistry
+    """
+    if registry is None:
+        registry = MetricsRegistry()
+    get_default_client().hooks.append(registry)
+    return registry
+
+
+def disable_metrics():
+    """Detaches every :class:`korbit.metrics.MetricsRegistry` from the
+    default client; other hooks stay."""
+    client = get_default_client()
+    client.hooks = [h for h in client.hooks
+                    if not isinstance(h, MetricsRegistry)]
 
 
 def get(url_suffix, **params):
     """Initiates an HTTP GET request."""
-    url = '{}/{}'.format(BASE_URL, url_suffix)
-    res = requests.get(url, params=params)
-
-    # TODO: Refactor the following section to eliminate duplicated code
-    # TODO: Read all response headers and put them in the Exception object
-    if res.status_code == 200:
-        return json.loads(res.text)
-    else:
-        raise Exception('{}: {}'.format(res.status_code, str(res)))
+    return get_default_client().get(url_suffix, **params)
 
 
 def post(url_suffix, **post_data):
     """Initiates an HTTP POST request."""
-    url = '{}/{}'.format(BASE_URL, url_suffix)
+    return get_default_client().post(url_suffix, **post_data)
 
-    res = requests.post(url, data=post_data)
 
-    if res.status_code == 200:
-        return json.loads(res.text)
-    else:
-        raise Exception('{}: {} {}'.format(res.status_code, str(res.headers),
-                        str(res)))
+def request_token():
+    """Requests a new token."""
+    token_dict = post('oauth2/access_token',
+                      client_id=os.environ['KORBIT_API_KEY'],
+                      client_secret=os.environ['KORBIT_API_SECRET'],
+                      # username=os.environ['KORBIT_API_USERNAME'],
+                      # password=os.environ['KORBIT_API_PASSWORD'],
+                      grant_type='client_credentials')
 
+    token_dict['issued_at'] = time.time()  # current Unix time
 
-def access_token():
-    """Retrieves an access token."""
+    return token_dict
 
-    def has_expired(token_dict):
-        """Determines whether a token has expired."""
 
-        issued_at = token_dict['issued_at']
-        expires_in = token_dict['expires_in']
+_token_manager = None
 
-        return issued_at + expires_in < time.time()
 
-    def request_token():
-        """Requests a new token."""
-        token_dict = post('oauth2/access_token',
-                          client_id=os.environ['KORBIT_API_KEY'],
-                          client_secret=os.environ['KORBIT_API_SECRET'],
-                          # username=os.environ['KORBIT_API_USERNAME'],
-                          # password=os.environ['KORBIT_API_PASSWORD'],
-                          grant_type='client_credentials')
+def get_token_manager():
+    """Returns the process-wide :class:`korbit.auth.TokenManager`, which
+    persists tokens to ``token.json``."""
+    global _token_manager
 
-        token_dict['issued_at'] = time.time()  # current Unix time
+    if _token_manager is None:
+        with _defaults_lock:
+            if _token_manager is None:
+                _token_manager = TokenManager(request_token)
 
-        store_dict('token.json', token_dict)
+    return _token_manager
 
-        return token_dict
 
-    token_dict = None
+def set_token_manager(manager):
+    """Replaces the process-wide token manager, e.g., to change the token
+    file or disable persistence.
 
-    try:
-        # FIXME: This will cause an issue when the store token is expired
-        token_dict = load_dict('token.json')
+    :type manager: korbit.auth.TokenManager
+    """
+    global _token_manager
 
-        if has_expired(token_dict):
-            token_dict = request_token()
-    except:
-        token_dict = request_token()
+    with _defaults_lock:
+        previous, _token_manager = _token_manager, manager
 
-    return token_dict
+    if previous is not None and previous is not manager:
+        previous.close()
+
+
+def access_token():
+    """Retrieves an access token. The token is served from memory and
+    refreshed ahead of expiry (see :class:`korbit.auth.TokenManager`)."""
+    return get_token_manager().get()
 
 
 def nonce():
@@ -107,9 +161,39 @@ def nonce():
     요청의 Nonce값보다 새로 받은 요청의 Nonce값이 더 큰 경우에만 요청을
     처리한다. Nonce는 GET요청의 경우 URL에 parameter로 전달하고, POST요청의
     경우 body에 다른 파라미터와 함께 전달한다.
+
+    Nonces come from a :class:`korbit.nonce.NonceGenerator` and are strictly
+    increasing across threads. Set ``KORBIT_NONCE_FILE`` to share one
+    sequence among processes using the same API key.
     """
-    cast_function = int if sys.version > '3' else long
-    return cast_function(time.time() * 1000)
+    return get_nonce_generator()()
+
+
+_nonce_generator = None
+
+
+def get_nonce_generator():
+    """Returns the process-wide :class:`korbit.nonce.NonceGenerator`."""
+    global _nonce_generator
+
+    if _nonce_generator is None:
+        with _defaults_lock:
+            if _nonce_generator is None:
+                _nonce_generator = NonceGenerator(
+                    os.environ.get('KORBIT_NONCE_FILE'))
+
+    return _nonce_generator
+
+
+def set_nonce_generator(generator):
+    """Replaces the process-wide nonce generator.
+
+    :type generator: korbit.nonce.NonceGenerator
+    """
+    global _nonce_generator
+
+    with _defaults_lock:
+        _nonce_generator = generator
 
 
 def get_constants():
@@ -133,7 +217,13 @@ def get_constants():
     return get('constants')
 
 
-def get_orderbook(order_type=None):
+def get_currency_pairs():
+    """Lists the markets Korbit trades (``btc_krw``, ``eth_krw``, ...)."""
+    return sorted(get_constants()['exchange'])
+
+
+def get_orderbook(order_type=None, currency_pair='btc_krw', columnar=False,
+                  fixed_point=False):
     """Retrieves all open orders (public).
 
     Example results
@@ -166,13 +256,82 @@ def get_orderbook(order_type=None):
     * Second column represents the total quantity (BTC)
     * Third column represents the total number of orders of that price
 
+    :param order_type: ``None`` | ``bids`` | ``asks``
+    :param currency_pair: e.g., ``btc_krw``
+    :param columnar: If ``True``, returns a NumPy-backed
+        :class:`korbit.orderbook.OrderBook` (or one of its sides) instead of
+        lists of :class:`korbit.order.Order`
+    :param fixed_point: If ``True``, prices are integer KRW and amounts are
+        integer base units of 1e-8 coin (see :mod:`korbit.fixedpoint`)
     """
 
-    orderbook = get('orderbook')
-    orderbook['asks'] = [Order('ask', x) for x in orderbook['asks']]
+    return parse_orderbook(get('orderbook', currency_pair=currency_pair),
+                           order_type, columnar, fixed_point)
+
+
+def _fetch_all(func, currency_pairs, max_workers):
+    if currency_pairs is None:
+        currency_pairs = get_currency_pairs()
+    currency_pairs = list(currency_pairs)
+    if not currency_pairs:
+        return {}
+
+    if max_workers is None:
+        max_workers = get_default_client().pool_maxsize
+    max_workers = min(max_workers, len(currency_pairs))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(currency_pairs, executor.map(func, currency_pairs)))
+
+
+def get_orderbooks(currency_pairs=None, columnar=False, max_workers=None,
+                   fixed_point=False):
+    """Fetches the orderbooks of several markets concurrently over the
+    shared connection pool, so a full-market snapshot takes about one round
+    trip.
+
+    :param currency_pairs: Markets to fetch; all of them
+        (:func:`get_currency_pairs`) by default
+    :param columnar: See :func:`get_orderbook`
+    :param fixed_point: See :func:`get_orderbook`
+    :param max_workers: Concurrent requests; defaults to the pool size of
+        the default client
+    :return: A dictionary keyed by currency pair
+    """
+    return _fetch_all(
+        lambda pair: get_orderbook(currency_pair=pair, columnar=columnar,
+                                   fixed_point=fixed_point),
+        currency_pairs, max_workers)
+
+
+def get_tickers(currency_pairs=None, max_workers=None):
+    """Fetches the tickers of several markets concurrently. See
+    :func:`get_orderbooks`.
+
+    :return: A dictionary keyed by currency pair
+    """
+    return _fetch_all(get_ticker, currency_pairs, max_workers)
+
+
+def parse_orderbook(orderbook, order_type=None, columnar=False,
+                    fixed_point=False):
+    """Converts a raw orderbook response into sorted lists of
+    :class:`korbit.order.Order` (see :func:`get_orderbook`). ``orderbook``
+    itself is left untouched."""
+    if columnar:
+        # NumPy is only loaded by callers asking for columnar books
+        from korbit.orderbook import OrderBook
+
+        book = OrderBook.from_raw(orderbook, fixed_point)
+        return book[order_type] if order_type in ('bids', 'asks') else book
+
+    orderbook = dict(orderbook)
+    orderbook['asks'] = [Order('ask', x, fixed_point=fixed_point)
+                         for x in orderbook['asks']]
     orderbook['asks'].sort(key=attrgetter('price'))
 
-    orderbook['bids'] = [Order('bid', x) for x in orderbook['bids']]
+    orderbook['bids'] = [Order('bid', x, fixed_point=fixed_point)
+                         for x in orderbook['bids']]
     orderbook['bids'].sort(key=attrgetter('price'), reverse=True)
 
     if order_type in ('bids', 'asks'):
@@ -217,7 +376,7 @@ def get_detailed_ticker_all():
     return get('ticker/detailed/all')
 
 
-def get_transactions(_time='hour'):
+def get_transactions(_time='hour', numeric=False):
     """
     :param _time: The time period you want to query. If this parameter is
     specified as 'minute', it queries data within the last minute, 'hour' means
@@ -240,8 +399,23 @@ def get_transactions(_time='hour'):
             {"timestamp":1389462920000,"tid":"22542","price":"578000","amount":"0.33652000"},
             ...
         ]
+
+    :param numeric: If ``True``, returns a NumPy array of
+        :data:`korbit.tickstore.TICK_DTYPE` sorted by time, with prices and
+        amounts converted in bulk
     """
-    return get('transactions', time=_time)
+    return parse_transactions(get('transactions', time=_time), numeric)
+
+
+def parse_transactions(transactions, numeric=False):
+    """See :func:`get_transactions`."""
+    if not numeric:
+        return transactions
+
+    # NumPy is only loaded by callers asking for numeric arrays
+    from korbit.tickstore import transactions_to_ticks
+
+    return transactions_to_ticks(transactions)
 
 
 def get_user_info():
@@ -250,14 +424,74 @@ def get_user_info():
                nonce=nonce())
 
 
-# TODO: Is it possible to get more than 10 transactions at a time?
-def get_user_transactions(category=None):
-    """Retrieves user transactions.
-    :param category: fills | fiats | coins
+#: Largest page :func:`get_user_transactions` accepts
+USER_TRANSACTIONS_PAGE_SIZE = 40
+
+
+def get_user_transactions(category=None, currency_pair=None, offset=None,
+                          limit=None):
+    """Retrieves one page of user transactions, newest first. The server
+    returns 10 records unless ``limit`` says otherwise. See
+    :func:`iter_user_transactions` to walk the full history.
+
+    :param category: ``fills`` | ``fiats`` | ``coins``
+    :param currency_pair: e.g., ``btc_krw``
+    :param offset: Number of records to skip
+    :param limit: Page size, up to :data:`USER_TRANSACTIONS_PAGE_SIZE`
     """
     token = access_token()
     return get('user/transactions', access_token=token['access_token'],
-               nonce=nonce())
+               nonce=nonce(), category=category, currency_pair=currency_pair,
+               offset=offset, limit=limit)
+
+
+def iter_user_transactions(category=None, currency_pair=None, offset=0,
+                           page_size=USER_TRANSACTIONS_PAGE_SIZE,
+                           prefetch=True):
+    """Lazily walks the full transaction history, newest first.
+
+    Pages are requested with ``offset``/``limit`` until one comes back
+    empty, since the server may return fewer records than asked for. With
+    ``prefetch``, the next page is fetched on a background thread while the
+    caller processes the current one, and at most two pages are held in
+    memory.
+
+    .. code-block:: python
+
+        for transaction in iter_user_transactions('fills'):
+            ...
+
+    :param category: ``fills`` | ``fiats`` | ``coins``
+    :param currency_pair: e.g., ``btc_krw``
+    :param offset: Number of records to skip
+    :param page_size: Records per request
+    :param prefetch: Whether to fetch the next page ahead of time
+    """
+    def fetch(page_offset):
+        return get_user_transactions(category, currency_pair,
+                                     offset=page_offset, limit=page_size)
+
+    if not prefetch:
+        while True:
+            page = fetch(offset)
+            if not page:
+                return
+            for transaction in page:
+                yield transaction
+            offset += len(page)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(fetch, offset)
+        while future is not None:
+            page = future.result()
+            if not page:
+                future = None
+            else:
+                offset += len(page)
+                future = executor.submit(fetch, offset)
+
+            for transaction in page:
+                yield transaction
 
 
 def get_wallet():
@@ -298,10 +532,11 @@ def get_wallet():
                nonce=nonce())
 
 
-def get_open_orders(order_type):
+def get_open_orders(order_type=None, currency_pair=None):
     """Retrieves open orders.
 
     :param order_type: ``None`` | ``bid`` | ``ask``
+    :param currency_pair: e.g., ``btc_krw``
 
     Example results
 
@@ -347,31 +582,88 @@ def get_open_orders(order_type):
     """
     token = access_token()
     orders = get('user/orders/open', access_token=token['access_token'],
-                 nonce=nonce())
+                 nonce=nonce(), currency_pair=currency_pair)
 
     if order_type is not None:
-        orders = filter(lambda x: x['type'] == order_type, orders)
+        orders = [x for x in orders if x['type'] == order_type]
 
     return orders
 
 
-def cancel_order(order_id):
+def cancel_order(order_id, currency_pair=None):
+    """Cancels one order, or several if ``order_id`` is a list. See
+    :func:`cancel_orders` for a per-order report."""
     token = access_token()
     return post('user/orders/cancel', access_token=token['access_token'],
-                nonce=nonce(), id=order_id)
+                nonce=nonce(), id=order_id, currency_pair=currency_pair)
+
+
+def cancellation_report(order_ids, response):
+    """Maps each order id to the status Korbit reported for it, e.g.,
+    ``success`` or ``not_found``."""
+    if isinstance(response, dict):
+        response = [response]
 
+    report = {order_id: 'unknown' for order_id in order_ids}
+    for result in response:
+        report[str(result.get('orderId'))] = result.get('status')
+    return report
 
-def cancel_all_orders():
-    """Cancel all open orders.
-    TODO: Needs to be revised. Korbit provides an API call to cancel multiple
-    orders."""
-    orders = get_open_orders()
 
-    return map(cancel_order, [order['id'] for order in orders])
+def cancel_orders(order_ids, currency_pair=None, batch_size=None):
+    """Cancels many orders with Korbit's multi-id cancel request.
+
+    By default all ids go out in a single request, i.e., one round-trip.
+    With ``batch_size``, batches are sent one after another rather than
+    concurrently: the server only accepts a nonce larger than the last one
+    it saw, so concurrent batches would overtake each other and be
+    rejected. A failed batch is retried once.
+
+    :param order_ids: Ids of the orders to cancel
+    :param currency_pair: e.g., ``btc_krw``
+    :param batch_size: Maximum ids per request, or ``None`` for no limit
+    :return: A dictionary mapping each order id (as a string) to its status,
+        or to ``error: ...`` if its batch failed twice
+    """
+    order_ids = [str(x) for x in order_ids]
+    size = batch_size or max(len(order_ids), 1)
+    batches = [order_ids[i:i + size] for i in range(0, len(order_ids), size)]
+
+    def cancel_batch(batch):
+        try:
+            return cancellation_report(
+                batch, cancel_order(batch, currency_pair))
+        except Exception as e:
+            return e
+
+    report = {}
+    for batch in batches:
+        result = cancel_batch(batch)
+        if isinstance(result, Exception):
+            result = cancel_batch(batch)
+        if isinstance(result, Exception):
+            log.warning('Could not cancel {}: {}'.format(batch, result))
+            result = {order_id: 'error: {}'.format(result)
+                      for order_id in batch}
+        report.update(result)
+
+    return report
+
+
+def cancel_all_orders(currency_pair=None, **kwargs):
+    """Cancels all open orders. Keyword arguments are passed to
+    :func:`cancel_orders`.
+
+    :return: A dictionary mapping each order id to its cancellation status
+    """
+    orders = get_open_orders(currency_pair=currency_pair)
+
+    return cancel_orders([order['id'] for order in orders], currency_pair,
+                         **kwargs)
 
 
 def place_order(order='buy', price=0.0, currency='krw', coin_amount=0.0,
-                order_type='limit'):
+                order_type='limit', fixed_point=False):
     """Place an order.
 
     :param order: ``buy`` | ``sell``
@@ -381,9 +673,13 @@ def place_order(order='buy', price=0.0, currency='krw', coin_amount=0.0,
     :param coin_amount: Number of coin to buy/sell. This can be a fraction.
     :param order_type: ``limit`` (at a specified price) | ``market`` (at the
                        market price)
+    :param fixed_point: If ``True``, ``coin_amount`` is an integer count of
+                        1e-8 coin and is sent as an exact decimal string
     """
     # price must be an integer
     price = int(price)
+    if fixed_point:
+        coin_amount = from_units(coin_amount, AMOUNT_DECIMALS)
 
     log.info('Placing a {} order for {}BTC at {}{}'.format(
              order, coin_amount, price, currency.upper()))
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""A compact, seekable archive of orderbook snapshots.
+
+Instead of one JSON document per :func:`korbit.api.get_orderbook` call, the
+archive stores a full keyframe every ``keyframe_interval`` snapshots and
+only the changed price levels (see :class:`korbit.orderbook.LevelChange`)
+in between, each record compressed with :mod:`zlib` or :mod:`lzma`.
+
+Two files make up an archive: the records themselves (``path``) and a
+fixed-width index of record timestamps and offsets (``path + '.idx'``).
+Rebuilding the book at any moment reads one keyframe and the deltas after
+it, found by binary search over the index.
+
+.. code-block:: python
+
+    with OrderBookArchive('btc_krw.obk') as archive:
+        while True:
+            archive.append(get('orderbook', currency_pair='btc_krw'))
+
+    archive = OrderBookArchive('btc_krw.obk')
+    book = archive.book_at(1386135077000)
+    book.best_bid, book.best_ask
+    for book, changes in archive.replay(start, end):
+        ...
+"""
+from bisect import bisect_right
+from korbit.orderbook import LevelChange, LocalOrderBook
+import lzma
+import os
+import struct
+import threading
+import zlib
+
+MAGIC = b'KOBA'
+VERSION = 1
+
+COMPRESSIONS = ('zlib', 'lzma', 'none')
+
+KEYFRAME = 0
+DELTA = 1
+
+_HEADER = struct.Struct('<4sBBB')    # magic, version, compression, fixed
+_INDEX = struct.Struct('<qQB')       # timestamp, offset, kind
+_LENGTH = struct.Struct('<I')
+_RECORD = struct.Struct('<qBI')      # timestamp, kind, number of levels
+_FLOAT_LEVEL = struct.Struct('<Bddi')  # side, price, amount, count
+_FIXED_LEVEL = struct.Struct('<Bqqi')
+
+_SIDES = ('bids', 'asks')
+
+
+def _compress(data, compression):
+    if compression == 'zlib':
+        return zlib.compress(data, 6)
+    elif compression == 'lzma':
+        return lzma.compress(data)
+    return data
+
+
+def _decompress(data, compression):
+    if compression == 'zlib':
+        return zlib.decompress(data)
+    elif compression == 'lzma':
+        return lzma.decompress(data)
+    return data
+
+
+class OrderBookArchive(object):
+    """Appends orderbook snapshots as keyframes and deltas, and rebuilds the
+    book at any recorded moment.
+
+    The archive assumes a single writer; readers in other processes see
+    each snapshot once :meth:`append` returns. A writer's first append drops
+    whatever an interrupted earlier writer left after the last complete
+    snapshot.
+    """
+
+    def __init__(self, path, keyframe_interval=100, compression='zlib',
+                 fixed_point=False):
+        """Default initializer. An existing archive keeps the compression
+        and number format it was created with.
+
+        :param path: Record file; the index lives next to it
+        :param keyframe_interval: Snapshots per keyframe. Lower values make
+            seeking faster and the archive larger.
+        :param compression: ``zlib`` | ``lzma`` | ``none``
+        :param fixed_point: Store integer prices and amounts (see
+            :mod:`korbit.fixedpoint`) instead of floats
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError('Unsupported compression: {}'.format(
+                compression))
+
+        self.path = path
+        self.index_path = path + '.idx'
+        self.keyframe_interval = keyframe_interval
+        self.compression = compression
+        self.fixed_point = fixed_point
+
+        self._lock = threading.Lock()
+        self._timestamps = []
+        self._offsets = []
+        self._keyframes = []  # positions of keyframes in the index
+        self._index_size = 0
+        self._writer = None   # LocalOrderBook mirroring the last record
+
+        if os.path.exists(path) and os.path.getsize(path):
+            self._read_header()
+        else:
+            with open(path, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, VERSION,
+                                     COMPRESSIONS.index(compression),
+                                     int(fixed_point)))
+            open(self.index_path, 'wb').close()
+
+        self._level = _FIXED_LEVEL if self.fixed_point else _FLOAT_LEVEL
+        self._data = open(path, 'ab')
+        self._index = open(self.index_path, 'ab')
+
+    def _read_header(self):
+        with open(self.path, 'rb') as f:
+            magic, version, compression, fixed = _HEADER.unpack(
+                f.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not an orderbook archive'.format(
+                self.path))
+        self.compression = COMPRESSIONS[compression]
+        self.fixed_point = bool(fixed)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        self._refresh_index()
+        return len(self._timestamps)
+
+    def __repr__(self):
+        return 'OrderBookArchive ({}, {} snapshots)'.format(
+            self.path, len(self))
+
+    def close(self):
+        with self._lock:
+            self._data.close()
+            self._index.close()
+
+    def timestamps(self):
+        """Timestamps of all archived snapshots."""
+        self._refresh_index()
+        return list(self._timestamps)
+
+    def _refresh_index(self):
+        """Loads index entries written since the last call, including ones
+        written by another process."""
+        size = os.path.getsize(self.index_path)
+        if size == self._index_size:
+            return
+
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._index_size)
+            data = f.read(size - self._index_size)
+
+        usable = len(data) - len(data) % _INDEX.size
+        for timestamp, offset, kind in _INDEX.iter_unpack(data[:usable]):
+            if kind == KEYFRAME:
+                self._keyframes.append(len(self._timestamps))
+            self._timestamps.append(timestamp)
+            self._offsets.append(offset)
+        self._index_size += usable
+
+    def _truncate_partial(self):
+        """Cuts both files back to the last indexed record, so a torn index
+        entry or record does not misalign everything appended after it."""
+        if self._offsets:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offsets[-1])
+                length, = _LENGTH.unpack(f.read(_LENGTH.size))
+            end = self._offsets[-1] + _LENGTH.size + length
+        else:
+            end = _HEADER.size
+
+        for f, size in ((self._index, self._index_size), (self._data, end)):
+            f.truncate(size)
+            f.seek(0, os.SEEK_END)
+
+    def append(self, snapshot):
+        """Archives a snapshot: a raw :func:`korbit.api.get_orderbook`
+        response or a :class:`korbit.orderbook.OrderBook`.
+
+        :return: Number of price levels written
+        :raises ValueError: if the snapshot is older than the last one
+        """
+        with self._lock:
+            self._refresh_index()
+            if self._timestamps and \
+                    snapshot['timestamp'] < self._timestamps[-1]:
+                raise ValueError('Snapshots must be appended in time order')
+
+            if self._writer is None:
+                self._truncate_partial()
+                self._writer = self._book_at_position(
+                    len(self._timestamps) - 1)
+            changes = self._writer.update(snapshot)
+
+            since_keyframe = len(self._timestamps) - self._keyframes[-1] \
+                if self._keyframes else None
+            if since_keyframe is None or \
+                    since_keyframe >= self.keyframe_interval:
+                kind = KEYFRAME
+                levels = [(side, price, amount, count)
+                          for side in _SIDES
+                          for price, (amount, count)
+                          in getattr(self._writer, side).items()]
+            else:
+                kind = DELTA
+                levels = [(c.side, c.price, c.new_amount, c.new_count)
+                          for c in changes]
+
+            self._write(self._writer.timestamp, kind, levels)
+            return len(levels)
+
+    def extend(self, snapshots):
+        """Archives several snapshots, e.g., a day of JSON archives.
+
+        :return: Number of snapshots archived
+        """
+        count = 0
+        for snapshot in snapshots:
+            self.append(snapshot)
+            count += 1
+        return count
+
+    def _write(self, timestamp, kind, levels):
+        removed = -1 if self.fixed_point else float('nan')
+        parts = [_RECORD.pack(timestamp, kind, len(levels))]
+        for side, price, amount, count in levels:
+            if amount is None:
+                amount, count = removed, -1
+            parts.append(self._level.pack(_SIDES.index(side), price, amount,
+                                          count))
+
+        blob = _compress(b''.join(parts), self.compression)
+        offset = self._data.tell()
+        self._data.write(_LENGTH.pack(len(blob)) + blob)
+        self._data.flush()
+
+        # The index is written last, so readers never see a partial record
+        self._index.write(_INDEX.pack(timestamp, offset, kind))
+        self._index.flush()
+
+    def _read(self, f, offset):
+        f.seek(offset)
+        length, = _LENGTH.unpack(f.read(_LENGTH.size))
+        data = _decompress(f.read(length), self.compression)
+
+        timestamp, kind, count = _RECORD.unpack_from(data)
+        levels = []
+        for side, price, amount, level_count in self._level.iter_unpack(
+                data[_RECORD.size:_RECORD.size + count * self._level.size]):
+            if level_count < 0:
+                amount = level_count = None
+            levels.append((_SIDES[side], price, amount, level_count))
+        return timestamp, kind, levels
+
+    @staticmethod
+    def _apply(book, timestamp, kind, levels):
+        """Applies one record and returns the changes it made."""
+        if kind == KEYFRAME:
+            previous = {side: dict(getattr(book, side)) for side in _SIDES}
+            for side in _SIDES:
+                getattr(book, side).clear()
+        else:
+            previous = None
+
+        changes = []
+        for side, price, amount, count in levels:
+            if previous is not None:
+                old = previous[side].pop(price, None)
+            else:
+                old = getattr(book, side).get(price)
+            if old is not None and (amount, count) == old:
+                getattr(book, side)[price] = old
+                continue
+            changes.append(LevelChange(
+                side, price, old[0] if old else None, amount,
+                old[1] if old else None, count))
+
+        # A keyframe drops levels it does not list
+        if previous is not None:
+            for side in _SIDES:
+                for price, (amount, count) in previous[side].items():
+                    changes.append(LevelChange(side, price, amount, None,
+                                               count, None))
+
+        book.apply(changes, timestamp)
+        return changes
+
+    def _book_at_position(self, position):
+        book = LocalOrderBook(fixed_point=self.fixed_point)
+        if position < 0:
+            return book
+
+        first = self._keyframes[bisect_right(self._keyframes, position) - 1]
+        with open(self.path, 'rb') as f:
+            for i in range(first, position + 1):
+                self._apply(book, *self._read(f, self._offsets[i]))
+        return book
+
+    def book_at(self, timestamp):
+        """Rebuilds the book as of the last snapshot at or before
+        ``timestamp`` (Unix milliseconds).
+
+        :rtype: korbit.orderbook.LocalOrderBook
+        :raises KeyError: if ``timestamp`` precedes the archive
+        """
+        self._refresh_index()
+        position = bisect_right(self._timestamps, timestamp) - 1
+        if position < 0:
+            raise KeyError('No snapshot at or before {}'.format(timestamp))
+        return self._book_at_position(position)
+
+    def replay(self, start=None, end=None):
+        """Yields ``(book, changes)`` for every snapshot with
+        ``start <= timestamp < end``. ``book`` is one
+        :class:`korbit.orderbook.LocalOrderBook` updated in place, so copy
+        it (e.g., :meth:`~korbit.orderbook.LocalOrderBook.to_order_book`)
+        to keep a state."""
+        self._refresh_index()
+        first = 0 if start is None else \
+            bisect_right(self._timestamps, start - 1)
+        last = len(self._timestamps) if end is None else \
+            bisect_right(self._timestamps, end - 1)
+        if first >= last:
+            return
+
+        book = self._book_at_position(first - 1) if first else \
+            LocalOrderBook(fixed_point=self.fixed_point)
+        with open(self.path, 'rb') as f:
+            for i in range(first, last):
+                changes = self._apply(book, *self._read(f, self._offsets[i]))
+                yield book, changes
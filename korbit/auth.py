@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+from logbook import Logger
+import json
+import os
+import threading
+import time
+
+log = Logger('korbit.auth')
+
+
+def load_dict(filename):
+    with open(filename, 'r') as f:
+        return json.loads(f.read())
+
+
+def store_dict(filename, dic):
+    """Writes ``dic`` as JSON, atomically replacing ``filename`` so that
+    concurrent readers never observe a partially written file."""
+    tmp = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(tmp, 'w') as f:
+        f.write(json.dumps(dic))
+    os.replace(tmp, filename)
+
+
+def expires_at(token_dict):
+    """Unix time at which a token expires."""
+    return token_dict['issued_at'] + token_dict['expires_in']
+
+
+class _Refresh(object):
+    """A refresh in flight. Callers that arrive while it runs wait on it
+    instead of requesting a token of their own."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.token = None
+        self.error = None
+
+
+class TokenManager(object):
+    """Keeps an access token in memory and refreshes it before it expires.
+
+    * :meth:`get` returns the in-memory token without touching the disk
+      while it is fresh.
+    * Concurrent callers needing a new token wait on a single refresh.
+    * A daemon timer refreshes the token ``refresh_margin`` seconds ahead of
+      expiry. Meanwhile :meth:`get` keeps returning the old token until it
+      actually expires, so the hot path rarely waits at all.
+    * ``path`` is an optional persistence layer: it is read once on first
+      use and rewritten after every refresh.
+    """
+
+    def __init__(self, request_token, path='token.json', refresh_margin=60,
+                 background=True):
+        """Default initializer.
+
+        :param request_token: A callable returning a new token dictionary
+            with ``issued_at`` (Unix time) and ``expires_in`` (seconds) keys
+        :param path: Token file, or ``None`` to keep the token in memory only
+        :param refresh_margin: Seconds before expiry at which a token is
+            considered stale
+        :param background: Whether to refresh ahead of expiry on a timer
+        """
+        self.request_token = request_token
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.background = background
+
+        self._token = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._refresh = None
+        self._timer = None
+
+    def is_fresh(self, token_dict):
+        return token_dict is not None and \
+            expires_at(token_dict) - self.refresh_margin > time.time()
+
+    def current(self):
+        """Returns the in-memory token if it is fresh, ``None`` otherwise.
+        Never blocks."""
+        token_dict = self._token
+        return token_dict if self.is_fresh(token_dict) else None
+
+    def get(self):
+        """Returns a fresh token, refreshing it first if necessary. While a
+        refresh is in flight, a stale token that has not expired yet is
+        returned without waiting."""
+        token_dict = self._token
+        if self.is_fresh(token_dict):
+            return token_dict
+
+        if self._refresh is not None and token_dict is not None and \
+                expires_at(token_dict) > time.time():
+            return token_dict
+
+        return self.refresh(stale=token_dict)
+
+    def refresh(self, stale=None):
+        """Requests a new token unless another caller already replaced
+        ``stale`` with a fresh one. Concurrent callers share one request.
+        """
+        with self._lock:
+            loaded = not self._loaded
+            if loaded:
+                self._loaded = True
+                self._token = self._load()
+
+            if self._token is not stale and self.is_fresh(self._token):
+                if loaded:
+                    self._schedule(self._token)
+                return self._token
+
+            refresh = self._refresh
+            leader = refresh is None
+            if leader:
+                refresh = self._refresh = _Refresh()
+
+        if not leader:
+            refresh.done.wait()
+            if refresh.error is not None:
+                raise refresh.error
+            return refresh.token
+
+        try:
+            refresh.token = token_dict = self.request_token()
+            self._store(token_dict)
+        except Exception as e:
+            refresh.error = e
+            raise
+        finally:
+            with self._lock:
+                if refresh.error is None:
+                    self._token = refresh.token
+                self._refresh = None
+            refresh.done.set()
+
+        self._schedule(token_dict)
+        return token_dict
+
+    def close(self):
+        """Cancels the background refresh timer."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _load(self):
+        if self.path is None:
+            return None
+        try:
+            token_dict = load_dict(self.path)
+            expires_at(token_dict)
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None
+
+        return token_dict
+
+    def _store(self, token_dict):
+        if self.path is None:
+            return
+        try:
+            store_dict(self.path, token_dict)
+        except (IOError, OSError) as e:
+            log.warning('Could not persist the access token: {}'.format(e))
+
+    def _schedule(self, token_dict):
+        if not self.background:
+            return
+
+        delay = expires_at(token_dict) - self.refresh_margin - time.time()
+        timer = threading.Timer(max(delay, 0), self._refresh_in_background,
+                                args=(token_dict,))
+        timer.daemon = True
+
+        previous, self._timer = self._timer, timer
+        if previous is not None:
+            previous.cancel()
+        timer.start()
+
+    def _refresh_in_background(self, stale):
+        try:
+            self.refresh(stale=stale)
+        except Exception as e:
+            log.warning('Background token refresh failed: {}'.format(e))
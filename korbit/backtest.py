@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""Vectorized backtesting over tick and orderbook arrays.
+
+A strategy is a function ``strategy(ticks, depth, **params)`` returning an
+array of :data:`ORDER_DTYPE` orders, all at once. :func:`simulate_fills`
+fills them in chunks against the recorded book depth (or against the last
+trade price when no depth is given), and :class:`BacktestResult` turns the
+fills into positions, cash and mark-to-market equity with NumPy, so a
+parameter sweep costs a few array passes per combination.
+:func:`grid_search` spreads the combinations over a process pool.
+
+.. code-block:: python
+
+    def crossover(ticks, depth, fast=10, slow=60, size=0.1):
+        prices = ticks['price']
+        fast_ma = moving_average(prices, fast)
+        slow_ma = moving_average(prices, slow)
+        targets = np.where(fast_ma > slow_ma, size, 0.0)
+        return orders_from_targets(ticks['timestamp'], targets)
+
+    fee = fee_rate(get_constants())
+    results = grid_search(crossover, store.read(), {'fast': [5, 10, 20],
+                                                    'slow': [60, 120]},
+                          depth=depth, fee=fee)
+
+Simulated orders take liquidity immediately and each one sees the full
+recorded book: earlier simulated fills do not deplete it, and balances are
+not checked (positions may go negative).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import numpy as np
+
+#: Orders emitted by strategies. ``side`` is :data:`BUY` or :data:`SELL`;
+#: ``limit`` is the worst acceptable price, or NaN for a market order.
+ORDER_DTYPE = np.dtype([('timestamp', '<i8'), ('side', 'i1'),
+                        ('amount', '<f8'), ('limit', '<f8')])
+
+#: Simulated fills; ``price`` is the average fill price (NaN if nothing was
+#: filled) and ``fee`` is in KRW
+FILL_DTYPE = np.dtype([('timestamp', '<i8'), ('side', 'i1'),
+                       ('amount', '<f8'), ('filled', '<f8'),
+                       ('price', '<f8'), ('fee', '<f8')])
+
+BUY = 1
+SELL = -1
+
+
+def fee_rate(constants, currency_pair='btc_krw'):
+    """Reads the trading fee rate from a :func:`korbit.api.get_constants`
+    response: a per-market ``taker_fee`` or ``fee`` under ``exchange`` if
+    present, the global ``transactionFee`` otherwise."""
+    market = (constants.get('exchange') or {}).get(currency_pair) or {}
+    for key in ('taker_fee', 'fee'):
+        if key in market:
+            return float(market[key])
+    return float(constants.get('transactionFee', 0))
+
+
+def moving_average(values, window):
+    """Trailing simple moving average; the first ``window - 1`` values
+    average over what is available."""
+    cumulative = np.cumsum(np.asarray(values, dtype=np.float64))
+    averages = cumulative.copy()
+    averages[window:] = cumulative[window:] - cumulative[:-window]
+    counts = np.minimum(np.arange(1, len(cumulative) + 1), window)
+    return averages / counts
+
+
+def orders_from_targets(timestamps, targets):
+    """Turns a target position series into the market orders reaching it,
+    one wherever the target changes."""
+    targets = np.asarray(targets, dtype=np.float64)
+    changes = np.diff(targets, prepend=0.0)
+    at = np.flatnonzero(changes)
+
+    orders = np.empty(len(at), dtype=ORDER_DTYPE)
+    orders['timestamp'] = np.asarray(timestamps)[at]
+    orders['side'] = np.where(changes[at] > 0, BUY, SELL)
+    orders['amount'] = np.abs(changes[at])
+    orders['limit'] = np.nan
+    return orders
+
+
+class Depth(object):
+    """The top levels of successive orderbook snapshots as 2-D arrays
+    (snapshot by level), best level first. Missing levels have zero price
+    and amount."""
+
+    def __init__(self, timestamps, bid_prices, bid_amounts, ask_prices,
+                 ask_amounts):
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.bid_prices = bid_prices
+        self.bid_amounts = bid_amounts
+        self.ask_prices = ask_prices
+        self.ask_amounts = ask_amounts
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __repr__(self):
+        return 'Depth ({} snapshots, {} levels)'.format(
+            len(self), self.bid_prices.shape[1])
+
+    @classmethod
+    def from_books(cls, books, levels=10):
+        """Builds the arrays from :class:`korbit.orderbook.OrderBook`
+        objects or raw :func:`korbit.api.get_orderbook` responses, in time
+        order."""
+        from korbit.fixedpoint import AMOUNT_DECIMALS
+        from korbit.orderbook import OrderBook
+
+        books = [b if isinstance(b, OrderBook) else OrderBook.from_raw(b)
+                 for b in books]
+        shape = len(books), levels
+        arrays = [np.zeros(shape) for _ in range(4)]
+        bid_prices, bid_amounts, ask_prices, ask_amounts = arrays
+
+        for i, book in enumerate(books):
+            sides = ((book.bids, bid_prices, bid_amounts),
+                     (book.asks, ask_prices, ask_amounts))
+            for side, prices, amounts in sides:
+                n = min(levels, len(side))
+                scale = 10 ** AMOUNT_DECIMALS if side.fixed_point else 1
+                prices[i, :n] = side.prices[:n]
+                amounts[i, :n] = side.amounts[:n] / scale
+
+        return cls([b.timestamp for b in books], *arrays)
+
+
+def _limit_ok(buy, prices, limits):
+    return np.isnan(limits) | np.where(buy, prices <= limits,
+                                       prices >= limits)
+
+
+def _fill_depth(orders, depth):
+    index = np.searchsorted(depth.timestamps, orders['timestamp'],
+                            side='right') - 1
+    known = (index >= 0)[:, None]
+    index = np.maximum(index, 0)
+
+    buy = (orders['side'] == BUY)[:, None]
+    prices = np.where(buy, depth.ask_prices[index], depth.bid_prices[index])
+    amounts = np.where(buy, depth.ask_amounts[index],
+                       depth.bid_amounts[index])
+    amounts = np.where(
+        known & _limit_ok(buy, prices, orders['limit'][:, None]), amounts, 0)
+
+    # Walk the book as BookSide.fill does, for every order at once
+    cumulative = np.cumsum(amounts, axis=1)
+    taken = np.clip(orders['amount'][:, None] - (cumulative - amounts), 0,
+                    amounts)
+    filled = taken.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        price = np.where(filled > 0, (taken * prices).sum(axis=1) / filled,
+                         np.nan)
+    return filled, price
+
+
+def _fill_ticks(orders, ticks):
+    index = np.searchsorted(ticks['timestamp'], orders['timestamp'],
+                            side='right') - 1
+    prices = ticks['price'][np.maximum(index, 0)]
+    ok = (index >= 0) & _limit_ok(orders['side'] == BUY, prices,
+                                  orders['limit'])
+    return np.where(ok, orders['amount'], 0.0), np.where(ok, prices, np.nan)
+
+
+def simulate_fills(orders, depth=None, ticks=None, fee=0.0,
+                   chunk_size=100000):
+    """Fills orders against recorded depth.
+
+    :param orders: An array of :data:`ORDER_DTYPE`
+    :param depth: A :class:`Depth`; each order walks the latest snapshot at
+        or before its timestamp, and may be partially filled
+    :param ticks: Used instead when ``depth`` is ``None``: orders fill
+        entirely at the last trade price, if within their limit
+    :param fee: Fee rate charged on the KRW value of each fill
+    :param chunk_size: Orders filled per vectorized pass, bounding memory
+    :return: An array of :data:`FILL_DTYPE`
+    """
+    if depth is None and ticks is None:
+        raise ValueError('Either depth or ticks must be given')
+
+    orders = np.asarray(orders, dtype=ORDER_DTYPE)
+    fills = np.zeros(len(orders), dtype=FILL_DTYPE)
+    for name in ('timestamp', 'side', 'amount'):
+        fills[name] = orders[name]
+
+    for start in range(0, len(orders), chunk_size):
+        chunk = orders[start:start + chunk_size]
+        if depth is not None:
+            filled, price = _fill_depth(chunk, depth)
+        else:
+            filled, price = _fill_ticks(chunk, ticks)
+        fills['filled'][start:start + len(chunk)] = filled
+        fills['price'][start:start + len(chunk)] = price
+
+    fills['fee'] = np.where(fills['filled'] > 0,
+                            fills['filled'] * fills['price'] * fee, 0.0)
+    return fills
+
+
+class BacktestResult(object):
+    """Positions and cash implied by a series of fills, starting flat."""
+
+    def __init__(self, fills):
+        self.fills = fills
+        signed = fills['side'] * fills['filled']
+        value = np.where(fills['filled'] > 0, signed * fills['price'], 0.0)
+        #: Coin position after each fill
+        self.positions = np.cumsum(signed)
+        #: KRW balance after each fill, net of fees
+        self.cash = -np.cumsum(value) - np.cumsum(fills['fee'])
+
+    def __repr__(self):
+        return 'BacktestResult ({} fills)'.format(len(self.fills))
+
+    @property
+    def position(self):
+        return float(self.positions[-1]) if len(self.fills) else 0.0
+
+    @property
+    def fees(self):
+        return float(self.fills['fee'].sum())
+
+    @property
+    def trades(self):
+        return int(np.count_nonzero(self.fills['filled']))
+
+    def equity(self, ticks):
+        """Mark-to-market value (cash plus position at the last trade
+        price) at every tick."""
+        if not len(self.fills):
+            return np.zeros(len(ticks))
+
+        index = np.searchsorted(self.fills['timestamp'], ticks['timestamp'],
+                                side='right') - 1
+        started = index >= 0
+        index = np.maximum(index, 0)
+        return np.where(started, self.cash[index] +
+                        self.positions[index] * ticks['price'], 0.0)
+
+    def summary(self, ticks):
+        """Headline figures, marked to market at the ticks."""
+        equity = self.equity(ticks)
+        drawdown = np.maximum.accumulate(np.r_[0.0, equity])[1:] - equity \
+            if len(equity) else np.zeros(1)
+        return {
+            'pnl': float(equity[-1]) if len(equity) else 0.0,
+            'max_drawdown': float(drawdown.max()),
+            'fees': self.fees,
+            'trades': self.trades,
+            'volume': float(self.fills['filled'].sum()),
+            'position': self.position,
+        }
+
+
+def backtest(strategy, ticks, depth=None, fee=0.0, **params):
+    """Runs ``strategy(ticks, depth, **params)`` and fills its orders.
+
+    :rtype: BacktestResult
+    """
+    orders = strategy(ticks, depth, **params)
+    return BacktestResult(simulate_fills(orders, depth, ticks, fee))
+
+
+_worker = None
+
+
+def _init_worker(strategy, ticks, depth, fee):
+    global _worker
+    _worker = strategy, ticks, depth, fee
+
+
+def _evaluate(params):
+    strategy, ticks, depth, fee = _worker
+    result = backtest(strategy, ticks, depth, fee, **params)
+    return params, result.summary(ticks)
+
+
+def grid_search(strategy, ticks, grid, depth=None, fee=0.0, processes=None):
+    """Backtests every combination of parameters in ``grid`` on a process
+    pool. The data is sent to each worker once, not per combination.
+
+    :param strategy: A module-level (picklable) strategy function
+    :param grid: A dictionary of parameter names to lists of values
+    :param processes: Worker processes; ``None`` for one per CPU, ``1`` to
+        run in this process
+    :return: ``(params, summary)`` pairs in grid order; see
+        :meth:`BacktestResult.summary`
+    """
+    names = sorted(grid)
+    combinations = [dict(zip(names, values))
+                    for values in product(*(grid[n] for n in names))]
+    args = strategy, ticks, depth, fee
+
+    if processes == 1:
+        _init_worker(*args)
+        return [_evaluate(params) for params in combinations]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=args) as executor:
+        return list(executor.map(_evaluate, combinations))
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+from korbit.auth import load_dict, store_dict
+from logbook import Logger
+import threading
+import time
+
+log = Logger('korbit.cache')
+
+#: Time-to-live, in seconds, of each cacheable public endpoint. Endpoints not
+#: listed here are never cached.
+DEFAULT_TTLS = {
+    'constants': 3600,
+    'ticker': 1,
+    'ticker/detailed': 1,
+    'ticker/detailed/all': 1,
+}
+
+
+class CacheStats(object):
+    """Hit/miss counters for one endpoint (or all of them)."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return 'CacheStats (hits={}, misses={}, evictions={})'.format(
+            self.hits, self.misses, self.evictions)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
+
+
+class ResponseCache(object):
+    """An opt-in, thread-safe TTL cache for public GET responses, evicting
+    the least recently used entry once ``maxsize`` is reached.
+
+    Cached responses are shared between callers and must not be mutated.
+
+    .. code-block:: python
+
+        client = KorbitClient(cache=ResponseCache(
+            ttls={'constants': 86400, 'ticker': 0.5},
+            persist='constants.cache.json'))
+    """
+
+    def __init__(self, ttls=None, maxsize=256, persist=None,
+                 persist_endpoints=('constants',)):
+        """Default initializer.
+
+        :param ttls: Endpoint to time-to-live (seconds) mapping; defaults to
+            :data:`DEFAULT_TTLS`
+        :param maxsize: Maximum number of cached responses
+        :param persist: A JSON file that keeps ``persist_endpoints`` responses
+            across restarts, or ``None``
+        :param persist_endpoints: Endpoints written to ``persist``
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.maxsize = maxsize
+        self.persist = persist
+        self.persist_endpoints = frozenset(persist_endpoints)
+
+        self._entries = OrderedDict()  # key -> (expires_at, stored_at, value)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+        if persist is not None:
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(url_suffix, params):
+        return url_suffix, tuple(sorted(params.items()))
+
+    def cacheable(self, url_suffix):
+        return self.ttls.get(url_suffix, 0) > 0
+
+    def stats(self, url_suffix=None):
+        """Returns :class:`CacheStats` for one endpoint, or totals across all
+        endpoints if ``url_suffix`` is ``None``."""
+        with self._lock:
+            if url_suffix is not None:
+                return self._stats.get(url_suffix) or CacheStats()
+
+            total = CacheStats()
+            for stats in self._stats.values():
+                total.hits += stats.hits
+                total.misses += stats.misses
+                total.evictions += stats.evictions
+            return total
+
+    def get(self, url_suffix, params):
+        """Returns ``(True, response)`` on a hit, ``(False, None)``
+        otherwise."""
+        key = self.key(url_suffix, params)
+
+        with self._lock:
+            stats = self._endpoint_stats(url_suffix)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                stats.hits += 1
+                return True, entry[2]
+
+            if entry is not None:
+                del self._entries[key]
+            stats.misses += 1
+            return False, None
+
+    def put(self, url_suffix, params, value):
+        ttl = self.ttls.get(url_suffix, 0)
+        if ttl <= 0:
+            return
+
+        key = self.key(url_suffix, params)
+        now = time.time()
+
+        with self._lock:
+            self._entries[key] = (now + ttl, now, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                (evicted, _), _ = self._entries.popitem(last=False)
+                self._endpoint_stats(evicted).evictions += 1
+
+        if self.persist is not None and url_suffix in self.persist_endpoints:
+            self._store()
+
+    def fetch(self, url_suffix, params, fetcher):
+        """Returns the cached response or calls ``fetcher()`` and caches its
+        result."""
+        if not self.cacheable(url_suffix):
+            return fetcher()
+
+        hit, value = self.get(url_suffix, params)
+        if hit:
+            return value
+
+        value = fetcher()
+        self.put(url_suffix, params, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _endpoint_stats(self, url_suffix):
+        stats = self._stats.get(url_suffix)
+        if stats is None:
+            stats = self._stats[url_suffix] = CacheStats()
+        return stats
+
+    def _load(self):
+        try:
+            stored = load_dict(self.persist)
+        except (IOError, OSError, ValueError):
+            return
+
+        now = time.time()
+        for item in stored.get('entries', []):
+            url_suffix = item['url_suffix']
+            expires_at = item['stored_at'] + self.ttls.get(url_suffix, 0)
+            if expires_at > now:
+                key = self.key(url_suffix, dict(item['params']))
+                self._entries[key] = (expires_at, item['stored_at'],
+                                      item['value'])
+
+    def _store(self):
+        with self._lock:
+            entries = [{'url_suffix': url_suffix, 'params': list(params),
+                        'stored_at': stored_at, 'value': value}
+                       for (url_suffix, params), (_, stored_at, value)
+                       in self._entries.items()
+                       if url_suffix in self.persist_endpoints]
+        try:
+            store_dict(self.persist, {'entries': entries})
+        except (IOError, OSError, TypeError, ValueError) as e:
+            log.warning('Could not persist cached responses: {}'.format(e))
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""OHLCV candles from tick arrays such as those of
+:class:`korbit.tickstore.TickStore`."""
+import numpy as np
+
+#: Bar lengths in milliseconds
+INTERVALS = {
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+CANDLE_DTYPE = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'),
+                         ('low', '<f8'), ('close', '<f8'),
+                         ('volume', '<f8'), ('count', '<i8')])
+
+
+def interval_milliseconds(interval):
+    """Accepts a key of :data:`INTERVALS` or a length in milliseconds."""
+    if interval in INTERVALS:
+        return INTERVALS[interval]
+    elif isinstance(interval, (int, np.integer)) and interval > 0:
+        return int(interval)
+    raise ValueError('Unsupported interval: {}'.format(interval))
+
+
+def build_candles(ticks, interval='1m'):
+    """Aggregates ticks into OHLCV bars with vectorized grouping.
+
+    Only intervals containing at least one tick produce a bar.
+
+    :param ticks: A structured array with ``timestamp`` (Unix milliseconds),
+        ``price`` and ``amount`` fields
+    :param interval: e.g., ``1m``, ``5m``, ``1h``, ``1d``
+    :return: An array of :data:`CANDLE_DTYPE`, where ``time`` is the start
+        of each bar
+    """
+    milliseconds = interval_milliseconds(interval)
+    if not len(ticks):
+        return np.empty(0, dtype=CANDLE_DTYPE)
+
+    timestamps = ticks['timestamp']
+    if np.any(timestamps[1:] < timestamps[:-1]):
+        ticks = ticks[np.argsort(timestamps, kind='stable')]
+        timestamps = ticks['timestamp']
+    prices = np.asarray(ticks['price'], dtype=np.float64)
+    amounts = np.asarray(ticks['amount'], dtype=np.float64)
+
+    buckets = timestamps // milliseconds * milliseconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ticks)]
+
+    candles = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    candles['time'] = buckets[starts]
+    candles['open'] = prices[starts]
+    candles['high'] = np.maximum.reduceat(prices, starts)
+    candles['low'] = np.minimum.reduceat(prices, starts)
+    candles['close'] = prices[ends - 1]
+    candles['volume'] = np.add.reduceat(amounts, starts)
+    candles['count'] = ends - starts
+    return candles
+
+
+class CandleBuilder(object):
+    """Maintains candles incrementally: new ticks extend the last open bar
+    and append new ones, without recomputing history.
+
+    Ticks at or before the last one seen (by ``timestamp``, then ``tid`` if
+    present) are ignored, so overlapping polls can be fed as they come.
+
+    .. code-block:: python
+
+        builder = CandleBuilder('5m', store.read())
+        while True:
+            builder.update(transactions_to_ticks(get_transactions('minute')))
+            plot(builder.candles)
+    """
+
+    def __init__(self, interval='1m', ticks=None):
+        self.interval = interval
+        self.milliseconds = interval_milliseconds(interval)
+        self._bars = np.empty(0, dtype=CANDLE_DTYPE)
+        self._size = 0
+        self._last = None  # (timestamp, tid) of the last tick seen
+
+        if ticks is not None:
+            self.update(ticks)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def candles(self):
+        """All bars so far; the last one may still be open."""
+        return self._bars[:self._size]
+
+    def update(self, ticks):
+        """Folds new ticks into the candles.
+
+        :return: Number of bars added or modified, counted from the end
+        """
+        ticks = self._unseen(ticks)
+        if not len(ticks):
+            return 0
+
+        bars = build_candles(ticks, self.milliseconds)
+        modified = len(bars)
+
+        last = self._bars[self._size - 1] if self._size else None
+        if last is not None and bars['time'][0] == last['time']:
+            first = bars[0]
+            last['high'] = max(last['high'], first['high'])
+            last['low'] = min(last['low'], first['low'])
+            last['close'] = first['close']
+            last['volume'] += first['volume']
+            last['count'] += first['count']
+            bars = bars[1:]
+
+        self._append(bars)
+        return modified
+
+    def _unseen(self, ticks):
+        if not len(ticks):
+            return ticks
+
+        timestamps = ticks['timestamp']
+        has_tid = 'tid' in (ticks.dtype.names or ())
+        order = np.lexsort((ticks['tid'], timestamps)) if has_tid \
+            else np.argsort(timestamps, kind='stable')
+        ticks = ticks[order]
+        timestamps = ticks['timestamp']
+
+        if self._last is not None:
+            last_timestamp, last_tid = self._last
+            fresh = timestamps > last_timestamp
+            if has_tid:
+                fresh |= (timestamps == last_timestamp) & \
+                    (ticks['tid'] > last_tid)
+            ticks = ticks[fresh]
+            if not len(ticks):
+                return ticks
+
+        self._last = (int(ticks['timestamp'][-1]),
+                      int(ticks['tid'][-1]) if has_tid else None)
+        return ticks
+
+    def _append(self, bars):
+        needed = self._size + len(bars)
+        if needed > len(self._bars):
+            grown = np.empty(max(needed, 2 * len(self._bars), 64),
+                             dtype=CANDLE_DTYPE)
+            grown[:self._size] = self._bars[:self._size]
+            self._bars = grown
+
+        self._bars[self._size:needed] = bars
+        self._size = needed
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+from korbit.decoder import get_decoder
+from korbit.metrics import RequestRecord, notify, rate_limit_headers
+from korbit.singleflight import SingleFlight
+from requests.adapters import HTTPAdapter
+import requests
+import time
+
+PROD_URL = 'https://api.korbit.co.kr/v1'
+TEST_URL = 'https://api.korbit-test.com/v1'
+
+#: Default (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
+
+def renew_nonce(params):
+    """Returns request parameters (a dictionary or a list of pairs) with a
+    freshly drawn nonce in place of the one they carry, if any.
+
+    A private request waiting in a :class:`korbit.ratelimit.RateLimiter` may
+    be overtaken by a higher-priority one, and the server rejects nonces
+    lower than one it has already seen, so the nonce is drawn again once
+    the request leaves the queue.
+    """
+    from korbit.api import nonce
+
+    if isinstance(params, dict):
+        return dict(params, nonce=nonce()) if 'nonce' in params else params
+    return [(key, str(nonce()) if key == 'nonce' else value)
+            for key, value in params]
+
+
+class KorbitError(Exception):
+    """Raised when the API responds with a status other than 200. The
+    message reads ``<status>: ...`` as before; the response itself is kept
+    on the exception."""
+
+    def __init__(self, message, status=None, headers=None, body=None):
+        Exception.__init__(self, message)
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class KorbitClient(object):
+    """An HTTP client owning a pooled, keep-alive :class:`requests.Session`.
+
+    Reusing a single client avoids a fresh TCP/TLS handshake on every call.
+    The module-level functions in :mod:`korbit.api` go through a shared
+    default instance (see :func:`korbit.api.get_default_client`).
+
+    .. code-block:: python
+
+        with KorbitClient(pool_maxsize=32, timeout=(1, 5)) as client:
+            client.get('ticker', currency_pair='btc_krw')
+    """
+
+    def __init__(self, base_url=PROD_URL, pool_connections=4, pool_maxsize=16,
+                 timeout=DEFAULT_TIMEOUT, keep_alive=True, max_retries=0,
+                 cache=None, coalesce=True, rate_limiter=None,
+                 decoder=None, hooks=None):
+        """Default initializer.
+
+        :param base_url: API root, without a trailing slash
+        :param pool_connections: Number of host pools to cache
+        :param pool_maxsize: Maximum number of connections kept per host.
+            Set this at least as high as the number of threads sharing the
+            client.
+        :param timeout: Either a single number or a ``(connect, read)`` tuple
+            in seconds, or ``None`` to wait forever
+        :param keep_alive: If ``False``, every request asks the server to
+            close the connection afterwards
+        :param max_retries: Passed to :class:`requests.adapters.HTTPAdapter`
+        :param cache: An optional :class:`korbit.cache.ResponseCache` for
+            public GET responses
+        :param coalesce: If ``True``, concurrent GET requests with identical
+            URLs and parameters share a single in-flight request
+        :param rate_limiter: An optional :class:`korbit.ratelimit.RateLimiter`
+            every request must pass before it is sent. Nonces are drawn
+            again once a request is admitted (see :func:`renew_nonce`).
+        :param decoder: JSON backend name or callable; see
+            :func:`korbit.decoder.get_decoder`
+        :param hooks: Callables receiving a
+            :class:`korbit.metrics.RequestRecord` after every HTTP request,
+            e.g., a :class:`korbit.metrics.MetricsRegistry`
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.cache = cache
+        self.flights = SingleFlight() if coalesce else None
+        self.rate_limiter = rate_limiter
+        self.decode = get_decoder(decoder)
+        self.hooks = list(hooks or ())
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              max_retries=max_retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Releases all pooled connections."""
+        self.session.close()
+
+    def url(self, url_suffix):
+        return '{}/{}'.format(self.base_url, url_suffix)
+
+    def get(self, url_suffix, **params):
+        """Initiates an HTTP GET request, unless the response is cached."""
+        if self.cache is not None:
+            return self.cache.fetch(
+                url_suffix, params,
+                lambda: self._coalesced_get(url_suffix, params))
+
+        return self._coalesced_get(url_suffix, params)
+
+    def _coalesced_get(self, url_suffix, params):
+        if self.flights is None:
+            return self._get(url_suffix, params)
+
+        key = url_suffix, tuple(sorted(params.items()))
+        return self.flights.do(key, lambda: self._get(url_suffix, params))
+
+    def _get(self, url_suffix, params):
+        res = self._request('GET', url_suffix, params=params)
+
+        if res.status_code == 200:
+            return self.decode(res.content)
+        else:
+            raise KorbitError('{}: {}'.format(res.status_code, str(res)),
+                              res.status_code, res.headers, res.content)
+
+    def post(self, url_suffix, **post_data):
+        """Initiates an HTTP POST request."""
+        res = self._request('POST', url_suffix, data=post_data)
+
+        if res.status_code == 200:
+            return self.decode(res.content)
+        else:
+            raise KorbitError('{}: {} {}'.format(
+                res.status_code, str(res.headers), str(res)),
+                res.status_code, res.headers, res.content)
+
+    def _request(self, method, url_suffix, **kwargs):
+        queued = 0.0
+        if self.rate_limiter is not None:
+            queued = self.rate_limiter.acquire(method, url_suffix)
+            for field in ('params', 'data'):
+                if kwargs.get(field):
+                    kwargs[field] = renew_nonce(kwargs[field])
+
+        if not self.hooks:
+            return self.session.request(method, self.url(url_suffix),
+                                        timeout=self.timeout, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            res = self.session.request(method, self.url(url_suffix),
+                                       timeout=self.timeout, **kwargs)
+        except Exception as e:
+            notify(self.hooks, RequestRecord(
+                method, url_suffix, None, time.perf_counter() - started, {},
+                queued, 0, 0, 0, {}, e))
+            raise
+        elapsed = time.perf_counter() - started
+
+        # requests only measures up to the response headers, and cannot
+        # tell connecting apart from waiting for the server
+        ttfb = min(res.elapsed.total_seconds(), elapsed)
+        retries = getattr(getattr(res.raw, 'retries', None), 'history', ())
+        notify(self.hooks, RequestRecord(
+            method, url_suffix, res.status_code, elapsed,
+            {'ttfb': ttfb, 'body': elapsed - ttfb}, queued,
+            len(res.request.body or b''), len(res.content), len(retries),
+            rate_limit_headers(res.headers), None))
+        return res
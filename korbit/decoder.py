@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Pluggable JSON decoding of raw response bytes.
+
+Responses are decoded straight from bytes, skipping the intermediate
+``str``. The fastest installed backend is used by default: ``orjson``, then
+``ujson``, then the standard library.
+"""
+import json
+
+#: Backends in order of preference
+BACKENDS = ('orjson', 'ujson', 'json')
+
+
+def _load(name):
+    if name == 'json':
+        return json.loads
+    elif name == 'orjson':
+        import orjson
+        return orjson.loads
+    elif name == 'ujson':
+        import ujson
+        return ujson.loads
+    raise ValueError('Unknown JSON backend: {}'.format(name))
+
+
+def get_decoder(decoder=None):
+    """Returns a callable turning response bytes into Python objects.
+
+    :param decoder: ``None`` for the fastest installed backend, a backend
+        name (``orjson`` | ``ujson`` | ``json``), or a callable taking bytes
+    :raises ImportError: if the named backend is not installed
+    """
+    if callable(decoder):
+        return decoder
+    elif decoder is not None:
+        return _load(decoder)
+
+    for name in BACKENDS:
+        try:
+            return _load(name)
+        except ImportError:
+            continue
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Exact fixed-point prices and amounts.
+
+In fixed-point mode, KRW values are whole won and coin amounts are integer
+counts of 1e-8 coin (satoshi-style base units), so sums and comparisons are
+exact integer arithmetic rather than float or :class:`decimal.Decimal`
+math.
+
+.. code-block:: python
+
+    to_units('2.40000000', AMOUNT_DECIMALS)  # 240000000
+    from_units(240000000, AMOUNT_DECIMALS)   # '2.40000000'
+"""
+from decimal import Decimal, ROUND_HALF_EVEN
+
+#: Fractional digits of a KRW price
+PRICE_DECIMALS = 0
+#: Fractional digits of a coin amount
+AMOUNT_DECIMALS = 8
+
+FIAT_CURRENCIES = ('krw',)
+
+
+def currency_decimals(currency):
+    """Fractional digits used for values in ``currency``."""
+    if currency is not None and currency.lower() in FIAT_CURRENCIES:
+        return PRICE_DECIMALS
+    return AMOUNT_DECIMALS
+
+
+def to_units(value, decimals):
+    """Converts a decimal string or a number into an integer count of
+    ``10 ** -decimals``.
+
+    Strings are parsed exactly; digits beyond ``decimals`` are rounded half
+    to even.
+
+    :type value: str, int, float or decimal.Decimal
+    :rtype: int
+    """
+    if isinstance(value, int):
+        return value * 10 ** decimals
+    elif isinstance(value, float):
+        return int(round(value * 10 ** decimals))
+
+    text = str(value).strip()
+    whole, _, fraction = text.partition('.')
+    if 'e' in text.lower() or fraction[decimals:].strip('0'):
+        quantum = Decimal(1).scaleb(-decimals)
+        return int(Decimal(text).quantize(quantum, ROUND_HALF_EVEN)
+                   .scaleb(decimals))
+
+    negative = whole.startswith('-')
+    units = abs(int(whole or '0')) * 10 ** decimals + \
+        int(fraction[:decimals].ljust(decimals, '0') or '0')
+    return -units if negative else units
+
+
+def from_units(units, decimals):
+    """Formats an integer count of ``10 ** -decimals`` as an exact decimal
+    string, e.g., for request parameters.
+
+    :rtype: str
+    """
+    if decimals == 0:
+        return str(units)
+
+    sign = '-' if units < 0 else ''
+    whole, fraction = divmod(abs(units), 10 ** decimals)
+    return '{}{}.{}'.format(sign, whole, str(fraction).zfill(decimals))
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""Per-endpoint request instrumentation.
+
+Clients pass a :class:`RequestRecord` to each of their hooks after every
+HTTP request, successful or not. A hook is any callable; a
+:class:`MetricsRegistry` is one that aggregates records into Prometheus-style
+histograms and counters.
+
+.. code-block:: python
+
+    registry = MetricsRegistry()
+    client = KorbitClient(hooks=[registry, print])
+    ...
+    registry.quantile(0.99, 'POST', 'user/orders/buy')
+    print(registry.render())  # text exposition format
+"""
+from bisect import bisect_left
+from collections import namedtuple
+from logbook import Logger
+import threading
+
+log = Logger('korbit.metrics')
+
+#: Upper bounds, in seconds, of the default latency buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+
+#: Response headers reported in :attr:`RequestRecord.rate_limit`
+RATE_LIMIT_PREFIXES = ('x-ratelimit', 'ratelimit', 'retry-after')
+
+
+class RequestRecord(namedtuple('RequestRecord', [
+        'method', 'endpoint', 'status', 'elapsed', 'phases', 'queued',
+        'request_bytes', 'response_bytes', 'retries', 'rate_limit',
+        'error'])):
+    """One HTTP request as seen by a client.
+
+    * ``endpoint`` is the URL suffix, e.g., ``user/orders/buy``
+    * ``status`` is ``None`` if no response arrived
+    * ``elapsed`` is the wall time in seconds from sending the request to
+      reading the whole body
+    * ``phases`` splits ``elapsed`` as far as the transport allows, e.g.,
+      ``dns``, ``connect`` (including TLS), ``ttfb`` (until the response
+      headers) and ``body``
+    * ``queued`` is the time spent waiting for the rate limiter beforehand
+    * ``retries`` is the number of transport-level retries
+    * ``rate_limit`` holds rate-limit response headers, lower-cased
+    * ``error`` is the exception raised, if any
+    """
+
+    __slots__ = ()
+
+
+def rate_limit_headers(headers):
+    """Picks the rate-limit headers out of a response header mapping."""
+    return {name.lower(): value for name, value in headers.items()
+            if name.lower().startswith(RATE_LIMIT_PREFIXES)}
+
+
+def notify(hooks, record):
+    """Calls every hook with ``record``. A failing hook is logged and never
+    breaks the request it observes."""
+    for hook in hooks:
+        try:
+            hook(record)
+        except Exception:
+            log.exception('Request hook {!r} failed'.format(hook))
+
+
+class Histogram(object):
+    """Counts observations into cumulative buckets, like a Prometheus
+    histogram."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # the last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """``(upper bound, count)`` pairs, ending with ``+Inf``."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q):
+        """Estimates the ``q``-quantile by linear interpolation within a
+        bucket, as Prometheus' ``histogram_quantile`` does. Returns ``None``
+        without observations."""
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        lower = 0.0
+        previous = 0
+        for bound, total in self.cumulative():
+            if total >= rank:
+                if bound == float('inf'):
+                    return lower
+                if total == previous:
+                    return bound
+                return lower + (bound - lower) * (rank - previous) / \
+                    (total - previous)
+            lower, previous = bound, total
+
+
+def _labels(**labels):
+    return ','.join('{}="{}"'.format(k, str(v).replace('"', '\\"'))
+                    for k, v in labels.items())
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class MetricsRegistry(object):
+    """Aggregates :class:`RequestRecord` objects per ``(method, endpoint)``.
+
+    A registry is a hook itself: pass it to
+    :class:`korbit.client.KorbitClient` or
+    :func:`korbit.api.enable_metrics`.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bucket_bounds = buckets
+        self._lock = threading.Lock()
+        self._latency = {}       # (method, endpoint) -> Histogram
+        self._phases = {}        # (method, endpoint, phase) -> Histogram
+        self._requests = {}      # (method, endpoint, status) -> count
+        self._retries = {}       # (method, endpoint) -> count
+        self._request_bytes = {}
+        self._response_bytes = {}
+        self._rate_limit = {}    # (method, endpoint, header) -> last value
+
+    def __call__(self, record):
+        self.observe(record)
+
+    def _histogram(self, table, key):
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram(self.bucket_bounds)
+        return histogram
+
+    def observe(self, record):
+        """Folds one :class:`RequestRecord` into the metrics."""
+        key = record.method, record.endpoint
+        status = record.status if record.status is not None \
+            else type(record.error).__name__
+
+        with self._lock:
+            self._histogram(self._latency, key).observe(record.elapsed)
+            for phase, seconds in (record.phases or {}).items():
+                self._histogram(self._phases, key + (phase,)) \
+                    .observe(seconds)
+
+            counter = key + (str(status),)
+            self._requests[counter] = self._requests.get(counter, 0) + 1
+            self._retries[key] = self._retries.get(key, 0) + record.retries
+            self._request_bytes[key] = \
+                self._request_bytes.get(key, 0) + record.request_bytes
+            self._response_bytes[key] = \
+                self._response_bytes.get(key, 0) + record.response_bytes
+
+            for header, value in (record.rate_limit or {}).items():
+                value = _number(value)
+                if value is not None:
+                    self._rate_limit[key + (header,)] = value
+
+    def histogram(self, method, endpoint, phase=None):
+        """The latency :class:`Histogram` of an endpoint (or one of its
+        phases), or ``None`` if it has not been requested."""
+        with self._lock:
+            if phase is None:
+                return self._latency.get((method, endpoint))
+            return self._phases.get((method, endpoint, phase))
+
+    def quantile(self, q, method, endpoint, phase=None):
+        """Estimated ``q``-quantile latency of an endpoint in seconds."""
+        histogram = self.histogram(method, endpoint, phase)
+        with self._lock:
+            return histogram.quantile(q) if histogram is not None else None
+
+    def requests(self, method=None, endpoint=None):
+        """Request counts keyed by status (or exception name) for matching
+        endpoints."""
+        counts = {}
+        with self._lock:
+            for (m, e, status), count in self._requests.items():
+                if method in (None, m) and endpoint in (None, e):
+                    counts[status] = counts.get(status, 0) + count
+        return counts
+
+    def clear(self):
+        with self._lock:
+            for table in (self._latency, self._phases, self._requests,
+                          self._retries, self._request_bytes,
+                          self._response_bytes, self._rate_limit):
+                table.clear()
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histograms(name, table, label_names):
+            lines.append('# TYPE {} histogram'.format(name))
+            for key, histogram in sorted(table.items()):
+                labels = _labels(**dict(zip(label_names, key)))
+                for bound, total in histogram.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(
+                        name, labels, le, total))
+                lines.append('{}_sum{{{}}} {}'.format(
+                    name, labels, histogram.sum))
+                lines.append('{}_count{{{}}} {}'.format(
+                    name, labels, histogram.count))
+
+        def scalars(name, kind, table, label_names):
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for key, value in sorted(table.items()):
+                lines.append('{}{{{}}} {}'.format(
+                    name, _labels(**dict(zip(label_names, key))), value))
+
+        endpoint = ('method', 'endpoint')
+        with self._lock:
+            histograms('korbit_request_seconds', self._latency, endpoint)
+            histograms('korbit_request_phase_seconds', self._phases,
+                       endpoint + ('phase',))
+            scalars('korbit_requests_total', 'counter', self._requests,
+                    endpoint + ('status',))
+            scalars('korbit_request_retries_total', 'counter',
+                    self._retries, endpoint)
+            scalars('korbit_request_bytes_total', 'counter',
+                    self._request_bytes, endpoint)
+            scalars('korbit_response_bytes_total', 'counter',
+                    self._response_bytes, endpoint)
+            scalars('korbit_rate_limit', 'gauge', self._rate_limit,
+                    endpoint + ('header',))
+
+        return '\n'.join(lines) + '\n'
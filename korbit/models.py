@@ -1,22 +1,147 @@
 from sqlalchemy import Column, Integer, String, DateTime, Numeric, Text
+from sqlalchemy import BigInteger, Index
+from sqlalchemy import case, cast, func
 from sqlalchemy import create_engine
 from sqlalchemy import desc
+from sqlalchemy import event
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import IntegrityError
 
+from collections import namedtuple
 from datetime import datetime
-from math import ceil, floor
+from itertools import islice
+
+from korbit.fixedpoint import FIAT_CURRENCIES, PRICE_DECIMALS, \
+    AMOUNT_DECIMALS, currency_decimals, to_units
+from korbit.order import Order  # noqa: F401 (re-exported)
 
 import json
+import os
+
 
+#: Database URL, overridable through ``KORBIT_DATABASE_URL`` or
+#: :func:`configure`
+DATABASE_URL = os.environ.get('KORBIT_DATABASE_URL', 'sqlite:///korbit.db')
 
 Base = declarative_base()
 
-engine = create_engine('sqlite:///korbit.db', echo=False)
-Session = sessionmaker(bind=engine)
 
-session = Session()
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tunes SQLite for an append-heavy writer with concurrent readers: WAL
+    lets readers proceed while a write is in progress, and
+    ``synchronous=NORMAL`` is durable against application crashes under WAL
+    while skipping an fsync per commit."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+def make_engine(url):
+    """Creates an engine, applying :func:`_set_sqlite_pragmas` to SQLite
+    connections."""
+    engine = create_engine(url, echo=False)
+
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
+
+    return engine
+
+
+Session = sessionmaker()
+
+# Created on first use by get_engine() and get_session(), so importing this
+# module neither connects nor creates a database file
+_engine = None
+_session = None
+
+
+def get_engine():
+    """Returns the engine for :data:`DATABASE_URL`, creating it on first
+    use."""
+    global _engine
+
+    if _engine is None:
+        _engine = make_engine(DATABASE_URL)
+        Session.configure(bind=_engine)
+
+    return _engine
+
+
+def get_session():
+    """Returns the module-wide session, creating it on first use."""
+    global _session
+
+    if _session is None:
+        get_engine()
+        _session = Session()
+
+    return _session
+
+
+def __getattr__(name):
+    # Keeps ``models.engine`` and ``models.session`` working while deferring
+    # their creation (PEP 562)
+    if name == 'engine':
+        return get_engine()
+    elif name == 'session':
+        return get_session()
+    raise AttributeError(
+        "module '{}' has no attribute '{}'".format(__name__, name))
+
+
+def configure(url):
+    """Points the persistence layer at another database. Takes effect on
+    next use."""
+    global DATABASE_URL, _engine, _session
+
+    if _session is not None:
+        _session.close()
+    if _engine is not None:
+        _engine.dispose()
+
+    DATABASE_URL = url
+    _engine = _session = None
+
+
+def init_db():
+    """Creates missing tables and indexes, including indexes added to tables
+    that already exist."""
+    engine = get_engine()
+    Base.metadata.create_all(engine)
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+#: Outcome of :meth:`Transaction.insert_many`
+InsertResult = namedtuple('InsertResult', ['inserted', 'skipped'])
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _units(value, currency):
+    if value is None:
+        return None
+    return to_units(value, currency_decimals(currency))
+
+
+def _units_expression(value, currency):
+    """SQL counterpart of :func:`_units`, so sums run in the database."""
+    scale = case((func.lower(currency).in_(FIAT_CURRENCIES),
+                  10 ** PRICE_DECIMALS),
+                 else_=10 ** AMOUNT_DECIMALS)
+    return cast(func.round(value * scale), BigInteger)
 
 
 class User(Base):
@@ -24,6 +149,23 @@ class User(Base):
     id = Column(Integer, primary_key=True)
 
 
+class SyncState(Base):
+    """High-water mark of an incremental sync (see :mod:`korbit.sync`)."""
+
+    __tablename__ = 'sync_state'
+
+    #: e.g., ``user/transactions:fills``
+    key = Column(String, primary_key=True)
+
+    last_id = Column(Integer)
+    last_timestamp = Column(DateTime)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return 'SyncState ({}, {}, {})'.format(
+            self.key, self.last_id, self.last_timestamp)
+
+
 class Transaction(Base):
     """
     An example of `coin-in` transaction:
@@ -31,6 +173,9 @@ class Transaction(Base):
     """  # noqa
 
     __tablename__ = 'transaction'
+    __table_args__ = (
+        Index('ix_transaction_type_completed_at', 'type', 'completed_at'),
+    )
 
     id = Column(Integer, primary_key=True)
 
@@ -43,7 +188,7 @@ class Transaction(Base):
     fee_currency = Column(String)
     fee_value = Column(Numeric(12, 8))
 
-    order_id = Column(Integer)
+    order_id = Column(Integer, index=True)
     price_currency = Column(String)
     price_value = Column(Numeric(12, 8))
     amount_currency = Column(String)
@@ -54,6 +199,36 @@ class Transaction(Base):
     #: Auxiliary data
     # aux = Column(Text)
 
+    @hybrid_property
+    def price_units(self):
+        """:attr:`price_value` as an exact integer (see
+        :mod:`korbit.fixedpoint`). Usable in queries as well, e.g.,
+        ``session.query(func.sum(Transaction.amount_units))``."""
+        return _units(self.price_value, self.price_currency)
+
+    @price_units.expression
+    def price_units(cls):
+        return _units_expression(cls.price_value, cls.price_currency)
+
+    @hybrid_property
+    def amount_units(self):
+        """:attr:`amount_value` as an exact integer; see
+        :attr:`price_units`."""
+        return _units(self.amount_value, self.amount_currency)
+
+    @amount_units.expression
+    def amount_units(cls):
+        return _units_expression(cls.amount_value, cls.amount_currency)
+
+    @hybrid_property
+    def fee_units(self):
+        """:attr:`fee_value` as an exact integer; see :attr:`price_units`."""
+        return _units(self.fee_value, self.fee_currency)
+
+    @fee_units.expression
+    def fee_units(cls):
+        return _units_expression(cls.fee_value, cls.fee_currency)
+
     def __repr__(self):
         return 'Transaction ({}, {}) {}{}@{}{}'.format(
             self.id, self.type,
@@ -79,34 +254,50 @@ class Transaction(Base):
         raise NotImplementedError()
 
     @staticmethod
-    def insert(json_object):
-        # TODO: Refactor the following section
-        transaction = Transaction()
-        transaction.id = json_object['id']
-        transaction.type = json_object['type']
-        transaction.timestamp = datetime.fromtimestamp(
-            long(json_object['timestamp']) / 1000)
-        transaction.completed_at = datetime.fromtimestamp(
-            long(json_object['completedAt']) / 1000)
+    def to_row(json_object):
+        """Converts a transaction returned by
+        :func:`korbit.api.get_user_transactions` into a dictionary of column
+        values."""
+        row = {
+            'id': int(json_object['id']),
+            'type': json_object['type'],
+            'timestamp': datetime.fromtimestamp(
+                int(json_object['timestamp']) / 1000),
+            'completed_at': datetime.fromtimestamp(
+                int(json_object['completedAt']) / 1000),
+            'fee_currency': None,
+            'fee_value': None,
+            'order_id': None,
+            'price_currency': None,
+            'price_value': None,
+            'amount_currency': None,
+            'amount_value': None,
+            'balances': json.dumps(json_object['balances']),
+        }
 
         if 'fee' in json_object:
-            transaction.fee_currency = json_object['fee']['currency']
-            transaction.fee_value = json_object['fee']['value']
+            row['fee_currency'] = json_object['fee']['currency']
+            row['fee_value'] = json_object['fee']['value']
 
         if 'fillsDetail' in json_object:
             details = json_object['fillsDetail']
-            transaction.order_id = details['orderId']
-            transaction.price_currency = details['price']['currency']
-            transaction.price_value = details['price']['value']
-            transaction.amount_currency = details['amount']['currency']
-            transaction.amount_value = details['amount']['value']
+            row['order_id'] = details['orderId']
+            row['price_currency'] = details['price']['currency']
+            row['price_value'] = details['price']['value']
+            row['amount_currency'] = details['amount']['currency']
+            row['amount_value'] = details['amount']['value']
 
         if 'coinsDetail' in json_object:
             details = json_object['coinsDetail']
-            transaction.amount_currency = details['amount']['currency']
-            transaction.amount_value = details['amount']['value']
+            row['amount_currency'] = details['amount']['currency']
+            row['amount_value'] = details['amount']['value']
 
-        transaction.balances = json.dumps(json_object['balances'])
+        return row
+
+    @staticmethod
+    def insert(json_object):
+        transaction = Transaction(**Transaction.to_row(json_object))
+        session = get_session()
 
         try:
             session.add(transaction)
@@ -114,13 +305,60 @@ class Transaction(Base):
         except IntegrityError:
             session.rollback()
 
+    @staticmethod
+    def insert_many(json_objects, batch_size=1000):
+        """Inserts transactions in batches, skipping ones already stored.
+
+        Each batch is written with a single executemany-style
+        ``INSERT ... ON CONFLICT DO NOTHING`` and committed as one
+        transaction. Databases without ``ON CONFLICT`` support fall back to
+        :meth:`insert`, one row at a time.
+
+        :param json_objects: An iterable of transactions as returned by
+            :func:`korbit.api.get_user_transactions`
+        :param batch_size: Number of rows per database transaction
+        :rtype: InsertResult
+        """
+        session = get_session()
+        dialect = session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            insert = None
+
+        inserted = skipped = 0
+        for batch in _batches(json_objects, batch_size):
+            if insert is None:
+                before = session.query(Transaction).count()
+                for json_object in batch:
+                    Transaction.insert(json_object)
+                count = session.query(Transaction).count() - before
+            else:
+                statement = insert(Transaction.__table__) \
+                    .on_conflict_do_nothing(index_elements=['id'])
+                try:
+                    result = session.execute(
+                        statement, [Transaction.to_row(x) for x in batch])
+                    session.commit()
+                except Exception:
+                    session.rollback()
+                    raise
+                count = result.rowcount
+
+            inserted += count
+            skipped += len(batch) - count
+
+        return InsertResult(inserted, skipped)
+
     @staticmethod
     def all(type=None, limit=None):
         """Retrieve all transactions.
         :param type: ``buy`` | ``sell``
         :param limit: Maximum number of records to retrieve
         """
-        query = session.query(Transaction)
+        query = get_session().query(Transaction)
 
         if type is not None:
             query = query.filter_by(type=type)
@@ -132,78 +370,14 @@ class Transaction(Base):
 
     @staticmethod
     def recent_sale_orders(limit=1):
-        return session.query(Transaction).filter_by(type='sell') \
+        return get_session().query(Transaction).filter_by(type='sell') \
             .order_by(desc(Transaction.completed_at)).limit(limit)
 
     @staticmethod
     def recent_buying_orders(limit=1):
-        return session.query(Transaction).filter_by(type='buy') \
+        return get_session().query(Transaction).filter_by(type='buy') \
             .order_by(desc(Transaction.completed_at)).limit(limit)
 
 
-class Order(object):
-    """A single row in the orderbook."""
-    def __init__(self, order_type, raw=None, price=None, amount=None,
-                 order_count=None):
-        """Default initializer.
-
-        :param order_type: An order type (`ask` or `bid`)
-        :type order_type: str
-
-        :param raw: A list of three elements containing price, amount, and the
-            number of orders.
-        :type raw: list
-
-        :type price: float
-        :type amount: float
-        :type order_count: int
-        """
-
-        self.order_type = order_type
-
-        # It must be one of the following two cases:
-        # 1. `raw` parameter is given
-        # 2. All three of `price`, `amount`, `order_count` parameters are given
-
-        if raw is not None:
-            assert type(raw) in (list, tuple)
-            assert len(raw) == 3
-
-            self.price = float(raw[0])
-            self.amount = float(raw[1])
-            self.order_count = int(raw[2])
-
-        elif price is not None and \
-            amount is not None and \
-            order_count is not None:
-
-            self.price = price
-            self.amount = amount
-            self.order_count = order_count
-        else:
-            raise RuntimeError('Invalid parameters. Either raw or all three'
-                               ' of price, amount, order_count must be given.')
-
-    def __repr__(self):
-        return 'Order ({}, {}, {}, {})'.format(
-            self.order_type, self.price,
-            self.amount, self.order_count)
-
-    @property
-    def rounded_price(self):
-        """Round up or down the price to the closest 100KRW."""
-        return round(self.price, -2)
-
-    @property
-    def ceilinged_price(self):
-        """Round up the price to the closest 100KRW."""
-        return ceil(self.price / 100.0) * 100
-
-    @property
-    def floored_price(self):
-        """Round down the price to the closest 100KRW."""
-        return floor(self.price / 100.0) * 100
-
-
 if __name__ == '__main__':
-    Base.metadata.create_all(engine)
+    init_db()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from logbook import Logger
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+log = Logger('korbit.nonce')
+
+_COUNTER = struct.Struct('<q')
+
+
+def milliseconds():
+    """Current Unix time in milliseconds."""
+    return int(time.time() * 1000)
+
+
+class NonceGenerator(object):
+    """Produces strictly increasing nonces.
+
+    A nonce is the current Unix time in milliseconds, bumped past the last
+    issued value whenever two calls land in the same millisecond or the clock
+    steps backwards. Within a process this is guarded by a lock. If ``path``
+    is given, the last value is also kept in that file under an exclusive
+    :func:`fcntl.flock`, so that every process sharing the file (and the API
+    key) draws from one sequence.
+
+    .. code-block:: python
+
+        nonce = NonceGenerator('/tmp/korbit.nonce')
+        nonce()  # 1402214947000
+        nonce()  # 1402214947001
+    """
+
+    def __init__(self, path=None):
+        """Default initializer.
+
+        :param path: A counter file shared by cooperating processes, or
+            ``None`` for a process-local sequence
+        """
+        if path is not None and fcntl is None:
+            log.warning('File locking is unavailable on this platform; '
+                        'nonces are only monotonic within this process')
+            path = None
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._last = 0
+        self._fd = None
+        self._pid = None
+
+    def __call__(self):
+        with self._lock:
+            value = max(milliseconds(), self._last + 1)
+
+            if self.path is not None:
+                value = self._advance_shared(value)
+
+            self._last = value
+            return value
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _file(self):
+        # A descriptor inherited through fork() shares its lock with the
+        # parent, so every process must open the file on its own.
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _advance_shared(self, value):
+        fd = self._file()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            data = os.pread(fd, _COUNTER.size, 0)
+            if len(data) == _COUNTER.size:
+                value = max(value, _COUNTER.unpack(data)[0] + 1)
+            os.pwrite(fd, _COUNTER.pack(value), 0)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        return value
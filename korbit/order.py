@@ -0,0 +1,79 @@
+from korbit.fixedpoint import AMOUNT_DECIMALS, PRICE_DECIMALS, to_units
+from math import ceil, floor
+
+
+class Order(object):
+    """A single row in the orderbook."""
+    def __init__(self, order_type, raw=None, price=None, amount=None,
+                 order_count=None, fixed_point=False):
+        """Default initializer.
+
+        :param order_type: An order type (`ask` or `bid`)
+        :type order_type: str
+
+        :param raw: A list of three elements containing price, amount, and the
+            number of orders.
+        :type raw: list
+
+        :type price: float
+        :type amount: float
+        :type order_count: int
+
+        :param fixed_point: If ``True``, ``raw`` is parsed into an integer
+            KRW price and an amount in integer base units (see
+            :mod:`korbit.fixedpoint`)
+        """
+
+        self.order_type = order_type
+        self.fixed_point = fixed_point
+
+        # It must be one of the following two cases:
+        # 1. `raw` parameter is given
+        # 2. All three of `price`, `amount`, `order_count` parameters are given
+
+        if raw is not None:
+            assert type(raw) in (list, tuple)
+            assert len(raw) == 3
+
+            if fixed_point:
+                self.price = to_units(raw[0], PRICE_DECIMALS)
+                self.amount = to_units(raw[1], AMOUNT_DECIMALS)
+            else:
+                self.price = float(raw[0])
+                self.amount = float(raw[1])
+            self.order_count = int(raw[2])
+
+        elif price is not None and \
+            amount is not None and \
+            order_count is not None:
+
+            self.price = price
+            self.amount = amount
+            self.order_count = order_count
+        else:
+            raise RuntimeError('Invalid parameters. Either raw or all three'
+                               ' of price, amount, order_count must be given.')
+
+    def __repr__(self):
+        return 'Order ({}, {}, {}, {})'.format(
+            self.order_type, self.price,
+            self.amount, self.order_count)
+
+    @property
+    def rounded_price(self):
+        """Round up or down the price to the closest 100KRW."""
+        return round(self.price, -2)
+
+    @property
+    def ceilinged_price(self):
+        """Round up the price to the closest 100KRW."""
+        if isinstance(self.price, int):
+            return -(-self.price // 100) * 100
+        return ceil(self.price / 100.0) * 100
+
+    @property
+    def floored_price(self):
+        """Round down the price to the closest 100KRW."""
+        if isinstance(self.price, int):
+            return self.price // 100 * 100
+        return floor(self.price / 100.0) * 100
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+from collections import namedtuple
+from korbit.fixedpoint import AMOUNT_DECIMALS, PRICE_DECIMALS, to_units
+from korbit.order import Order
+from sortedcontainers import SortedDict
+import numpy as np
+
+
+def _levels(raw_levels):
+    """Converts ``[[price, amount, count], ...]`` (strings or numbers) into an
+    ``(n, 3)`` float array in one pass."""
+    return np.array(raw_levels, dtype=np.float64).reshape(-1, 3)
+
+
+def _units(values, decimals):
+    """Scales a float array to integer base units. Rounding makes this exact
+    for decimal inputs of up to ``decimals`` fractional digits below
+    ``2 ** 50`` units (10 million coins)."""
+    return np.rint(values * 10 ** decimals).astype(np.int64)
+
+
+class BookSide(object):
+    """One side of an :class:`OrderBook`, stored as contiguous arrays and
+    sorted best level first (highest bid, lowest ask).
+
+    Indexing or iterating yields :class:`korbit.order.Order` objects on
+    demand, so code written against the list-based
+    :func:`korbit.api.get_orderbook` keeps working.
+
+    In fixed-point mode, ``prices`` and ``amounts`` are ``int64`` arrays of
+    whole KRW and coin base units (see :mod:`korbit.fixedpoint`), and so are
+    the sizes passed to :meth:`fill` and :meth:`vwap`.
+    """
+
+    def __init__(self, order_type, prices, amounts, counts):
+        """Default initializer.
+
+        :param order_type: ``bid`` or ``ask``
+        :type prices: numpy.ndarray
+        :type amounts: numpy.ndarray
+        :type counts: numpy.ndarray
+        """
+        self.order_type = order_type
+        self.prices = prices
+        self.amounts = amounts
+        self.counts = counts
+
+    @classmethod
+    def from_raw(cls, order_type, raw_levels, fixed_point=False):
+        levels = _levels(raw_levels)
+        prices, amounts = levels[:, 0], levels[:, 1]
+        if fixed_point:
+            prices = _units(prices, PRICE_DECIMALS)
+            amounts = _units(amounts, AMOUNT_DECIMALS)
+
+        order = np.argsort(prices, kind='stable')
+        if order_type == 'bid':
+            order = order[::-1]
+
+        return cls(order_type,
+                   np.ascontiguousarray(prices[order]),
+                   np.ascontiguousarray(amounts[order]),
+                   levels[order, 2].astype(np.int64))
+
+    @property
+    def fixed_point(self):
+        """Whether prices and amounts are integer base units."""
+        return self.prices.dtype.kind == 'i'
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return BookSide(self.order_type, self.prices[index],
+                            self.amounts[index], self.counts[index])
+
+        # item() yields int in fixed-point mode and float otherwise
+        return Order(self.order_type, price=self.prices[index].item(),
+                     amount=self.amounts[index].item(),
+                     order_count=int(self.counts[index]),
+                     fixed_point=self.fixed_point)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return 'BookSide ({}, {} levels)'.format(self.order_type, len(self))
+
+    @property
+    def best_price(self):
+        """Price of the best level, or ``None`` if this side is empty."""
+        return self.prices[0].item() if len(self) else None
+
+    def cumulative_amount(self):
+        """Total amount available at each level and better."""
+        return np.cumsum(self.amounts)
+
+    def cumulative_value(self):
+        """Total value (price times amount) at each level and better.
+
+        In fixed-point mode this is exact, in units of 1e-8 KRW, and fits
+        ``int64`` up to about 92 billion KRW.
+        """
+        return np.cumsum(self.prices * self.amounts)
+
+    def fill(self, size):
+        """Amount taken from each level by a market order of ``size``.
+
+        :raises ValueError: if the book is not deep enough
+        """
+        cumulative = self.cumulative_amount()
+        if len(self) == 0 or cumulative[-1] < size:
+            raise ValueError('Insufficient depth to fill {}'.format(size))
+
+        return np.clip(size - (cumulative - self.amounts), 0, self.amounts)
+
+    def vwap(self, size):
+        """Volume-weighted average price of a market order of ``size``
+        walking this side of the book.
+
+        :raises ValueError: if ``size`` is not positive or the book is not
+            deep enough
+        """
+        if size <= 0:
+            raise ValueError('Size must be positive: {}'.format(size))
+        return float(np.dot(self.prices, self.fill(size)) / size)
+
+
+class OrderBook(object):
+    """A columnar orderbook.
+
+    .. code-block:: python
+
+        book = get_orderbook(columnar=True)
+        book.spread, book.mid
+        book.asks.vwap(1.5)
+        book.bids.cumulative_amount()
+        for order in book['bids']:
+            ...
+    """
+
+    def __init__(self, timestamp, bids, asks):
+        """Default initializer.
+
+        :type bids: BookSide
+        :type asks: BookSide
+        """
+        self.timestamp = timestamp
+        self.bids = bids
+        self.asks = asks
+
+    @classmethod
+    def from_raw(cls, raw, fixed_point=False):
+        """Builds a book from a raw :func:`korbit.api.get_orderbook`
+        response."""
+        return cls(raw.get('timestamp'),
+                   BookSide.from_raw('bid', raw['bids'], fixed_point),
+                   BookSide.from_raw('ask', raw['asks'], fixed_point))
+
+    def __getitem__(self, key):
+        """Dictionary-style access (``book['bids']``) for compatibility with
+        the raw response layout."""
+        if key in ('timestamp', 'bids', 'asks'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __repr__(self):
+        return 'OrderBook ({}, {} bids, {} asks)'.format(
+            self.timestamp, len(self.bids), len(self.asks))
+
+    @property
+    def spread(self):
+        """Best ask minus best bid, or ``None`` if either side is empty."""
+        if not len(self.bids) or not len(self.asks):
+            return None
+        return (self.asks.prices[0] - self.bids.prices[0]).item()
+
+    @property
+    def mid(self):
+        """Midpoint between the best bid and ask, or ``None`` if either side
+        is empty."""
+        if not len(self.bids) or not len(self.asks):
+            return None
+        return float(self.asks.prices[0] + self.bids.prices[0]) / 2
+
+
+class LevelChange(namedtuple('LevelChange', ['side', 'price', 'old_amount',
+                                             'new_amount', 'old_count',
+                                             'new_count'])):
+    """A change to a single price level between two snapshots. Amounts and
+    counts are ``None`` where the level did not exist."""
+
+    __slots__ = ()
+
+    @property
+    def kind(self):
+        """``added`` | ``removed`` | ``changed``"""
+        if self.old_amount is None:
+            return 'added'
+        elif self.new_amount is None:
+            return 'removed'
+        else:
+            return 'changed'
+
+
+def _snapshot_levels(snapshot, side, fixed_point=False):
+    """Yields ``(price, (amount, count))`` from a raw orderbook response or an
+    :class:`OrderBook`."""
+    if isinstance(snapshot, OrderBook):
+        book_side = snapshot[side]
+        if book_side.fixed_point != fixed_point:
+            raise ValueError('Snapshot and book differ in fixed-point mode')
+        return zip(book_side.prices.tolist(),
+                   zip(book_side.amounts.tolist(), book_side.counts.tolist()))
+    elif fixed_point:
+        return ((to_units(price, PRICE_DECIMALS),
+                 (to_units(amount, AMOUNT_DECIMALS), int(count)))
+                for price, amount, count in snapshot[side])
+    else:
+        return ((float(price), (float(amount), int(count)))
+                for price, amount, count in snapshot[side])
+
+
+class LocalOrderBook(object):
+    """A stateful orderbook that turns successive snapshots into deltas.
+
+    Each side is a :class:`sortedcontainers.SortedDict` keyed by price, so a
+    level update and a best bid/ask lookup are both O(log n).
+
+    .. code-block:: python
+
+        book = LocalOrderBook()
+        while True:
+            for change in book.update(get('orderbook')):
+                react(change)
+    """
+
+    def __init__(self, fixed_point=False):
+        """Default initializer.
+
+        :param fixed_point: If ``True``, prices and amounts are kept as
+            integers (see :mod:`korbit.fixedpoint`)
+        """
+        self.fixed_point = fixed_point
+        self.timestamp = None
+        self.bids = SortedDict()
+        self.asks = SortedDict()
+
+    def __len__(self):
+        return len(self.bids) + len(self.asks)
+
+    def __repr__(self):
+        return 'LocalOrderBook ({}, {} bids, {} asks)'.format(
+            self.timestamp, len(self.bids), len(self.asks))
+
+    @property
+    def best_bid(self):
+        """``(price, amount)`` of the highest bid, or ``None``."""
+        if not self.bids:
+            return None
+        price, (amount, _) = self.bids.peekitem(-1)
+        return price, amount
+
+    @property
+    def best_ask(self):
+        """``(price, amount)`` of the lowest ask, or ``None``."""
+        if not self.asks:
+            return None
+        price, (amount, _) = self.asks.peekitem(0)
+        return price, amount
+
+    def update(self, snapshot):
+        """Replaces the book with ``snapshot`` and returns the changed price
+        levels.
+
+        :param snapshot: A raw :func:`korbit.api.get_orderbook` response
+            (``get('orderbook')``) or an :class:`OrderBook`
+        :rtype: list of :class:`LevelChange`
+        """
+        changes = []
+
+        for side, levels in (('bids', self.bids), ('asks', self.asks)):
+            seen = set()
+            for price, level in _snapshot_levels(snapshot, side,
+                                                 self.fixed_point):
+                seen.add(price)
+                previous = levels.get(price)
+                if previous == level:
+                    continue
+                levels[price] = level
+                if previous is None:
+                    changes.append(LevelChange(side, price, None, level[0],
+                                               None, level[1]))
+                else:
+                    changes.append(LevelChange(side, price, previous[0],
+                                               level[0], previous[1],
+                                               level[1]))
+
+            for price in [p for p in levels if p not in seen]:
+                amount, count = levels.pop(price)
+                changes.append(LevelChange(side, price, amount, None, count,
+                                           None))
+
+        self.timestamp = snapshot['timestamp']
+        return changes
+
+    def apply(self, changes, timestamp=None):
+        """Applies deltas, e.g., ones produced by :meth:`update` on another
+        book, without a full snapshot."""
+        for change in changes:
+            levels = getattr(self, change.side)
+            if change.new_amount is None:
+                levels.pop(change.price, None)
+            else:
+                levels[change.price] = (change.new_amount, change.new_count)
+
+        if timestamp is not None:
+            self.timestamp = timestamp
+
+    def to_order_book(self):
+        """Returns a columnar :class:`OrderBook` copy of the current state."""
+        dtype = np.int64 if self.fixed_point else np.float64
+
+        def side(order_type, levels, reverse):
+            prices = np.fromiter(levels.keys(), dtype=dtype,
+                                 count=len(levels))
+            values = np.array(list(levels.values()),
+                              dtype=dtype).reshape(-1, 2)
+            if reverse:
+                prices, values = prices[::-1], values[::-1]
+            return BookSide(order_type, np.ascontiguousarray(prices),
+                            np.ascontiguousarray(values[:, 0]),
+                            values[:, 1].astype(np.int64))
+
+        return OrderBook(self.timestamp,
+                         side('bid', self.bids, reverse=True),
+                         side('ask', self.asks, reverse=False))
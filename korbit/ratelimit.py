@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""Client-side rate limiting with priority lanes.
+
+Requests are split into a public and a private budget, each a
+:class:`TokenBucket`. Within a bucket, waiting requests are served by
+priority, then in arrival order, so order placement and cancellation jump
+ahead of account reads and market-data polling. Pass the same bucket as
+both budgets when the exchange enforces a single limit; priorities then
+apply across all requests.
+
+Since a queued private request may be overtaken, clients draw its nonce
+again once it is admitted (see :func:`korbit.client.renew_nonce`), so
+nonces still reach the server in increasing order.
+
+Coroutines wait with :meth:`TokenBucket.acquire_async` in the same queue,
+without tying up a thread.
+"""
+from itertools import count
+import asyncio
+import heapq
+import threading
+import time
+
+#: Placing and cancelling orders
+PRIORITY_ORDER = 0
+#: Other private calls (wallet, open orders, history, tokens)
+PRIORITY_ACCOUNT = 1
+#: Public market data (orderbook, ticker, transactions, constants)
+PRIORITY_MARKET_DATA = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_ORDER: 'order',
+    PRIORITY_ACCOUNT: 'account',
+    PRIORITY_MARKET_DATA: 'market_data',
+}
+
+
+def classify(method, url_suffix):
+    """Returns the ``(lane, priority)`` of a request, where ``lane`` is
+    ``public`` or ``private``."""
+    if method == 'POST' and url_suffix.startswith('user/orders/'):
+        return 'private', PRIORITY_ORDER
+    elif url_suffix.startswith(('user/', 'oauth2/')):
+        return 'private', PRIORITY_ACCOUNT
+    else:
+        return 'public', PRIORITY_MARKET_DATA
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a request cannot be admitted within its timeout."""
+
+
+class _PriorityStats(object):
+    def __init__(self):
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self):
+        return {'acquired': self.acquired, 'total_wait': self.total_wait,
+                'max_wait': self.max_wait}
+
+
+class TokenBucket(object):
+    """Admits ``rate`` requests per second on average, with bursts of up to
+    ``capacity``. Waiters are served in ``(priority, arrival)`` order."""
+
+    def __init__(self, rate, capacity=None):
+        """Default initializer.
+
+        :param rate: Tokens added per second
+        :param capacity: Maximum number of stored tokens; defaults to
+            ``rate`` (one second of burst)
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._arrivals = count()
+        self._stats = {}
+
+    @property
+    def queue_depth(self):
+        """Number of requests waiting for a token."""
+        return len(self._waiters)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, ticket):
+        """Takes a token if ``ticket`` is at the head of the queue and one is
+        available. Must be called with the lock held."""
+        self._refill()
+        if self._waiters[0] == ticket and self._tokens >= 1:
+            self._tokens -= 1
+            heapq.heappop(self._waiters)
+            return True
+        return False
+
+    def _record(self, priority, waited):
+        stats = self._stats.get(priority)
+        if stats is None:
+            stats = self._stats[priority] = _PriorityStats()
+        stats.acquired += 1
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+
+    def _abandon(self, ticket):
+        self._waiters.remove(ticket)
+        heapq.heapify(self._waiters)
+
+    def _timed_out(self, deadline, timeout):
+        if deadline is not None and time.monotonic() >= deadline:
+            raise RateLimitTimeout('No rate limit token within {}s'.format(
+                timeout))
+
+    def acquire(self, priority=PRIORITY_MARKET_DATA, timeout=None):
+        """Blocks until a token is available and it is this caller's turn.
+
+        :return: Seconds spent waiting
+        :raises RateLimitTimeout: if ``timeout`` seconds pass first
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        ticket = (priority, next(self._arrivals))
+
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while not self._take(ticket):
+                    self._timed_out(deadline, timeout)
+                    delay = (1 - self._tokens) / self.rate \
+                        if self._waiters[0] == ticket else None
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        delay = remaining if delay is None \
+                            else min(delay, remaining)
+                    self._condition.wait(delay)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+            finally:
+                # The head of the queue may have changed
+                self._condition.notify_all()
+
+            waited = time.monotonic() - started
+            self._record(priority, waited)
+
+        return waited
+
+    async def acquire_async(self, priority=PRIORITY_MARKET_DATA,
+                            timeout=None):
+        """Waits like :meth:`acquire`, in the same queue, but sleeps in the
+        event loop instead of blocking a thread.
+
+        :return: Seconds spent waiting
+        :raises RateLimitTimeout: if ``timeout`` seconds pass first
+        """
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        ticket = (priority, next(self._arrivals))
+
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+        try:
+            while True:
+                with self._condition:
+                    if self._take(ticket):
+                        self._condition.notify_all()
+                        break
+                    self._timed_out(deadline, timeout)
+                    # Sleep until enough tokens for everyone ahead of us
+                    # have accrued; arrivals with a higher priority just
+                    # mean another round
+                    ahead = sum(1 for t in self._waiters if t < ticket)
+                    delay = max((ahead + 1 - self._tokens) / self.rate,
+                                0.001)
+                if deadline is not None:
+                    delay = min(delay, max(deadline - time.monotonic(), 0))
+                await asyncio.sleep(delay)
+        except BaseException:
+            with self._condition:
+                self._abandon(ticket)
+                self._condition.notify_all()
+            raise
+
+        waited = time.monotonic() - started
+        with self._condition:
+            self._record(priority, waited)
+        return waited
+
+    def metrics(self):
+        """Queue depth and per-priority acquisition and wait-time totals."""
+        with self._condition:
+            return {
+                'queue_depth': len(self._waiters),
+                'tokens': self._tokens,
+                'priorities': {PRIORITY_NAMES.get(p, p): s.as_dict()
+                               for p, s in self._stats.items()},
+            }
+
+
+class RateLimiter(object):
+    """Routes each request to its lane's :class:`TokenBucket` with the
+    priority given by :func:`classify`.
+
+    .. code-block:: python
+
+        client = KorbitClient(rate_limiter=RateLimiter(
+            public=TokenBucket(10), private=TokenBucket(5, capacity=2)))
+    """
+
+    def __init__(self, public=None, private=None, timeout=None):
+        """Default initializer.
+
+        :param public: Budget for public endpoints; 10 requests per second by
+            default
+        :param private: Budget for ``user/`` and ``oauth2/`` endpoints; 5
+            requests per second by default
+        :param timeout: Maximum seconds a request may wait, or ``None``
+        """
+        self.public = public if public is not None else TokenBucket(10)
+        self.private = private if private is not None else TokenBucket(5)
+        self.timeout = timeout
+
+    def _route(self, method, url_suffix):
+        lane, priority = classify(method, url_suffix)
+        return self.private if lane == 'private' else self.public, priority
+
+    def acquire(self, method, url_suffix):
+        """Blocks until the request may be sent; returns seconds waited."""
+        bucket, priority = self._route(method, url_suffix)
+        return bucket.acquire(priority, self.timeout)
+
+    async def acquire_async(self, method, url_suffix):
+        """Waits in the event loop until the request may be sent; returns
+        seconds waited."""
+        bucket, priority = self._route(method, url_suffix)
+        return await bucket.acquire_async(priority, self.timeout)
+
+    def metrics(self):
+        if self.public is self.private:
+            return {'shared': self.public.metrics()}
+        return {'public': self.public.metrics(),
+                'private': self.private.metrics()}
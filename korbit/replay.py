@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""Recording and replaying API traffic.
+
+:class:`RecordingClient` logs every request and response, with the time it
+arrived, to a JSON-lines file (gzip-compressed if the name ends in ``.gz``).
+:class:`ReplayClient` serves such a log instead of the network, either as
+fast as possible or paced at a multiple of real time. Installed as the
+default client, they sit under :func:`korbit.api.get` and
+:func:`korbit.api.post`, so code calling :func:`korbit.api.get_orderbook`,
+:func:`korbit.api.get_ticker`, etc. runs unchanged.
+
+.. code-block:: python
+
+    api.set_default_client(RecordingClient('session.jsonl.gz'))
+    ...  # trade as usual
+    api.get_default_client().close()
+
+    api.set_default_client(ReplayClient('session.jsonl.gz', speed=60))
+    api.get_orderbook()  # the first recorded orderbook
+
+Access tokens, refresh tokens, nonces and API credentials are never written
+to the log.
+"""
+from korbit.client import KorbitClient
+import gzip
+import json
+import threading
+import time
+
+#: Request parameters left out of the log and of request matching
+SECRET_PARAMS = frozenset(['access_token', 'refresh_token', 'nonce',
+                           'client_id', 'client_secret', 'username',
+                           'password'])
+#: Response fields of ``oauth2/`` endpoints replaced by :data:`REDACTED`
+SECRET_FIELDS = ('access_token', 'refresh_token')
+REDACTED = 'REDACTED'
+
+
+class ReplayMiss(LookupError):
+    """Raised when the log holds no (further) response for a request."""
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def public_params(params):
+    """Request parameters without secrets or ``None`` values, as strings."""
+    return {key: str(value) for key, value in (params or {}).items()
+            if value is not None and key not in SECRET_PARAMS}
+
+
+def request_key(method, url_suffix, params):
+    """Identifies requests that replay the same recorded responses."""
+    return method, url_suffix, tuple(sorted(public_params(params).items()))
+
+
+def _redact(url_suffix, body):
+    if not url_suffix.startswith('oauth2/'):
+        return body
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(payload, dict):
+        for field in SECRET_FIELDS:
+            if field in payload:
+                payload[field] = REDACTED
+    return json.dumps(payload).encode('utf-8')
+
+
+class RecordingClient(KorbitClient):
+    """A :class:`korbit.client.KorbitClient` that also appends every
+    exchange to a log. Each line holds the arrival time ``t`` (Unix
+    seconds), the method ``m``, the URL suffix ``u``, the parameters ``p``,
+    the status ``s`` and the response body ``b``."""
+
+    def __init__(self, path, *args, **kwargs):
+        """Default initializer. Other arguments are passed to
+        :class:`korbit.client.KorbitClient`.
+
+        :param path: Log file; appended to if it exists
+        """
+        KorbitClient.__init__(self, *args, **kwargs)
+        self.path = path
+        self._log = _open(path, 'a')
+        self._lock = threading.Lock()
+
+    def close(self):
+        """Releases all pooled connections and closes the log."""
+        KorbitClient.close(self)
+        with self._lock:
+            if not self._log.closed:
+                self._log.close()
+
+    def _request(self, method, url_suffix, **kwargs):
+        res = KorbitClient._request(self, method, url_suffix, **kwargs)
+
+        body = _redact(url_suffix, res.content)
+        line = json.dumps({
+            't': time.time(),
+            'm': method,
+            'u': url_suffix,
+            'p': public_params(kwargs.get('params') or kwargs.get('data')),
+            's': res.status_code,
+            'b': body.decode('utf-8', 'replace'),
+        }, separators=(',', ':'), sort_keys=True)
+        with self._lock:
+            self._log.write(line + '\n')
+
+        return res
+
+
+class _ReplayedResponse(object):
+    """The parts of :class:`requests.Response` the client reads."""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+    def __str__(self):
+        return '<Response [{}]>'.format(self.status_code)
+
+
+class ReplayClient(KorbitClient):
+    """A :class:`korbit.client.KorbitClient` answering from a log written by
+    :class:`RecordingClient`, without any network access.
+
+    Responses to identical requests (same method, URL suffix and
+    non-secret parameters) are served in recorded order, one per call;
+    :class:`ReplayMiss` is raised once they run out. Orders therefore
+    replay only when placed with the recorded parameters.
+
+    With ``speed=None`` every response is returned immediately. Otherwise
+    a virtual clock starts at the first recorded timestamp and runs
+    ``speed`` times faster than real time, and a response is held back
+    until the clock reaches the time it was recorded.
+    """
+
+    def __init__(self, path, speed=None, **kwargs):
+        """Default initializer. Other keyword arguments are passed to
+        :class:`korbit.client.KorbitClient`.
+
+        :param path: A log written by :class:`RecordingClient`
+        :param speed: Replay pace as a multiple of real time, or ``None``
+            for as fast as possible
+        """
+        KorbitClient.__init__(self, **kwargs)
+        self.path = path
+        self.speed = speed
+
+        self._responses = {}
+        self._lock = threading.Lock()
+        with _open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = request_key(entry['m'], entry['u'], entry['p'])
+                self._responses.setdefault(key, []).append(
+                    (entry['t'], entry['s'], entry['b'].encode('utf-8')))
+
+        for responses in self._responses.values():
+            responses.sort(key=lambda x: x[0])
+            responses.reverse()  # popped from the end
+
+        first = [r[-1][0] for r in self._responses.values() if r]
+        self.started_at = min(first) if first else 0.0
+        self._replayed_at = self.started_at
+        self._wall_started = None
+
+    def now(self):
+        """The replay's virtual Unix time."""
+        if self.speed is None or self._wall_started is None:
+            return self._replayed_at
+        return self.started_at + \
+            (time.monotonic() - self._wall_started) * self.speed
+
+    def remaining(self):
+        """Number of responses not replayed yet."""
+        with self._lock:
+            return sum(len(r) for r in self._responses.values())
+
+    def _request(self, method, url_suffix, **kwargs):
+        key = request_key(method, url_suffix,
+                          kwargs.get('params') or kwargs.get('data'))
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise ReplayMiss('No recorded response left for {} {} {}'
+                                 .format(*key))
+            recorded_at, status, body = responses.pop()
+            if self._wall_started is None:
+                self._wall_started = time.monotonic()
+            self._replayed_at = max(self._replayed_at, recorded_at)
+
+        if self.speed is not None:
+            delay = (recorded_at - self.now()) / self.speed
+            if delay > 0:
+                time.sleep(delay)
+
+        return _ReplayedResponse(status, body)
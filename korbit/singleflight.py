@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import threading
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.shared = 0
+
+
+class SingleFlight(object):
+    """De-duplicates concurrent calls: while a call for a given key is in
+    flight, other callers with the same key wait for it and receive its
+    result (or exception) instead of making their own.
+
+    Nothing is remembered once a call returns, so this is safe for data that
+    must be fresh; see :class:`korbit.cache.ResponseCache` for time-based
+    caching.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        #: Number of callers served by another caller's request
+        self.coalesced = 0
+
+    def __len__(self):
+        """Number of calls in flight."""
+        return len(self._calls)
+
+    def do(self, key, func):
+        """Calls ``func()`` unless a call for ``key`` is already in flight,
+        in which case its outcome is shared."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.shared += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Incremental sync of the user transaction history into the local
+:class:`korbit.models.Transaction` table."""
+from collections import namedtuple
+from datetime import datetime
+from korbit import api, models
+from korbit.models import SyncState, Transaction
+from logbook import Logger
+
+log = Logger('korbit.sync')
+
+#: Outcome of :func:`sync_transactions`
+SyncResult = namedtuple('SyncResult', ['fetched', 'inserted', 'skipped',
+                                       'last_id'])
+
+
+def sync_transactions(category=None, currency_pair=None, batch_size=500,
+                      page_size=api.USER_TRANSACTIONS_PAGE_SIZE):
+    """Fetches transactions newer than the stored high-water mark and writes
+    them with :meth:`korbit.models.Transaction.insert_many`.
+
+    The history is paged newest first and paging stops at the first record
+    at or below the mark, so a periodic sync costs O(new records). The mark
+    only advances after every new record has been committed; a sync
+    interrupted half way simply starts over from the old mark next time, and
+    rows it already wrote are skipped as duplicates.
+
+    :param category: ``fills`` | ``fiats`` | ``coins``, or ``None`` for all
+    :param currency_pair: e.g., ``btc_krw``
+    :param batch_size: Rows per database transaction
+    :param page_size: Records per API request
+    :rtype: SyncResult
+    """
+    # Ledgers created before incremental sync have no state table
+    SyncState.__table__.create(bind=models.get_engine(), checkfirst=True)
+
+    session = models.get_session()
+    key = 'user/transactions:{}:{}'.format(category or '*',
+                                            currency_pair or '*')
+    state = session.get(SyncState, key)
+    last_id = state.last_id if state is not None else None
+
+    newest = {}
+
+    def new_records():
+        for record in api.iter_user_transactions(
+                category, currency_pair, page_size=page_size):
+            record_id = int(record['id'])
+            if last_id is not None and record_id <= last_id:
+                return
+            if record_id > newest.get('id', -1):
+                newest['id'] = record_id
+                newest['timestamp'] = record['timestamp']
+            newest['fetched'] = newest.get('fetched', 0) + 1
+            yield record
+
+    result = Transaction.insert_many(new_records(), batch_size=batch_size)
+
+    if 'id' in newest:
+        if state is None:
+            state = SyncState(key=key)
+            session.add(state)
+        state.last_id = newest['id']
+        state.last_timestamp = datetime.fromtimestamp(
+            int(newest['timestamp']) / 1000)
+        state.updated_at = datetime.now()
+        session.commit()
+
+    log.info('Synced {}: {} new, {} already stored'.format(
+        key, result.inserted, result.skipped))
+
+    return SyncResult(newest.get('fetched', 0), result.inserted,
+                      result.skipped, newest.get('id', last_id))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+import numpy as np
+import os
+
+#: One fixed-width (32 byte) record per tick
+TICK_DTYPE = np.dtype([('timestamp', '<i8'), ('tid', '<i8'),
+                       ('price', '<f8'), ('amount', '<f8')])
+
+SEGMENT_MILLISECONDS = 24 * 60 * 60 * 1000
+SEGMENT_SUFFIX = '.ticks'
+EPOCH = datetime(1970, 1, 1)
+
+
+def transactions_to_ticks(transactions):
+    """Converts a :func:`korbit.api.get_transactions` response into a tick
+    array sorted by ``(timestamp, tid)``."""
+    transactions = list(transactions)
+    ticks = np.empty(len(transactions), dtype=TICK_DTYPE)
+    ticks['timestamp'] = [t['timestamp'] for t in transactions]
+    ticks['tid'] = [t['tid'] for t in transactions]
+    # NumPy parses the decimal strings in bulk
+    ticks['price'] = np.array([t['price'] for t in transactions],
+                              dtype=np.float64)
+    ticks['amount'] = np.array([t['amount'] for t in transactions],
+                               dtype=np.float64)
+    return _sorted(ticks)
+
+
+def _sorted(ticks):
+    return ticks[np.lexsort((ticks['tid'], ticks['timestamp']))]
+
+
+class TickStore(object):
+    """An append-only store of ``(timestamp, tid, price, amount)`` ticks.
+
+    Ticks are kept as fixed-width :data:`TICK_DTYPE` records in one segment
+    file per UTC day, sorted by timestamp and de-duplicated on ``tid``.
+    Reads memory-map the segments, so loading is nearly free and time ranges
+    are cut out by binary search.
+
+    The store assumes a single writer; any number of processes may read.
+
+    .. code-block:: python
+
+        store = TickStore('ticks/')
+        while True:
+            store.append(get_transactions(_time='minute'))
+            ...
+        ticks = store.read(start=since_ms)
+        ticks['price'], ticks['amount']
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def segment_path(self, segment):
+        """Path of the segment holding ticks of day number ``segment`` (days
+        since the Unix epoch), e.g., ``20140114.ticks``."""
+        day = EPOCH + timedelta(days=segment)
+        return os.path.join(self.directory,
+                            day.strftime('%Y%m%d') + SEGMENT_SUFFIX)
+
+    def segment_numbers(self):
+        """Sorted day numbers of all stored segments."""
+        return sorted(
+            (datetime.strptime(name[:-len(SEGMENT_SUFFIX)], '%Y%m%d') -
+             EPOCH).days
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX))
+
+    def load_segment(self, segment):
+        """Memory-maps one segment read-only (empty if it does not exist).
+        A partial record at the end, left by an interrupted write, is
+        ignored."""
+        path = self.segment_path(segment)
+        count = os.path.getsize(path) // TICK_DTYPE.itemsize \
+            if os.path.exists(path) else 0
+        if not count:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return np.memmap(path, dtype=TICK_DTYPE, mode='r', shape=(count,))
+
+    def append(self, ticks):
+        """Stores ticks that are not stored yet.
+
+        :param ticks: A tick array or a :func:`korbit.api.get_transactions`
+            response
+        :return: Number of new ticks
+        """
+        if not isinstance(ticks, np.ndarray):
+            ticks = transactions_to_ticks(ticks)
+        if not len(ticks):
+            return 0
+
+        ticks = _sorted(ticks.astype(TICK_DTYPE, copy=False))
+        _, first = np.unique(ticks['tid'], return_index=True)
+        ticks = ticks[np.sort(first)]
+
+        segments = ticks['timestamp'] // SEGMENT_MILLISECONDS
+        boundaries = np.flatnonzero(np.diff(segments)) + 1
+
+        appended = 0
+        for chunk in np.split(ticks, boundaries):
+            appended += self._append_segment(
+                int(chunk['timestamp'][0] // SEGMENT_MILLISECONDS), chunk)
+        return appended
+
+    def _append_segment(self, segment, ticks):
+        existing = self.load_segment(segment)
+
+        # A tid always comes with the same timestamp, so duplicates can only
+        # be in the tail at or after the earliest new timestamp
+        tail = existing[np.searchsorted(existing['timestamp'],
+                                        ticks['timestamp'][0]):]
+        ticks = ticks[~np.isin(ticks['tid'], tail['tid'])]
+        if not len(ticks):
+            return 0
+
+        path = self.segment_path(segment)
+        if not len(existing) or \
+                ticks['timestamp'][0] >= existing['timestamp'][-1]:
+            size = len(existing) * TICK_DTYPE.itemsize
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                os.truncate(path, size)  # drops a partial record
+            with open(path, 'ab') as f:
+                f.write(ticks.tobytes())
+        else:
+            merged = _sorted(np.concatenate([existing, ticks]))
+            del existing, tail
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(merged.tobytes())
+            os.replace(tmp, path)
+
+        return len(ticks)
+
+    def segments(self, start=None, end=None):
+        """Yields memory-mapped views of the ticks with
+        ``start <= timestamp < end``, one per segment, without copying."""
+        first = None if start is None else start // SEGMENT_MILLISECONDS
+        last = None if end is None else (end - 1) // SEGMENT_MILLISECONDS
+
+        for segment in self.segment_numbers():
+            if (first is not None and segment < first) or \
+                    (last is not None and segment > last):
+                continue
+
+            ticks = self.load_segment(segment)
+            timestamps = ticks['timestamp']
+            lo = 0 if start is None else np.searchsorted(timestamps, start)
+            hi = len(ticks) if end is None \
+                else np.searchsorted(timestamps, end)
+            if hi > lo:
+                yield ticks[lo:hi]
+
+    def read(self, start=None, end=None):
+        """Returns the ticks with ``start <= timestamp < end`` (Unix
+        milliseconds). A range within one segment is returned as a
+        memory-mapped view; wider ranges are concatenated into memory, so
+        iterate over :meth:`segments` instead to process weeks or months of
+        ticks."""
+        views = list(self.segments(start, end))
+        if not views:
+            return np.empty(0, dtype=TICK_DTYPE)
+        elif len(views) == 1:
+            return views[0]
+        else:
+            return np.concatenate(views)
@@ -1,3 +1,7 @@
 export KORBIT_ENV=prod
 export KORBIT_API_KEY=
 export KORBIT_API_SECRET=
+# Optional: share one nonce sequence among processes using the same API key
+# export KORBIT_NONCE_FILE=/tmp/korbit.nonce
+# Optional: database for korbit.models (defaults to sqlite:///korbit.db)
+# export KORBIT_DATABASE_URL=sqlite:////var/lib/korbit/korbit.db
@@ -27,6 +27,20 @@ setup(name='korbit',
       author=korbit.__author__,
       author_email=korbit.__email__,
       url='http://github.com/suminb/korbit',
-      packages=find_packages(),
+      packages=find_packages(exclude=['tests*', 'benchmarks*']),
       install_requires=install_requires,
+      python_requires='>=3.7',
+      extras_require={
+          'aio': ['aiohttp>=3.6'],
+          'fast': ['orjson'],
+      },
+      classifiers=[
+          'Programming Language :: Python :: 3',
+          'Programming Language :: Python :: 3 :: Only',
+          'Programming Language :: Python :: 3.7',
+          'Programming Language :: Python :: 3.8',
+          'Programming Language :: Python :: 3.9',
+          'Programming Language :: Python :: 3.10',
+          'Programming Language :: Python :: 3.11',
+      ],
 )
@@ -0,0 +1,206 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from korbit import aio  # noqa: E402
+from korbit.aio import AsyncKorbitClient  # noqa: E402
+from korbit.models import Order  # noqa: E402
+from korbit.ratelimit import RateLimiter, TokenBucket  # noqa: E402
+from tests.stub import AsyncStubServer  # noqa: E402
+
+ORDERBOOK = {
+    'timestamp': 1386135077000,
+    'bids': [['677300', '3.5', '1'], ['677400', '0.1', '2']],
+    'asks': [['679600', '0.2', '1'], ['679500', '0.15', '2']],
+}
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(aio.api, 'access_token',
+                        lambda: {'access_token': 'secret'})
+
+
+def test_get_orderbook():
+    async def main():
+        async with AsyncStubServer({'orderbook': ORDERBOOK}) as server:
+            aio.set_default_client(AsyncKorbitClient(server.base_url))
+            try:
+                return await aio.get_orderbook()
+            finally:
+                await aio.close()
+
+    orderbook = run(main())
+    assert [o.price for o in orderbook['bids']] == [677400, 677300]
+    assert [o.price for o in orderbook['asks']] == [679500, 679600]
+    assert all(type(o) == Order for o in orderbook['asks'])
+
+
+def test_new_event_loop():
+    client = AsyncKorbitClient()
+
+    async def main():
+        async with AsyncStubServer({'ticker': {'last': '1'}}) as server:
+            client.base_url = server.base_url
+            return await client.get('ticker')
+
+    # The session from the first loop is never closed
+    assert run(main()) == {'last': '1'}
+    assert run(main()) == {'last': '1'}
+    run(client.close())
+
+
+def test_place_order(token):
+    async def main():
+        routes = {('POST', 'user/orders/buy'): {'status': 'success'}}
+        async with AsyncStubServer(routes) as server:
+            async with AsyncKorbitClient(server.base_url) as client:
+                aio.set_default_client(client)
+                result = await aio.place_order('buy', price=500000.5,
+                                               coin_amount=0.1)
+        return server, result
+
+    server, result = run(main())
+    assert result == {'status': 'success'}
+    method, endpoint, params = server.requests[0]
+    assert params['price'] == ['500000']
+    assert params['access_token'] == ['secret']
+
+
+def test_error():
+    async def main():
+        async with AsyncStubServer() as server:
+            async with AsyncKorbitClient(server.base_url) as client:
+                await client.get('constants')
+
+    with pytest.raises(Exception) as excinfo:
+        run(main())
+    assert str(excinfo.value).startswith('404')
+
+
+def test_fan_out():
+    async def slow_ticker(method, params):
+        await asyncio.sleep(0.05)
+        return 200, {'currency_pair': params['currency_pair'][0]}
+
+    async def main():
+        async with AsyncStubServer({'ticker': slow_ticker}) as server:
+            async with AsyncKorbitClient(server.base_url, limit=50) as client:
+                aio.set_default_client(client)
+                started = time.time()
+                tickers = await asyncio.gather(
+                    *[aio.get_ticker(str(i)) for i in range(200)])
+                elapsed = time.time() - started
+        return server, tickers, elapsed
+
+    server, tickers, elapsed = run(main())
+    assert [t['currency_pair'] for t in tickers] == \
+        [str(i) for i in range(200)]
+    assert server.max_in_flight == 50
+    # 200 sequential calls would take at least 10 seconds
+    assert elapsed < 2.0
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(public=TokenBucket(rate=50, capacity=1))
+
+    async def main():
+        async with AsyncStubServer({'ticker': {}}) as server:
+            async with AsyncKorbitClient(server.base_url,
+                                         rate_limiter=limiter) as client:
+                started = time.time()
+                await asyncio.gather(*[client.get('ticker')
+                                       for _ in range(6)])
+                return time.time() - started
+
+    # One token up front, then five more at 50 per second
+    assert 0.08 <= run(main()) < 0.5
+    assert limiter.metrics()['public']['priorities']['market_data'][
+        'acquired'] == 6
+
+
+def test_order_behind_saturated_public_lane():
+    limiter = RateLimiter(public=TokenBucket(rate=5, capacity=1))
+
+    async def main():
+        routes = {'ticker': {}, ('POST', 'user/orders/buy'): {}}
+        async with AsyncStubServer(routes) as server:
+            async with AsyncKorbitClient(server.base_url,
+                                         rate_limiter=limiter) as client:
+                polls = [asyncio.ensure_future(client.get('ticker'))
+                         for _ in range(60)]
+                await asyncio.sleep(0.05)
+
+                started = time.time()
+                await client.post('user/orders/buy')
+                elapsed = time.time() - started
+
+                for poll in polls:
+                    poll.cancel()
+                await asyncio.gather(*polls, return_exceptions=True)
+        return elapsed
+
+    # The private lane is untouched by the queued polls
+    assert run(main()) < 0.2
+    assert limiter.public.queue_depth == 0
+
+
+def test_iter_user_transactions(token):
+    history = [{'id': str(i)} for i in range(45)]
+
+    def route(method, params):
+        # The server returns at most 10 records per page
+        offset, limit = int(params['offset'][0]), int(params['limit'][0])
+        return 200, history[offset:offset + min(limit, 10)]
+
+    async def main():
+        async with AsyncStubServer({'user/transactions': route}) as server:
+            async with AsyncKorbitClient(server.base_url) as client:
+                aio.set_default_client(client)
+                return [t async for t in
+                        aio.iter_user_transactions(page_size=20)]
+
+    assert run(main()) == history
+
+
+def test_get_orderbooks():
+    async def orderbook(method, params):
+        await asyncio.sleep(0.1)
+        return 200, dict(ORDERBOOK, pair=params['currency_pair'][0])
+
+    async def main():
+        routes = {'orderbook': orderbook,
+                  'constants': {'exchange': {'btc_krw': {}, 'eth_krw': {}}}}
+        async with AsyncStubServer(routes) as server:
+            async with AsyncKorbitClient(server.base_url) as client:
+                aio.set_default_client(client)
+                return await aio.get_orderbooks()
+
+    books = run(main())
+    assert sorted(books) == ['btc_krw', 'eth_krw']
+    assert books['eth_krw']['pair'] == 'eth_krw'
+
+
+def test_cancel_all_orders(token):
+    def cancel(method, params):
+        return 200, [{'orderId': i, 'status': 'success'}
+                     for i in params['id']]
+
+    async def main():
+        routes = {'user/orders/open': [{'id': str(i), 'type': 'ask'}
+                                       for i in range(60)],
+                  ('POST', 'user/orders/cancel'): cancel}
+        async with AsyncStubServer(routes) as server:
+            async with AsyncKorbitClient(server.base_url) as client:
+                aio.set_default_client(client)
+                return await aio.cancel_all_orders(batch_size=25)
+
+    report = run(main())
+    assert report == {str(i): 'success' for i in range(60)}
@@ -0,0 +1,204 @@
+"""Offline tests of :mod:`korbit.api` against a local stub server."""
+import threading
+import time
+
+import pytest
+
+from korbit import api
+
+
+def make_history(count):
+    categories = ('fills', 'fiats', 'coins')
+    return [{'id': str(count - i), 'type': 'buy',
+             'category': categories[i % 3]} for i in range(count)]
+
+
+def history_route(history, delay=0, max_limit=None):
+    def route(method, params):
+        time.sleep(delay)
+        records = history
+        if 'category' in params:
+            records = [r for r in records
+                       if r['category'] == params['category'][0]]
+        offset = int(params.get('offset', ['0'])[0])
+        limit = int(params.get('limit', ['10'])[0])
+        if max_limit is not None:
+            limit = min(limit, max_limit)
+        return 200, records[offset:offset + limit]
+    return route
+
+
+def test_get_user_transactions(stub_api):
+    server = stub_api({'user/transactions': history_route(make_history(50))})
+
+    page = api.get_user_transactions('fills', offset=3, limit=5)
+
+    assert len(page) == 5
+    _, _, params = server.requests[-1]
+    assert params['category'] == ['fills']
+    assert params['offset'] == ['3']
+    assert 'currency_pair' not in params
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_iter_user_transactions(stub_api, prefetch):
+    history = make_history(95)
+    server = stub_api({'user/transactions': history_route(history)})
+
+    records = list(api.iter_user_transactions(page_size=20,
+                                              prefetch=prefetch))
+
+    assert records == history
+    assert [p['offset'] for _, _, p in server.requests] == \
+        [['0'], ['20'], ['40'], ['60'], ['80'], ['95']]
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_iter_user_transactions_capped_pages(stub_api, prefetch):
+    history = make_history(35)
+    stub_api({'user/transactions': history_route(history, max_limit=10)})
+
+    records = list(api.iter_user_transactions(page_size=40,
+                                              prefetch=prefetch))
+
+    assert records == history
+
+
+def test_iter_user_transactions_by_category(stub_api):
+    history = make_history(95)
+    stub_api({'user/transactions': history_route(history)})
+
+    records = list(api.iter_user_transactions('coins', page_size=10))
+
+    assert records == [r for r in history if r['category'] == 'coins']
+
+
+def test_iter_user_transactions_prefetch(stub_api):
+    server = stub_api({'user/transactions': history_route(make_history(95))})
+    iterator = api.iter_user_transactions(page_size=20)
+
+    next(iterator)
+    deadline = time.time() + 2
+    while len(server.requests) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    # The second page is requested while the first one is being consumed
+    assert len(server.requests) == 2
+    iterator.close()
+
+
+def orderbook_route(delay=0):
+    def route(method, params):
+        time.sleep(delay)
+        pair = params['currency_pair'][0]
+        return 200, {'timestamp': 1386135077000, 'pair': pair,
+                     'bids': [['677300', '3.5', '1']],
+                     'asks': [['679500', '0.1', '2']]}
+    return route
+
+
+def test_get_orderbook_by_pair(stub_api):
+    server = stub_api({'orderbook': orderbook_route()})
+
+    assert api.get_orderbook(currency_pair='eth_krw')['pair'] == 'eth_krw'
+    assert api.get_orderbook('bids')[0].price == 677300
+    assert server.requests[-1][2] == {'currency_pair': ['btc_krw']}
+
+
+def test_get_orderbooks(stub_api):
+    pairs = ['btc_krw', 'eth_krw', 'xrp_krw', 'bch_krw', 'etc_krw',
+             'ltc_krw', 'zil_krw', 'qtum_krw']
+    server = stub_api({
+        'orderbook': orderbook_route(delay=0.2),
+        'constants': {'exchange': {pair: {} for pair in pairs}},
+    })
+
+    started = time.time()
+    books = api.get_orderbooks(columnar=True)
+    elapsed = time.time() - started
+
+    assert sorted(books) == sorted(pairs)
+    assert books['eth_krw'].bids.best_price == 677300
+    # Sequential fetches would take 8 * 0.2 seconds
+    assert elapsed < 0.8
+
+
+def test_get_tickers(stub_api):
+    stub_api({'ticker': lambda method, params: (
+        200, {'pair': params['currency_pair'][0]})})
+
+    tickers = api.get_tickers(['btc_krw', 'eth_krw'])
+
+    assert tickers == {'btc_krw': {'pair': 'btc_krw'},
+                       'eth_krw': {'pair': 'eth_krw'}}
+    assert api.get_tickers([]) == {}
+
+
+def cancel_route(delay=0, fail_first=0):
+    """Rejects nonces at or below the highest one seen, like the server."""
+    state = {'failures': fail_first, 'nonce': 0}
+    lock = threading.Lock()
+
+    def route(method, params):
+        time.sleep(delay)
+        with lock:
+            nonce = int(params['nonce'][0])
+            if nonce <= state['nonce']:
+                return 400, {'error': 'invalid nonce'}
+            state['nonce'] = nonce
+            if state['failures']:
+                state['failures'] -= 1
+                return 500, {'error': 'internal error'}
+        return 200, [{'orderId': i,
+                      'status': 'not_found' if i == '7' else 'success'}
+                     for i in params['id']]
+    return route
+
+
+def test_cancel_all_orders(stub_api):
+    open_orders = [{'id': str(i), 'type': 'bid'} for i in range(120)]
+    server = stub_api({
+        'user/orders/open': open_orders,
+        ('POST', 'user/orders/cancel'): cancel_route(delay=0.2),
+    })
+
+    started = time.time()
+    report = api.cancel_all_orders('btc_krw')
+    elapsed = time.time() - started
+
+    assert len(report) == 120
+    assert report['7'] == 'not_found'
+    assert set(report.values()) == {'success', 'not_found'}
+
+    cancels = [p for m, e, p in server.requests if e == 'user/orders/cancel']
+    assert [len(p['id']) for p in cancels] == [120]
+    assert cancels[0]['currency_pair'] == ['btc_krw']
+    # One cancel per order, sequentially, would take 120 * 0.2 seconds
+    assert elapsed < 0.4
+
+
+def test_cancel_orders_in_batches(stub_api):
+    server = stub_api({('POST', 'user/orders/cancel'): cancel_route()})
+
+    report = api.cancel_orders(range(120), batch_size=50)
+
+    assert set(report.values()) == {'success', 'not_found'}
+    cancels = [p for m, e, p in server.requests]
+    assert [len(p['id']) for p in cancels] == [50, 50, 20]
+
+
+def test_cancel_orders_retries_failed_batch(stub_api):
+    stub_api({('POST', 'user/orders/cancel'): cancel_route(fail_first=1)})
+
+    report = api.cancel_orders(range(10, 20), batch_size=5)
+
+    assert report == {str(i): 'success' for i in range(10, 20)}
+
+
+def test_cancel_orders_reports_errors(stub_api):
+    stub_api({('POST', 'user/orders/cancel'): cancel_route(fail_first=2)})
+
+    report = api.cancel_orders([1, 2])
+
+    assert report['1'].startswith('error: 500')
+    assert api.cancel_orders([]) == {}
@@ -0,0 +1,141 @@
+import json
+import random
+
+import pytest
+
+from korbit.archive import OrderBookArchive
+from korbit.orderbook import LocalOrderBook
+
+
+def make_snapshots(count, seed=0):
+    rng = random.Random(seed)
+    bids = {677300 - 100 * i: 1.0 for i in range(20)}
+    asks = {679500 + 100 * i: 1.0 for i in range(20)}
+    snapshots = []
+    for i in range(count):
+        for levels in (bids, asks):
+            price = rng.choice(sorted(levels))
+            if rng.random() < 0.2 and len(levels) > 5:
+                del levels[price]
+            else:
+                levels[price + rng.choice((-50, 50))] = round(
+                    rng.random() * 3, 8)
+        snapshots.append({
+            'timestamp': 1386135077000 + 1000 * i,
+            'bids': [[str(p), '{:.8f}'.format(a), '1']
+                     for p, a in bids.items()],
+            'asks': [[str(p), '{:.8f}'.format(a), '1']
+                     for p, a in asks.items()],
+        })
+    return snapshots
+
+
+def expected_book(snapshot, fixed_point=False):
+    book = LocalOrderBook(fixed_point=fixed_point)
+    book.update(snapshot)
+    return book
+
+
+def assert_same(book, expected):
+    assert book.timestamp == expected.timestamp
+    assert dict(book.bids) == dict(expected.bids)
+    assert dict(book.asks) == dict(expected.asks)
+
+
+@pytest.mark.parametrize('compression', ['zlib', 'lzma', 'none'])
+def test_book_at(tmpdir, compression):
+    snapshots = make_snapshots(50)
+    path = str(tmpdir.join('btc_krw.obk'))
+    with OrderBookArchive(path, keyframe_interval=8,
+                          compression=compression) as archive:
+        archive.extend(snapshots)
+
+        assert len(archive) == 50
+        for i in (0, 7, 8, 9, 31, 49):
+            assert_same(archive.book_at(snapshots[i]['timestamp']),
+                        expected_book(snapshots[i]))
+        # Between snapshots, the earlier one applies
+        assert_same(archive.book_at(snapshots[20]['timestamp'] + 500),
+                    expected_book(snapshots[20]))
+        with pytest.raises(KeyError):
+            archive.book_at(0)
+
+
+def test_smaller_than_json(tmpdir):
+    snapshots = make_snapshots(200)
+    path = str(tmpdir.join('btc_krw.obk'))
+    with OrderBookArchive(path) as archive:
+        archive.extend(snapshots)
+
+    size = tmpdir.join('btc_krw.obk').size() + \
+        tmpdir.join('btc_krw.obk.idx').size()
+    assert size * 5 < len(json.dumps(snapshots))
+
+
+def test_reopen_and_append(tmpdir):
+    snapshots = make_snapshots(30)
+    path = str(tmpdir.join('btc_krw.obk'))
+    with OrderBookArchive(path, keyframe_interval=8,
+                          compression='lzma') as archive:
+        archive.extend(snapshots[:13])
+
+    with OrderBookArchive(path, keyframe_interval=8) as archive:
+        assert archive.compression == 'lzma'
+        archive.extend(snapshots[13:])
+        assert_same(archive.book_at(snapshots[-1]['timestamp']),
+                    expected_book(snapshots[-1]))
+
+        with pytest.raises(ValueError):
+            archive.append(snapshots[0])
+
+
+def test_interrupted_write(tmpdir):
+    snapshots = make_snapshots(5)
+    path = str(tmpdir.join('btc_krw.obk'))
+    with OrderBookArchive(path) as archive:
+        archive.extend(snapshots[:3])
+
+    # A writer died after writing part of a record and its index entry
+    with open(path, 'ab') as f:
+        f.write(b'\x10\0\0\0partial')
+    with open(path + '.idx', 'ab') as f:
+        f.write(b'\0' * 7)
+
+    with OrderBookArchive(path) as archive:
+        assert len(archive) == 3
+        archive.extend(snapshots[3:])
+
+    archive = OrderBookArchive(path)
+    assert archive.timestamps() == [s['timestamp'] for s in snapshots]
+    assert_same(archive.book_at(snapshots[-1]['timestamp']),
+                expected_book(snapshots[-1]))
+    archive.close()
+
+
+def test_replay(tmpdir):
+    snapshots = make_snapshots(40)
+    path = str(tmpdir.join('btc_krw.obk'))
+    with OrderBookArchive(path, keyframe_interval=10) as archive:
+        archive.extend(snapshots)
+
+        live = expected_book(snapshots[14])
+        replayed = list(archive.replay(snapshots[15]['timestamp'],
+                                       snapshots[25]['timestamp']))
+
+    assert len(replayed) == 10
+    for (book, changes), snapshot in zip(replayed, snapshots[15:25]):
+        assert sorted(changes) == sorted(live.update(snapshot))
+    assert_same(book, live)
+
+
+def test_fixed_point(tmpdir):
+    snapshots = make_snapshots(20)
+    path = str(tmpdir.join('btc_krw.obk'))
+    with OrderBookArchive(path, keyframe_interval=4,
+                          fixed_point=True) as archive:
+        archive.extend(snapshots)
+        book = archive.book_at(snapshots[-1]['timestamp'])
+
+    assert book.fixed_point
+    assert_same(book, expected_book(snapshots[-1], fixed_point=True))
+    assert all(isinstance(a, int) for a, _ in book.bids.values())
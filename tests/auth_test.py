@@ -0,0 +1,109 @@
+import threading
+import time
+
+from korbit.auth import TokenManager, load_dict, store_dict
+
+
+class FakeIssuer(object):
+    def __init__(self, expires_in=3600, delay=0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {'access_token': 'token{}'.format(self.calls),
+                'expires_in': self.expires_in, 'issued_at': time.time()}
+
+
+def test_in_memory(tmpdir):
+    path = str(tmpdir.join('token.json'))
+    issuer = FakeIssuer()
+    manager = TokenManager(issuer, path=path, background=False)
+
+    assert manager.get()['access_token'] == 'token1'
+    assert manager.get()['access_token'] == 'token1'
+    assert issuer.calls == 1
+    assert load_dict(path)['access_token'] == 'token1'
+
+
+def test_load_from_disk(tmpdir):
+    path = str(tmpdir.join('token.json'))
+    store_dict(path, {'access_token': 'stored', 'expires_in': 3600,
+                      'issued_at': time.time()})
+    issuer = FakeIssuer()
+    manager = TokenManager(issuer, path=path, background=False)
+
+    assert manager.get()['access_token'] == 'stored'
+    assert issuer.calls == 0
+
+
+def test_expired_on_disk(tmpdir):
+    path = str(tmpdir.join('token.json'))
+    store_dict(path, {'access_token': 'stored', 'expires_in': 3600,
+                      'issued_at': time.time() - 7200})
+    issuer = FakeIssuer()
+    manager = TokenManager(issuer, path=path, background=False)
+
+    assert manager.get()['access_token'] == 'token1'
+
+
+def test_single_flight():
+    issuer = FakeIssuer(delay=0.1)
+    manager = TokenManager(issuer, path=None, background=False)
+    results = []
+
+    def worker():
+        results.append(manager.get()['access_token'])
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert issuer.calls == 1
+    assert results == ['token1'] * 20
+
+
+def test_refresh_before_expiry():
+    issuer = FakeIssuer(expires_in=0.2)
+    manager = TokenManager(issuer, path=None, refresh_margin=0.1,
+                           background=False)
+
+    assert manager.get()['access_token'] == 'token1'
+    time.sleep(0.15)
+    assert manager.current() is None
+    assert manager.get()['access_token'] == 'token2'
+
+
+def test_get_during_background_refresh():
+    issuer = FakeIssuer(expires_in=1.0, delay=0.3)
+    manager = TokenManager(issuer, path=None, refresh_margin=0.5)
+
+    try:
+        assert manager.get()['access_token'] == 'token1'
+        time.sleep(0.6)  # the background refresh is in flight
+
+        started = time.time()
+        assert manager.get()['access_token'] == 'token1'
+        assert time.time() - started < 0.05
+
+        time.sleep(0.4)
+        assert manager.get()['access_token'] == 'token2'
+    finally:
+        manager.close()
+
+
+def test_background_refresh():
+    issuer = FakeIssuer(expires_in=0.3)
+    manager = TokenManager(issuer, path=None, refresh_margin=0.2)
+
+    try:
+        assert manager.get()['access_token'] == 'token1'
+        time.sleep(0.25)
+        assert issuer.calls >= 2
+        assert manager.current()['access_token'] != 'token1'
+    finally:
+        manager.close()
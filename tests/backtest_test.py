@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from korbit.backtest import BUY, SELL, ORDER_DTYPE, Depth, backtest, \
+    fee_rate, grid_search, moving_average, orders_from_targets, \
+    simulate_fills
+from korbit.tickstore import TICK_DTYPE
+
+
+def make_ticks(prices):
+    ticks = np.zeros(len(prices), dtype=TICK_DTYPE)
+    ticks['timestamp'] = np.arange(len(prices)) * 1000
+    ticks['tid'] = np.arange(len(prices))
+    ticks['price'] = prices
+    ticks['amount'] = 1
+    return ticks
+
+
+def make_depth():
+    books = [{
+        'timestamp': 0,
+        'bids': [['990', '1', '1'], ['980', '2', '1']],
+        'asks': [['1010', '1', '1'], ['1020', '2', '1']],
+    }, {
+        'timestamp': 5000,
+        'bids': [['1090', '1', '1']],
+        'asks': [['1110', '0.5', '1'], ['1120', '0.5', '1']],
+    }]
+    return Depth.from_books(books, levels=3)
+
+
+def make_orders(rows):
+    return np.array(rows, dtype=ORDER_DTYPE)
+
+
+def momentum(ticks, depth, window=2, size=1.0):
+    prices = ticks['price']
+    targets = np.where(prices > moving_average(prices, window), size, 0.0)
+    return orders_from_targets(ticks['timestamp'], targets)
+
+
+def test_fee_rate():
+    assert fee_rate({'transactionFee': '0.002'}) == 0.002
+    assert fee_rate({'exchange': {'btc_krw': {'taker_fee': '0.0005'}},
+                     'transactionFee': '0.002'}) == 0.0005
+
+
+def test_moving_average():
+    assert moving_average([1, 2, 3, 4], 2).tolist() == [1, 1.5, 2.5, 3.5]
+
+
+def test_orders_from_targets():
+    orders = orders_from_targets([0, 1, 2, 3], [0, 1, 1, 0.5])
+
+    assert orders['timestamp'].tolist() == [1, 3]
+    assert orders['side'].tolist() == [BUY, SELL]
+    assert orders['amount'].tolist() == [1, 0.5]
+
+
+def test_fills_against_depth():
+    orders = make_orders([
+        (1000, BUY, 2, np.nan),      # walks two ask levels
+        (1000, SELL, 1.5, 985),      # the 980 level is below the limit
+        (6000, BUY, 2, np.nan),      # the second book is too thin
+        (-1, BUY, 1, np.nan),        # before the first snapshot
+    ])
+    fills = simulate_fills(orders, make_depth(), fee=0.001)
+
+    assert fills['filled'].tolist() == [2, 1, 1, 0]
+    assert fills['price'][0] == (1010 + 1020) / 2
+    assert fills['price'][1] == 990
+    assert fills['price'][2] == 1115
+    assert np.isnan(fills['price'][3])
+    assert fills['fee'][0] == pytest.approx(2030 * 0.001)
+    assert fills['fee'][3] == 0
+
+
+def test_fills_against_ticks():
+    ticks = make_ticks([100, 110, 120])
+    orders = make_orders([(1500, BUY, 1, np.nan), (2000, BUY, 1, 115)])
+    fills = simulate_fills(orders, ticks=ticks)
+
+    assert fills['filled'].tolist() == [1, 0]
+    assert fills['price'][0] == 110
+
+
+def test_chunks():
+    orders = make_orders([(1000 * i, BUY, 1, np.nan) for i in range(10)])
+    depth = make_depth()
+
+    whole = simulate_fills(orders, depth)
+    chunked = simulate_fills(orders, depth, chunk_size=3)
+    assert whole.tobytes() == chunked.tobytes()
+
+
+def test_backtest():
+    ticks = make_ticks([100, 110, 120, 90, 80])
+    result = backtest(momentum, ticks, fee=0.01, window=2)
+
+    # Buys at 110, sells at 90
+    assert result.trades == 2
+    assert result.position == 0
+    summary = result.summary(ticks)
+    assert summary['pnl'] == pytest.approx(-20 - 0.01 * (110 + 90))
+    # From 120 marked to market after buying, to the loss after selling
+    assert summary['max_drawdown'] == pytest.approx((120 - 111.1) + 22)
+    assert result.equity(ticks)[0] == 0
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_grid_search(processes):
+    ticks = make_ticks(100 + 10 * np.sin(np.arange(200) / 5.0))
+    results = grid_search(momentum, ticks, {'window': [2, 5],
+                                            'size': [1, 2]},
+                          processes=processes)
+
+    assert [params for params, _ in results] == [
+        {'size': 1, 'window': 2}, {'size': 1, 'window': 5},
+        {'size': 2, 'window': 2}, {'size': 2, 'window': 5}]
+    one, two = results[0][1], results[2][1]
+    assert two['pnl'] == pytest.approx(2 * one['pnl'])
@@ -0,0 +1,19 @@
+import json
+
+from benchmarks import fixtures, run
+from korbit.api import parse_orderbook
+
+
+def test_fixture_orderbook():
+    book = parse_orderbook(fixtures.orderbook(100), columnar=True)
+
+    assert len(book.bids) == len(book.asks) == 100
+    assert book.spread == 500
+
+
+def test_run():
+    report = run.run(quick=True, names=('orderbook_parse', 'auth_overhead'))
+
+    assert sorted(report['results']) == ['auth_overhead', 'orderbook_parse']
+    assert report['results']['orderbook_parse']['columnar_100']['mean_ms'] > 0
+    json.dumps(report)
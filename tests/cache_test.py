@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from korbit.cache import ResponseCache
+from korbit.client import KorbitClient
+from tests.stub import StubServer
+
+
+@pytest.fixture
+def server():
+    routes = {
+        'constants': {'minBtcOrder': '0.01'},
+        'ticker': lambda method, params: (
+            200, {'pair': params['currency_pair'][0], 'at': time.time()}),
+        'transactions': [],
+    }
+    with StubServer(routes) as server:
+        yield server
+
+
+def test_ttl(server):
+    cache = ResponseCache(ttls={'ticker': 0.2})
+    with KorbitClient(server.base_url, cache=cache) as client:
+        first = client.get('ticker', currency_pair='btc_krw')
+        assert client.get('ticker', currency_pair='btc_krw') == first
+        assert client.get('ticker', currency_pair='eth_krw') != first
+        time.sleep(0.25)
+        assert client.get('ticker', currency_pair='btc_krw') != first
+
+    assert len(server.requests) == 3
+    stats = cache.stats('ticker')
+    assert (stats.hits, stats.misses) == (1, 3)
+
+
+def test_uncached_endpoint(server):
+    cache = ResponseCache()
+    with KorbitClient(server.base_url, cache=cache) as client:
+        client.get('transactions', time='hour')
+        client.get('transactions', time='hour')
+
+    assert len(server.requests) == 2
+    assert cache.stats().misses == 0
+
+
+def test_lru_eviction():
+    cache = ResponseCache(ttls={'ticker': 60}, maxsize=2)
+    for pair in ('btc_krw', 'eth_krw'):
+        cache.put('ticker', {'currency_pair': pair}, pair)
+    cache.get('ticker', {'currency_pair': 'btc_krw'})
+    cache.put('ticker', {'currency_pair': 'xrp_krw'}, 'xrp_krw')
+
+    assert cache.get('ticker', {'currency_pair': 'btc_krw'}) == \
+        (True, 'btc_krw')
+    assert cache.get('ticker', {'currency_pair': 'eth_krw'}) == (False, None)
+    assert cache.stats().evictions == 1
+
+
+def test_persistence(server, tmpdir):
+    path = str(tmpdir.join('cache.json'))
+    with KorbitClient(server.base_url,
+                      cache=ResponseCache(persist=path)) as client:
+        client.get('constants')
+        client.get('ticker', currency_pair='btc_krw')
+
+    cache = ResponseCache(persist=path)
+    assert len(cache) == 1
+    with KorbitClient(server.base_url, cache=cache) as client:
+        assert client.get('constants') == {'minBtcOrder': '0.01'}
+
+    assert len(server.requests) == 2
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from korbit.candles import CandleBuilder, build_candles
+from korbit.tickstore import TICK_DTYPE
+
+T0 = 1389657600000
+
+
+def make_ticks(rows):
+    """``rows`` of ``(seconds after T0, price, amount)``; tid is the row
+    index."""
+    ticks = np.empty(len(rows), dtype=TICK_DTYPE)
+    for i, (seconds, price, amount) in enumerate(rows):
+        ticks[i] = (T0 + seconds * 1000, i, price, amount)
+    return ticks
+
+
+ROWS = [(0, 100, 1), (10, 105, 2), (50, 95, 1), (65, 101, 3), (200, 110, 1)]
+
+
+def test_build_candles():
+    candles = build_candles(make_ticks(ROWS), '1m')
+
+    assert candles['time'].tolist() == [T0, T0 + 60000, T0 + 180000]
+    assert candles['open'].tolist() == [100, 101, 110]
+    assert candles['high'].tolist() == [105, 101, 110]
+    assert candles['low'].tolist() == [95, 101, 110]
+    assert candles['close'].tolist() == [95, 101, 110]
+    assert candles['volume'].tolist() == [4, 3, 1]
+    assert candles['count'].tolist() == [3, 1, 1]
+
+    assert build_candles(make_ticks(ROWS), '5m')['volume'].tolist() == [8]
+    assert len(build_candles(make_ticks([]), '1h')) == 0
+
+
+def test_unsorted_ticks():
+    ticks = make_ticks(ROWS)
+    assert (build_candles(ticks[::-1], '1m') ==
+            build_candles(ticks, '1m')).all()
+
+
+def test_invalid_interval():
+    with pytest.raises(ValueError):
+        build_candles(make_ticks(ROWS), '7x')
+
+
+def test_incremental_matches_batch():
+    ticks = make_ticks(ROWS)
+    builder = CandleBuilder('1m')
+
+    assert builder.update(ticks[:2]) == 1
+    assert builder.update(ticks[1:4]) == 2  # overlapping poll
+    assert builder.update(ticks[4:]) == 1
+    assert builder.update(ticks) == 0
+
+    assert (builder.candles == build_candles(ticks, '1m')).all()
+
+
+def test_builder_growth():
+    rows = [(i * 60, 100 + i % 7, 1) for i in range(500)]
+    ticks = make_ticks(rows)
+    builder = CandleBuilder('1m')
+    for chunk in np.array_split(ticks, 37):
+        builder.update(chunk)
+
+    assert len(builder) == 500
+    assert (builder.candles == build_candles(ticks, '1m')).all()
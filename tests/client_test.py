@@ -0,0 +1,53 @@
+import pytest
+
+from korbit.client import KorbitClient
+from tests.stub import StubServer
+
+
+@pytest.fixture
+def server():
+    routes = {
+        'ticker': lambda method, params: (
+            200, {'currency_pair': params['currency_pair'][0]}),
+        ('POST', 'user/orders/buy'): {'status': 'success'},
+        'constants': lambda method, params: (500, {'error': 'oops'}),
+    }
+    with StubServer(routes) as server:
+        yield server
+
+
+def test_get(server):
+    with KorbitClient(server.base_url) as client:
+        assert client.get('ticker', currency_pair='eth_krw') == \
+            {'currency_pair': 'eth_krw'}
+
+
+def test_post(server):
+    with KorbitClient(server.base_url) as client:
+        assert client.post('user/orders/buy', price=1000) == \
+            {'status': 'success'}
+
+    method, endpoint, params = server.requests[-1]
+    assert (method, endpoint) == ('POST', 'user/orders/buy')
+    assert params == {'price': ['1000']}
+
+
+def test_error(server):
+    with KorbitClient(server.base_url) as client:
+        with pytest.raises(Exception) as excinfo:
+            client.get('constants')
+    assert str(excinfo.value).startswith('500')
+
+
+def test_keep_alive(server):
+    with KorbitClient(server.base_url) as client:
+        for _ in range(5):
+            client.get('ticker', currency_pair='btc_krw')
+    assert server.connection_count == 1
+
+
+def test_no_keep_alive(server):
+    with KorbitClient(server.base_url, keep_alive=False) as client:
+        for _ in range(3):
+            client.get('ticker', currency_pair='btc_krw')
+    assert server.connection_count == 3
@@ -0,0 +1,32 @@
+import pytest
+
+from korbit import api, models
+from korbit.client import KorbitClient
+from tests.stub import StubServer
+
+
+@pytest.fixture
+def db(tmpdir):
+    """Points :mod:`korbit.models` at a scratch SQLite database."""
+    default_url = models.DATABASE_URL
+    models.configure('sqlite:///{}'.format(tmpdir.join('korbit.db')))
+    models.init_db()
+    yield models.session
+    models.configure(default_url)
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    def serve(routes):
+        server = StubServer(routes).start()
+        servers.append(server)
+        api.set_default_client(KorbitClient(server.base_url))
+        return server
+
+    servers = []
+    monkeypatch.setattr(api, 'access_token',
+                        lambda: {'access_token': 'secret'})
+    yield serve
+    api.set_default_client(None)
+    for server in servers:
+        server.stop()
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from korbit import api
+from korbit.client import KorbitClient
+from korbit.decoder import get_decoder
+from tests.stub import StubServer
+
+
+@pytest.mark.parametrize('name', ['json', 'orjson', 'ujson'])
+def test_backends(name):
+    if name != 'json':
+        pytest.importorskip(name)
+    decode = get_decoder(name)
+    assert decode(b'{"price": "1000", "tid": 1}') == \
+        {'price': '1000', 'tid': 1}
+
+
+def test_default():
+    assert get_decoder()(b'[1, 2]') == [1, 2]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_decoder('yaml')
+
+
+def test_client_decoder():
+    seen = []
+
+    def decode(data):
+        seen.append(data)
+        return json.loads(data)
+
+    with StubServer({'ticker': {'last': '1000'}}) as server:
+        with KorbitClient(server.base_url, decoder=decode) as client:
+            assert client.get('ticker') == {'last': '1000'}
+    assert len(seen) == 1 and isinstance(seen[0], bytes)
+
+
+def test_numeric_transactions(stub_api):
+    transactions = [
+        {'timestamp': 2000, 'tid': '2', 'price': '1001', 'amount': '0.5'},
+        {'timestamp': 1000, 'tid': '1', 'price': '1000', 'amount': '0.25'},
+    ]
+    stub_api({'transactions': transactions})
+
+    assert api.get_transactions() == transactions
+
+    ticks = api.get_transactions(numeric=True)
+    assert ticks['tid'].tolist() == [1, 2]
+    assert ticks['price'].tolist() == [1000.0, 1001.0]
+    assert ticks['amount'].tolist() == [0.25, 0.5]
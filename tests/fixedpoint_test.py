@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+import pytest
+
+from korbit.fixedpoint import AMOUNT_DECIMALS, PRICE_DECIMALS, \
+    currency_decimals, from_units, to_units
+from korbit.models import Order
+
+
+@pytest.mark.parametrize('value, units', [
+    ('2.40000000', 240000000),
+    ('0.1', 10000000),
+    ('-0.5', -50000000),
+    ('.5', 50000000),
+    ('1e-8', 1),
+    ('0.000000015', 2),  # half to even
+    (3, 300000000),
+    (0.1, 10000000),
+    (Decimal('1.23'), 123000000),
+])
+def test_to_units(value, units):
+    assert to_units(value, AMOUNT_DECIMALS) == units
+
+
+def test_prices():
+    assert to_units('677300', PRICE_DECIMALS) == 677300
+    assert to_units('677300.0', PRICE_DECIMALS) == 677300
+    assert currency_decimals('KRW') == PRICE_DECIMALS
+    assert currency_decimals('btc') == AMOUNT_DECIMALS
+
+
+def test_from_units():
+    assert from_units(240000000, AMOUNT_DECIMALS) == '2.40000000'
+    assert from_units(-5, AMOUNT_DECIMALS) == '-0.00000005'
+    assert from_units(677300, PRICE_DECIMALS) == '677300'
+
+
+def test_order():
+    order = Order('bid', ['1234550', '0.10000001', '3'], fixed_point=True)
+
+    assert (order.price, order.amount) == (1234550, 10000001)
+    assert order.floored_price == 1234500
+    assert order.ceilinged_price == 1234600
+    assert all(isinstance(p, int) for p in (order.rounded_price,
+                                            order.ceilinged_price,
+                                            order.floored_price))
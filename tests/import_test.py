@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.check_output([sys.executable, '-c', code], cwd=cwd,
+                                   env=env, universal_newlines=True).strip()
+
+
+def test_api_skips_sqlalchemy(tmpdir):
+    loaded = run('import sys, korbit.api; '
+                 'print("sqlalchemy" in sys.modules, "numpy" in sys.modules)',
+                 str(tmpdir))
+    assert loaded == 'False False'
+
+
+def test_models_are_lazy(tmpdir):
+    run('import korbit.models', str(tmpdir))
+    assert tmpdir.listdir() == []
+
+    run('from korbit import models; models.init_db()', str(tmpdir))
+    assert tmpdir.join('korbit.db').check()
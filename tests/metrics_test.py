@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+import requests
+
+from korbit import api
+from korbit.client import KorbitClient, KorbitError
+from korbit.metrics import Histogram, MetricsRegistry
+from tests.stub import AsyncStubServer, StubServer
+
+
+@pytest.fixture
+def server():
+    routes = {
+        'ticker': {'last': '1000'},
+        ('POST', 'user/orders/buy'): {'status': 'success'},
+        'constants': lambda method, params: (500, {'error': 'oops'}),
+    }
+    headers = {'X-RateLimit-Remaining': '7', 'X-Other': 'ignored'}
+    with StubServer(routes, headers) as server:
+        yield server
+
+
+def test_histogram_quantile():
+    histogram = Histogram(buckets=(1, 2, 4))
+    assert histogram.quantile(0.5) is None
+
+    for value in (0.5, 1.5, 1.5, 3):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [(1, 1), (2, 3), (4, 4),
+                                      (float('inf'), 4)]
+    assert histogram.quantile(0.5) == 1.5
+    assert histogram.quantile(1.0) == 4
+
+
+def test_records(server):
+    records = []
+    with KorbitClient(server.base_url, hooks=[records.append]) as client:
+        client.get('ticker')
+        client.post('user/orders/buy', price=1000)
+
+    get, post = records
+    assert (get.method, get.endpoint, get.status) == ('GET', 'ticker', 200)
+    assert get.response_bytes == len(b'{"last": "1000"}')
+    assert get.rate_limit == {'x-ratelimit-remaining': '7'}
+    assert get.elapsed >= get.phases['ttfb'] >= 0
+    assert post.request_bytes == len('price=1000')
+    assert post.retries == 0 and post.error is None
+
+
+def test_error(server):
+    records = []
+    with KorbitClient(server.base_url, hooks=[records.append]) as client:
+        with pytest.raises(KorbitError) as excinfo:
+            client.get('constants')
+
+    assert str(excinfo.value).startswith('500')
+    assert excinfo.value.status == 500
+    assert excinfo.value.headers['X-RateLimit-Remaining'] == '7'
+    assert records[0].status == 500
+
+
+def test_transport_error():
+    registry = MetricsRegistry()
+    with KorbitClient('http://127.0.0.1:9/v1', hooks=[registry]) as client:
+        with pytest.raises(requests.ConnectionError):
+            client.get('ticker')
+
+    assert registry.requests() == {'ConnectionError': 1}
+
+
+def test_failing_hook(server):
+    def broken(record):
+        raise RuntimeError('broken hook')
+
+    with KorbitClient(server.base_url, hooks=[broken]) as client:
+        assert client.get('ticker') == {'last': '1000'}
+
+
+def test_registry(stub_api):
+    stub_api({'ticker': {'last': '1000'},
+              'constants': lambda method, params: (503, {})})
+    registry = api.enable_metrics()
+    try:
+        api.get_ticker()
+        api.get_ticker(currency_pair='eth_krw')
+        with pytest.raises(KorbitError):
+            api.get_constants()
+    finally:
+        api.disable_metrics()
+    api.get_ticker()
+
+    assert registry.requests('GET', 'ticker') == {'200': 2}
+    assert registry.requests() == {'200': 2, '503': 1}
+    assert registry.histogram('GET', 'ticker').count == 2
+    assert registry.quantile(0.99, 'GET', 'ticker') > 0
+
+    text = registry.render()
+    assert 'korbit_requests_total{method="GET",endpoint="ticker",' \
+        'status="200"} 2' in text
+    assert 'korbit_request_seconds_bucket{method="GET",endpoint="ticker",' \
+        'le="+Inf"} 2' in text
+
+
+def test_async_phases():
+    pytest.importorskip('aiohttp')
+    from korbit.aio import AsyncKorbitClient
+
+    records = []
+
+    async def main():
+        async with AsyncStubServer({'ticker': {'last': '1000'}}) as server:
+            async with AsyncKorbitClient(server.base_url,
+                                         hooks=[records.append]) as client:
+                await client.get('ticker')
+                await client.get('ticker')
+
+    asyncio.run(main())
+
+    first, second = records
+    assert first.status == 200
+    assert set(first.phases) >= {'connect', 'ttfb', 'body'}
+    assert 'connect' not in second.phases  # reused connection
@@ -1,4 +1,7 @@
-from korbit.models import Order
+from sqlalchemy import func, inspect, text
+
+from korbit import models
+from korbit.models import Order, Transaction
 
 
 def test_order_object1():
@@ -23,3 +26,71 @@ def test_order_object2():
     assert order.price == 400000
     assert order.amount == 0.2
     assert order.order_count == 3
+
+
+def make_transaction(id, type='buy', price='500000'):
+    return {
+        'id': str(id),
+        'type': type,
+        'timestamp': 1402448355000 + id,
+        'completedAt': 1402448277000 + id,
+        'fee': {'currency': 'btc', 'value': '0.00010000'},
+        'fillsDetail': {
+            'orderId': str(1000 + id),
+            'price': {'currency': 'krw', 'value': price},
+            'amount': {'currency': 'btc', 'value': '0.10000000'},
+        },
+        'balances': [{'currency': 'btc', 'value': '8.80000000'}],
+    }
+
+
+def test_insert(db):
+    Transaction.insert(make_transaction(1))
+    Transaction.insert(make_transaction(1))
+
+    transaction = db.query(Transaction).one()
+    assert transaction.order_id == 1001
+    assert transaction.price_value == 500000
+
+
+def test_insert_many(db):
+    Transaction.insert(make_transaction(3))
+    records = [make_transaction(i) for i in range(10)] + [make_transaction(5)]
+
+    result = Transaction.insert_many(records, batch_size=4)
+
+    assert result == (9, 2)
+    assert db.query(Transaction).count() == 10
+    assert Transaction.insert_many(records) == (0, 11)
+
+
+def test_sqlite_tuning(db):
+    assert db.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+    assert db.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+
+
+def test_indexes(db):
+    indexes = {i['name']: i['column_names']
+               for i in inspect(models.engine).get_indexes('transaction')}
+    assert indexes['ix_transaction_type_completed_at'] == \
+        ['type', 'completed_at']
+    assert indexes['ix_transaction_order_id'] == ['order_id']
+
+    query = Transaction.recent_sale_orders(limit=5)
+    plan = db.execute(text('EXPLAIN QUERY PLAN ' + str(query.statement.compile(
+        models.engine, compile_kwargs={'literal_binds': True})))).fetchall()
+    assert 'ix_transaction_type_completed_at' in str(plan)
+
+
+def test_fixed_point_units(db):
+    records = [make_transaction(i, price='500001') for i in range(3)]
+    Transaction.insert_many(records)
+
+    transaction = db.query(Transaction).first()
+    assert transaction.price_units == 500001
+    assert transaction.amount_units == 10000000
+    assert transaction.fee_units == 10000
+
+    total = db.query(func.sum(Transaction.amount_units)).scalar()
+    assert total == 30000000
+    assert db.query(func.sum(Transaction.fee_units)).scalar() == 30000
@@ -0,0 +1,65 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from korbit import nonce as nonce_module
+from korbit.nonce import NonceGenerator
+
+
+def test_strictly_increasing():
+    generator = NonceGenerator()
+    values = [generator() for _ in range(1000)]
+    assert values == sorted(set(values))
+
+
+def test_clock_going_backwards(monkeypatch):
+    generator = NonceGenerator()
+    monkeypatch.setattr(nonce_module, 'milliseconds', lambda: 2000)
+    assert generator() == 2000
+    monkeypatch.setattr(nonce_module, 'milliseconds', lambda: 1000)
+    assert generator() == 2001
+
+
+def test_threads():
+    generator = NonceGenerator()
+    results = []
+
+    def worker():
+        values = [generator() for _ in range(500)]
+        assert values == sorted(values)
+        results.extend(values)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(results)) == len(results)
+
+
+def _draw(path, count, queue):
+    generator = NonceGenerator(path)
+    queue.put([generator() for _ in range(count)])
+
+
+@pytest.mark.skipif(nonce_module.fcntl is None, reason='requires fcntl')
+def test_processes(tmpdir):
+    path = str(tmpdir.join('nonce'))
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_draw, args=(path, 300, queue))
+                 for _ in range(4)]
+    for p in processes:
+        p.start()
+    results = [queue.get(timeout=30) for _ in processes]
+    for p in processes:
+        p.join()
+
+    for values in results:
+        assert values == sorted(values)
+    merged = sum(results, [])
+    assert len(set(merged)) == len(merged)
+
+    # The file carries on from where the other processes left off
+    assert NonceGenerator(path)() > max(merged)
@@ -0,0 +1,142 @@
+import pytest
+
+from korbit.api import parse_orderbook
+from korbit.models import Order
+from korbit.orderbook import LocalOrderBook, OrderBook
+
+
+def raw_orderbook():
+    return {
+        'timestamp': 1386135077000,
+        'bids': [['677300', '3.50000000', '1'], ['677400', '0.5', '2']],
+        'asks': [['679600', '2.0', '1'], ['679500', '1.0', '3']],
+    }
+
+
+def test_sorted_arrays():
+    book = OrderBook.from_raw(raw_orderbook())
+
+    assert book.timestamp == 1386135077000
+    assert book.bids.prices.tolist() == [677400, 677300]
+    assert book.bids.amounts.tolist() == [0.5, 3.5]
+    assert book.bids.counts.tolist() == [2, 1]
+    assert book.asks.prices.tolist() == [679500, 679600]
+    assert book.asks.prices.flags['C_CONTIGUOUS']
+
+
+def test_spread_and_mid():
+    book = OrderBook.from_raw(raw_orderbook())
+
+    assert book.spread == 2100
+    assert book.mid == 678450
+
+
+def test_empty():
+    book = OrderBook.from_raw({'timestamp': 0, 'bids': [], 'asks': []})
+
+    assert len(book.bids) == 0
+    assert book.spread is None and book.mid is None
+    assert book.bids.best_price is None
+    with pytest.raises(ValueError):
+        book.asks.vwap(1)
+
+
+def test_depth_and_vwap():
+    book = OrderBook.from_raw(raw_orderbook())
+
+    assert book.asks.cumulative_amount().tolist() == [1.0, 3.0]
+    assert book.asks.vwap(1.0) == 679500
+    assert book.asks.vwap(2.0) == (679500 + 679600) / 2
+    assert book.bids.fill(1.0).tolist() == [0.5, 0.5]
+    with pytest.raises(ValueError):
+        book.asks.vwap(3.5)
+    with pytest.raises(ValueError):
+        book.asks.vwap(0)
+
+
+def test_order_view():
+    book = OrderBook.from_raw(raw_orderbook())
+    legacy = parse_orderbook(raw_orderbook())
+
+    for side in ('bids', 'asks'):
+        orders = list(book[side])
+        assert all(type(o) == Order for o in orders)
+        assert [repr(o) for o in orders] == [repr(o) for o in legacy[side]]
+
+    assert book.asks[-1].price == 679600
+    assert len(book.asks[:1]) == 1
+
+
+def test_parse_columnar():
+    assert isinstance(parse_orderbook(raw_orderbook(), columnar=True),
+                      OrderBook)
+    bids = parse_orderbook(raw_orderbook(), 'bids', columnar=True)
+    assert bids.best_price == 677400
+
+
+def test_local_order_book():
+    book = LocalOrderBook()
+    changes = book.update(raw_orderbook())
+
+    assert len(changes) == 4
+    assert {c.kind for c in changes} == {'added'}
+    assert book.best_bid == (677400, 0.5)
+    assert book.best_ask == (679500, 1.0)
+
+    snapshot = raw_orderbook()
+    snapshot['timestamp'] += 1000
+    snapshot['bids'] = [['677300', '3.5', '1'], ['677500', '0.1', '1']]
+    snapshot['asks'][0][1] = '1.5'
+    changes = book.update(snapshot)
+
+    assert book.timestamp == 1386135078000
+    assert sorted((c.side, c.price, c.kind) for c in changes) == [
+        ('asks', 679600, 'changed'),
+        ('bids', 677400, 'removed'),
+        ('bids', 677500, 'added'),
+    ]
+    assert book.best_bid == (677500, 0.1)
+    assert book.update(snapshot) == []
+
+
+def test_local_order_book_apply():
+    source, replica = LocalOrderBook(), LocalOrderBook()
+    replica.apply(source.update(raw_orderbook()), 1)
+    snapshot = raw_orderbook()
+    snapshot['asks'] = []
+    replica.apply(source.update(snapshot), 2)
+
+    assert replica.best_ask is None
+    assert replica.bids == source.bids
+
+    book = replica.to_order_book()
+    assert book.bids.prices.tolist() == [677400, 677300]
+    assert len(book.asks) == 0
+
+
+def test_fixed_point():
+    book = OrderBook.from_raw(raw_orderbook(), fixed_point=True)
+
+    assert book.bids.prices.dtype == 'int64'
+    assert book.bids.amounts.tolist() == [50000000, 350000000]
+    assert book.spread == 2100 and isinstance(book.spread, int)
+    assert book.asks.cumulative_value().tolist() == \
+        [679500 * 100000000, 679500 * 100000000 + 679600 * 200000000]
+    assert book.asks.vwap(200000000) == (679500 + 679600) / 2
+
+    order = book.bids[0]
+    assert (order.price, order.amount) == (677400, 50000000)
+    assert [o.amount for o in parse_orderbook(raw_orderbook(), 'bids',
+                                              fixed_point=True)] == \
+        [50000000, 350000000]
+
+
+def test_local_order_book_fixed_point():
+    book = LocalOrderBook(fixed_point=True)
+    book.update(raw_orderbook())
+
+    assert book.best_bid == (677400, 50000000)
+    snapshot = book.to_order_book()
+    assert snapshot.asks.amounts.tolist() == [100000000, 200000000]
+    with pytest.raises(ValueError):
+        book.update(OrderBook.from_raw(raw_orderbook()))
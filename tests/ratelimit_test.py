@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from korbit import api
+from korbit.client import KorbitClient
+from korbit.ratelimit import (
+    PRIORITY_ACCOUNT, PRIORITY_MARKET_DATA, PRIORITY_ORDER, RateLimiter,
+    RateLimitTimeout, TokenBucket, classify)
+from tests.stub import StubServer
+
+
+def test_classify():
+    assert classify('POST', 'user/orders/buy') == ('private', PRIORITY_ORDER)
+    assert classify('POST', 'user/orders/cancel') == \
+        ('private', PRIORITY_ORDER)
+    assert classify('GET', 'user/orders/open') == \
+        ('private', PRIORITY_ACCOUNT)
+    assert classify('POST', 'oauth2/access_token') == \
+        ('private', PRIORITY_ACCOUNT)
+    assert classify('GET', 'orderbook') == ('public', PRIORITY_MARKET_DATA)
+
+
+def test_burst_then_rate():
+    bucket = TokenBucket(rate=20, capacity=5)
+    started = time.monotonic()
+    for _ in range(10):
+        bucket.acquire()
+    elapsed = time.monotonic() - started
+
+    # 5 tokens up front, then 5 more at 20 per second
+    assert 0.2 <= elapsed < 0.5
+
+
+def test_timeout():
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.acquire()
+    with pytest.raises(RateLimitTimeout):
+        bucket.acquire(timeout=0.05)
+    assert bucket.queue_depth == 0
+
+
+def test_priority():
+    bucket = TokenBucket(rate=20, capacity=1)
+    bucket.acquire()
+    order = []
+
+    def worker(name, priority):
+        bucket.acquire(priority)
+        order.append(name)
+
+    threads = []
+    for name, priority in [('poll1', PRIORITY_MARKET_DATA),
+                           ('poll2', PRIORITY_MARKET_DATA),
+                           ('wallet', PRIORITY_ACCOUNT),
+                           ('cancel', PRIORITY_ORDER)]:
+        thread = threading.Thread(target=worker, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.005)
+
+    assert bucket.queue_depth == 4
+    for thread in threads:
+        thread.join()
+
+    assert order == ['cancel', 'wallet', 'poll1', 'poll2']
+    metrics = bucket.metrics()
+    assert metrics['queue_depth'] == 0
+    assert metrics['priorities']['order']['acquired'] == 1
+    assert metrics['priorities']['market_data']['acquired'] == 3
+    assert metrics['priorities']['market_data']['max_wait'] > 0.1
+
+
+def test_acquire_async():
+    bucket = TokenBucket(rate=20, capacity=1)
+    bucket.acquire()
+    order = []
+
+    async def worker(name, priority):
+        await bucket.acquire_async(priority)
+        order.append(name)
+
+    async def main():
+        tasks = []
+        for name, priority in [('poll', PRIORITY_MARKET_DATA),
+                               ('wallet', PRIORITY_ACCOUNT),
+                               ('cancel', PRIORITY_ORDER)]:
+            tasks.append(asyncio.ensure_future(worker(name, priority)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        with pytest.raises(RateLimitTimeout):
+            await bucket.acquire_async(timeout=0.01)
+
+    asyncio.run(main())
+    assert order == ['cancel', 'wallet', 'poll']
+    assert bucket.queue_depth == 0
+
+
+def test_client():
+    limiter = RateLimiter(public=TokenBucket(rate=50, capacity=1),
+                          private=TokenBucket(rate=1, capacity=1))
+    routes = {'ticker': {}, ('POST', 'user/orders/cancel'): {}}
+
+    with StubServer(routes) as server:
+        with KorbitClient(server.base_url, rate_limiter=limiter) as client:
+            started = time.monotonic()
+            for _ in range(6):
+                client.get('ticker')
+            client.post('user/orders/cancel', id=1)
+            elapsed = time.monotonic() - started
+
+    assert 0.08 <= elapsed < 0.5
+    metrics = limiter.metrics()
+    assert metrics['public']['priorities']['market_data']['acquired'] == 6
+    assert metrics['private']['priorities']['order']['acquired'] == 1
+
+
+def test_nonces_follow_send_order(monkeypatch):
+    monkeypatch.setattr(api, 'access_token',
+                        lambda: {'access_token': 'secret'})
+    limiter = RateLimiter(private=TokenBucket(rate=20, capacity=1))
+    routes = {'user/info': {}, ('POST', 'user/orders/cancel'): {}}
+
+    with StubServer(routes) as server:
+        api.set_default_client(
+            KorbitClient(server.base_url, rate_limiter=limiter))
+        try:
+            api.get_user_info()  # drains the bucket
+            # The cancel draws its nonce later but overtakes the account
+            # read in the queue
+            threads = [threading.Thread(target=api.get_user_info),
+                       threading.Thread(target=api.cancel_order, args=(1,))]
+            for thread in threads:
+                thread.start()
+                time.sleep(0.01)
+            for thread in threads:
+                thread.join()
+        finally:
+            api.set_default_client(None)
+
+    endpoints = [endpoint for _, endpoint, _ in server.requests]
+    assert endpoints == ['user/info', 'user/orders/cancel', 'user/info']
+    nonces = [int(params['nonce'][0]) for _, _, params in server.requests]
+    assert nonces == sorted(nonces)
@@ -0,0 +1,105 @@
+import json
+import time
+
+import pytest
+
+from korbit import api
+from korbit.client import KorbitClient, KorbitError
+from korbit.replay import RecordingClient, ReplayClient, ReplayMiss
+from tests.stub import StubServer
+
+ORDERBOOK = {
+    'timestamp': 1386135077000,
+    'bids': [['677300', '3.5', '1']],
+    'asks': [['679500', '0.15', '2']],
+}
+
+
+def ticker_route():
+    calls = []
+
+    def route(method, params):
+        calls.append(1)
+        return 200, {'last': str(1000 + len(calls))}
+    return route
+
+
+@pytest.fixture
+def recording(tmpdir):
+    path = str(tmpdir.join('session.jsonl.gz'))
+    routes = {
+        'ticker': ticker_route(),
+        'orderbook': ORDERBOOK,
+        'constants': lambda method, params: (500, {'error': 'oops'}),
+        ('POST', 'user/orders/buy'): {'orderId': '1', 'status': 'success'},
+        ('POST', 'oauth2/access_token'): {'access_token': 'secret-token',
+                                          'expires_in': 3600},
+    }
+    with StubServer(routes) as server:
+        with RecordingClient(path, server.base_url) as client:
+            client.get('ticker', currency_pair='btc_krw')
+            client.get('orderbook', currency_pair='btc_krw')
+            time.sleep(0.2)
+            client.get('ticker', currency_pair='btc_krw')
+            client.post('user/orders/buy', access_token='secret-token',
+                        nonce=1402214947000, price=677300)
+            client.post('oauth2/access_token', client_id='key',
+                        client_secret='shh')
+            with pytest.raises(KorbitError):
+                client.get('constants')
+    return path
+
+
+def test_secrets_are_not_logged(recording):
+    import gzip
+
+    with gzip.open(recording, 'rt') as f:
+        text = f.read()
+
+    assert len(text.splitlines()) == 6
+    for secret in ('secret-token', '1402214947000', 'shh', 'key"'):
+        assert secret not in text
+    assert json.loads(text.splitlines()[0])['p'] == \
+        {'currency_pair': 'btc_krw'}
+
+
+def test_replay(recording):
+    client = ReplayClient(recording)
+
+    assert client.get('ticker', currency_pair='btc_krw') == {'last': '1001'}
+    assert client.get('ticker', currency_pair='btc_krw') == {'last': '1002'}
+    with pytest.raises(ReplayMiss):
+        client.get('ticker', currency_pair='btc_krw')
+    with pytest.raises(ReplayMiss):
+        client.get('ticker', currency_pair='eth_krw')
+
+    assert client.post('user/orders/buy', access_token='other', nonce=2,
+                       price=677300)['status'] == 'success'
+    assert client.post('oauth2/access_token')['access_token'] == 'REDACTED'
+    with pytest.raises(KorbitError) as excinfo:
+        client.get('constants')
+    assert str(excinfo.value).startswith('500')
+    assert client.remaining() == 1
+
+
+def test_replay_through_api(recording):
+    api.set_default_client(ReplayClient(recording))
+    try:
+        book = api.get_orderbook(columnar=True)
+        assert book.asks.best_price == 679500
+        assert api.get_ticker() == {'last': '1001'}
+    finally:
+        api.set_default_client(KorbitClient())
+
+
+def test_paced_replay(recording):
+    client = ReplayClient(recording, speed=2)
+
+    started = time.perf_counter()
+    client.get('ticker', currency_pair='btc_krw')
+    client.get('ticker', currency_pair='btc_krw')
+    elapsed = time.perf_counter() - started
+
+    # 0.2s apart when recorded
+    assert 0.08 <= elapsed < 0.3
+    assert client.now() >= client.started_at + 0.16
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from korbit.client import KorbitClient
+from korbit.singleflight import SingleFlight
+from tests.stub import StubServer
+
+
+def run_concurrently(func, count):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(func())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_shared_result():
+    flights = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return len(calls)
+
+    results, _ = run_concurrently(lambda: flights.do('key', slow), 10)
+    assert results == [1] * 10
+    assert flights.coalesced == 9
+    assert len(flights) == 0
+
+    # Nothing is remembered after the call completes
+    assert flights.do('key', slow) == 2
+
+
+def test_shared_error():
+    flights = SingleFlight()
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError('boom')
+
+    _, errors = run_concurrently(lambda: flights.do('key', failing), 5)
+    assert len(errors) == 5
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+@pytest.mark.parametrize('coalesce, expected', [(True, 1), (False, 8)])
+def test_client(coalesce, expected):
+    def slow_ticker(method, params):
+        time.sleep(0.1)
+        return 200, {'last': '569000'}
+
+    with StubServer({'ticker': slow_ticker}) as server:
+        with KorbitClient(server.base_url, coalesce=coalesce) as client:
+            results, _ = run_concurrently(
+                lambda: client.get('ticker', currency_pair='btc_krw'), 8)
+
+    assert results == [{'last': '569000'}] * 8
+    assert len(server.requests) == expected
@@ -0,0 +1,180 @@
+"""A local stub of the Korbit API for offline tests and benchmarks."""
+from __future__ import absolute_import
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+
+import json
+import threading
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connection_count += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        self.respond('GET', parsed.path, parse_qs(parsed.query))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8')
+        self.respond('POST', urlparse(self.path).path, parse_qs(body))
+
+    def respond(self, method, path, params):
+        endpoint = path[len(self.server.prefix):].lstrip('/')
+
+        with self.server.lock:
+            self.server.requests.append((method, endpoint, params))
+
+        route = self.server.routes.get((method, endpoint),
+                                       self.server.routes.get(endpoint))
+        if route is None:
+            status, payload = 404, {'error': 'not found'}
+        elif callable(route):
+            status, payload = route(method, params)
+        else:
+            status, payload = 200, route
+
+        body = payload if isinstance(payload, bytes) \
+            else json.dumps(payload).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in self.server.extra_headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    """Serves canned JSON responses on ``127.0.0.1`` in a background thread.
+
+    ``routes`` maps either an endpoint (e.g., ``'ticker'``) or a
+    ``(method, endpoint)`` pair to a JSON-serializable payload, raw bytes, or
+    a callable ``(method, params) -> (status, payload)``.
+
+    .. code-block:: python
+
+        with StubServer({'constants': {}}) as server:
+            client = KorbitClient(server.base_url)
+    """
+
+    daemon_threads = True
+    prefix = '/v1'
+
+    def __init__(self, routes=None, extra_headers=None):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.routes = dict(routes or {})
+        self.extra_headers = dict(extra_headers or {})
+        self.lock = threading.Lock()
+        self.connection_count = 0
+        self.requests = []
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:{}{}'.format(self.server_address[1],
+                                              self.prefix)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever,
+                                       kwargs={'poll_interval': 0.05})
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class AsyncStubServer(object):
+    """An :mod:`aiohttp` counterpart of :class:`StubServer` that runs inside
+    the caller's event loop.
+
+    Callable routes may also be coroutines, e.g., to simulate server-side
+    latency with :func:`asyncio.sleep`.
+    """
+
+    prefix = '/v1'
+
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.runner = None
+        self.port = None
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:{}{}'.format(self.port, self.prefix)
+
+    async def handle(self, request):
+        from aiohttp import web
+        import inspect
+
+        endpoint = request.path[len(self.prefix):].lstrip('/')
+        if request.method == 'POST':
+            form = await request.post()
+            params = {k: form.getall(k) for k in form}
+        else:
+            params = {k: request.query.getall(k) for k in request.query}
+        self.requests.append((request.method, endpoint, params))
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            route = self.routes.get((request.method, endpoint),
+                                    self.routes.get(endpoint))
+            if route is None:
+                status, payload = 404, {'error': 'not found'}
+            elif callable(route):
+                result = route(request.method, params)
+                if inspect.isawaitable(result):
+                    result = await result
+                status, payload = result
+            else:
+                status, payload = 200, route
+        finally:
+            self.in_flight -= 1
+
+        return web.json_response(payload, status=status)
+
+    async def start(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
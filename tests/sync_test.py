@@ -0,0 +1,91 @@
+import pytest
+
+from korbit import models
+from korbit.models import SyncState, Transaction
+from korbit.sync import sync_transactions
+
+
+def make_transaction(id):
+    return {
+        'id': str(id),
+        'type': 'coin-in',
+        'timestamp': 1402448355000 + id * 1000,
+        'completedAt': 1402448277000 + id * 1000,
+        'coinsDetail': {'amount': {'currency': 'btc', 'value': '0.1'}},
+        'balances': [],
+    }
+
+
+@pytest.fixture
+def history(stub_api):
+    """Newest first, like the real endpoint."""
+    records = [make_transaction(i) for i in range(50, 0, -1)]
+
+    def route(method, params):
+        offset, limit = int(params['offset'][0]), int(params['limit'][0])
+        return 200, records[offset:offset + limit]
+
+    server = stub_api({'user/transactions': route})
+    return records, server
+
+
+def test_initial_sync(db, history):
+    result = sync_transactions(page_size=20, batch_size=7)
+
+    assert result == (50, 50, 0, 50)
+    assert db.query(Transaction).count() == 50
+    state = db.query(SyncState).one()
+    assert state.last_id == 50
+
+
+def test_existing_ledger(tmpdir, history):
+    # A database created before sync_state existed
+    default_url = models.DATABASE_URL
+    models.configure('sqlite:///{}'.format(tmpdir.join('ledger.db')))
+    try:
+        Transaction.__table__.create(bind=models.get_engine())
+
+        assert sync_transactions(page_size=20) == (50, 50, 0, 50)
+        assert models.get_session().query(SyncState).one().last_id == 50
+    finally:
+        models.configure(default_url)
+
+
+def test_incremental_sync(db, history):
+    records, server = history
+    sync_transactions(page_size=20)
+    del server.requests[:]
+
+    # Only the first page is needed (plus at most one prefetched page)
+    assert sync_transactions(page_size=20) == (0, 0, 0, 50)
+    assert len(server.requests) <= 2
+
+    records[:0] = [make_transaction(i) for i in range(53, 50, -1)]
+    del server.requests[:]
+
+    assert sync_transactions(page_size=20) == (3, 3, 0, 53)
+    assert len(server.requests) <= 2
+    assert db.query(Transaction).count() == 53
+
+
+def test_resume_after_crash(db, history, monkeypatch):
+    original = Transaction.__dict__['insert_many']
+    insert_many = Transaction.insert_many
+
+    def crashing(json_objects, batch_size):
+        def records():
+            for i, record in enumerate(json_objects):
+                if i == 30:
+                    raise RuntimeError('crash')
+                yield record
+        return insert_many(records(), batch_size)
+
+    monkeypatch.setattr(Transaction, 'insert_many', staticmethod(crashing))
+    with pytest.raises(RuntimeError):
+        sync_transactions(page_size=20, batch_size=10)
+    monkeypatch.setattr(Transaction, 'insert_many', original)
+
+    assert models.session.query(Transaction).count() == 30
+    assert models.session.query(SyncState).count() == 0
+
+    assert sync_transactions(page_size=20, batch_size=10) == (50, 20, 30, 50)
@@ -0,0 +1,73 @@
+import numpy as np
+
+from korbit.tickstore import TickStore, transactions_to_ticks
+
+DAY = 24 * 60 * 60 * 1000
+T0 = 1389657600000  # 2014-01-14 00:00:00 UTC
+
+
+def make_transactions(tids, step=1000, start=T0):
+    return [{'timestamp': start + tid * step, 'tid': str(tid),
+             'price': str(569000 + tid), 'amount': '0.01000000'}
+            for tid in tids]
+
+
+def test_transactions_to_ticks():
+    ticks = transactions_to_ticks(make_transactions([3, 1, 2]))
+
+    assert ticks['tid'].tolist() == [1, 2, 3]
+    assert ticks['price'].tolist() == [569001, 569002, 569003]
+    assert ticks.dtype.itemsize == 32
+
+
+def test_append_dedupes(tmpdir):
+    store = TickStore(str(tmpdir))
+
+    assert store.append(make_transactions(range(10))) == 10
+    assert store.append(make_transactions(range(5, 15))) == 5
+    assert store.append(make_transactions([14, 14, 15])) == 1
+    assert store.append([]) == 0
+
+    ticks = store.read()
+    assert ticks['tid'].tolist() == list(range(16))
+    assert isinstance(ticks, np.memmap)
+    assert tmpdir.listdir()[0].basename == '20140114.ticks'
+    assert tmpdir.join('20140114.ticks').size() == 16 * 32
+
+
+def test_out_of_order(tmpdir):
+    store = TickStore(str(tmpdir))
+    store.append(make_transactions([5, 6, 7]))
+    store.append(make_transactions([1, 2, 6]))
+
+    assert store.read()['tid'].tolist() == [1, 2, 5, 6, 7]
+
+
+def test_segments_and_ranges(tmpdir):
+    store = TickStore(str(tmpdir))
+    # Three ticks per day over four days
+    store.append(make_transactions(range(12), step=DAY // 3))
+
+    assert len(tmpdir.listdir()) == 4
+    assert len(store.read()) == 12
+
+    ticks = store.read(start=T0 + DAY, end=T0 + 2 * DAY)
+    assert ticks['tid'].tolist() == [3, 4, 5]
+    assert isinstance(ticks, np.memmap)
+
+    ticks = store.read(start=T0 + DAY + 1, end=T0 + 3 * DAY + 1)
+    assert ticks['tid'].tolist() == [4, 5, 6, 7, 8, 9]
+
+    assert len(store.read(start=T0 + 10 * DAY)) == 0
+
+
+def test_partial_record(tmpdir):
+    store = TickStore(str(tmpdir))
+    store.append(make_transactions(range(3)))
+    with open(store.segment_path(T0 // DAY), 'ab') as f:
+        f.write(b'\0' * 10)  # an interrupted write
+
+    assert store.read()['tid'].tolist() == [0, 1, 2]
+    assert store.append(make_transactions(range(5))) == 2
+    assert store.read()['tid'].tolist() == list(range(5))
+    assert tmpdir.join('20140114.ticks').size() == 5 * 32